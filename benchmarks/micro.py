@@ -0,0 +1,383 @@
+"""Micro-benchmarks for the hot paths of docrep.
+
+The benchmarks only use the :mod:`timeit` module of the standard library. Each
+benchmark is run ``--repeat`` times with a number of loops that takes at least
+0.2 seconds, and the minimum and the median time per call are stored.
+
+Usage::
+
+    $ python benchmarks/micro.py run -o baseline.json
+    $ # ... change docrep ...
+    $ python benchmarks/micro.py run -o current.json
+    $ python benchmarks/micro.py compare baseline.json current.json
+
+The ``compare`` command prints the ratio of the times for each benchmark and
+exits with a non-zero status if one of them is slower than the baseline by
+more than ``--threshold``. Use ``python benchmarks/micro.py list`` to show the
+available benchmarks and ``-k`` to select some of them.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import re
+import sys
+import timeit
+import warnings
+
+import docrep
+
+
+#: Mapping from benchmark name to a function that returns the callable to time
+benchmarks = {}
+
+
+def benchmark(name):
+    """Register a function that prepares a benchmark
+
+    The decorated function is called once and must return the callable (without
+    arguments) that is timed."""
+    def decorate(func):
+        benchmarks[name] = func
+        return func
+    return decorate
+
+
+def make_params(n, prefix='param'):
+    """Create the documentation of `n` parameters"""
+    return '\n'.join('%s%i: int\n    The description of parameter %i\n'
+                     '    that spans two lines' % (prefix, i, i)
+                     for i in range(n))
+
+
+def make_docstring(nparams=10, nother=3, nreturns=2, summary_lines=3):
+    """Create a numpy docstring with the given number of entries"""
+    indent = lambda s: s.replace('\n', '\n    ')  # noqa: E731
+    return """Summary of the function
+
+    %s
+
+    Parameters
+    ----------
+    %s
+
+    Other Parameters
+    ----------------
+    %s
+
+    Returns
+    -------
+    %s
+
+    Notes
+    -----
+    Some notes""" % (
+        indent('\n'.join(['An extended summary line'] * summary_lines)),
+        indent(make_params(nparams)), indent(make_params(nother, 'other')),
+        indent('\n'.join('float\n    Result %i' % i for i in range(nreturns))))
+
+
+# -- safe_modulo --------------------------------------------------------------
+
+@benchmark('safe_modulo.hit')
+def bench_safe_modulo_hit():
+    meta = {'key%i' % i: 'value %i' % i for i in range(10)}
+    s = ' '.join('%%(key%i)s' % i for i in range(10))
+    return lambda: docrep.safe_modulo(s, meta)
+
+
+@benchmark('safe_modulo.miss')
+def bench_safe_modulo_miss():
+    meta = {'key%i' % i: 'value %i' % i for i in range(5)}
+    s = ' '.join('%%(key%i)s' % i for i in range(10))
+    return lambda: docrep.safe_modulo(s, meta, print_warning=False)
+
+
+# -- extraction ---------------------------------------------------------------
+
+@benchmark('get_sections.small')
+def bench_get_sections_small():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring(5, 2)
+    return lambda: d.get_sections(doc, 'func')
+
+
+@benchmark('get_sections.large')
+def bench_get_sections_large():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring(200, 50)
+    return lambda: d.get_sections(doc, 'func')
+
+
+@benchmark('get_sections.all_sections')
+def bench_get_sections_all():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring(10, 3)
+    sections = ['Parameters', 'Other Parameters', 'Returns', 'Notes']
+    return lambda: d.get_sections(doc, 'func', sections)
+
+
+@benchmark('get_docstring')
+def bench_get_docstring():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring()
+    return lambda: d.get_docstring(doc, 'func')
+
+
+@benchmark('get_summary')
+def bench_get_summary():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring()
+    return lambda: d.get_summary(doc, 'func')
+
+
+@benchmark('get_extended_summary')
+def bench_get_extended_summary():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring(summary_lines=20)
+    return lambda: d.get_extended_summary(doc, 'func')
+
+
+@benchmark('get_full_description')
+def bench_get_full_description():
+    d = docrep.DocstringProcessor()
+    doc = make_docstring(summary_lines=20)
+    return lambda: d.get_full_description(doc, 'func')
+
+
+# -- selection of parameters --------------------------------------------------
+
+@benchmark('keep_params.small')
+def bench_keep_params_small():
+    s = make_params(5)
+    return lambda: docrep.keep_params(s, 'param1', 'param3')
+
+
+@benchmark('keep_params.large')
+def bench_keep_params_large():
+    s = make_params(500)
+    return lambda: docrep.keep_params(s, 'param1', 'param250', 'param499')
+
+
+@benchmark('delete_params.small')
+def bench_delete_params_small():
+    s = make_params(5)
+    return lambda: docrep.delete_params(s, 'param1', 'param3')
+
+
+@benchmark('delete_params.large')
+def bench_delete_params_large():
+    s = make_params(500)
+    return lambda: docrep.delete_params(s, 'param1', 'param250', 'param499')
+
+
+@benchmark('keep_types.large')
+def bench_keep_types_large():
+    s = '\n'.join('type%i\n    Result %i' % (i, i) for i in range(500))
+    return lambda: docrep.keep_types(s, 'type1', 'type250')
+
+
+@benchmark('delete_types.large')
+def bench_delete_types_large():
+    s = '\n'.join('type%i\n    Result %i' % (i, i) for i in range(500))
+    return lambda: docrep.delete_types(s, 'type1', 'type250')
+
+
+@benchmark('delete_kwargs.large')
+def bench_delete_kwargs_large():
+    s = make_params(500) + '\n*args\n    Arguments\n**kwargs\n    Keywords'
+    return lambda: docrep.delete_kwargs(s, 'args', 'kwargs')
+
+
+@benchmark('processor.keep_params')
+def bench_processor_keep_params():
+    d = docrep.DocstringProcessor()
+    d.params['func.parameters'] = make_params(50)
+    return lambda: d.keep_params('func.parameters', 'param1', 'param25')
+
+
+# -- substitution -------------------------------------------------------------
+
+def make_processor(nkeys):
+    d = docrep.DocstringProcessor()
+    section = make_params(5)
+    d.params.update(('module%i.func.parameters' % i, section)
+                    for i in range(nkeys))
+    return d
+
+
+TEMPLATE = """Summary
+
+    Parameters
+    ----------
+    %(module1.func.parameters)s
+    %(module{}.func.parameters)s
+
+    Returns
+    -------
+    float
+        A number"""
+
+
+@benchmark('dedent.small_params')
+def bench_dedent_small():
+    d = make_processor(10)
+    s = TEMPLATE.format(5)
+    return lambda: d.dedent(s)
+
+
+@benchmark('dedent.large_params')
+def bench_dedent_large():
+    d = make_processor(10000)
+    s = TEMPLATE.format(5000)
+    return lambda: d.dedent(s)
+
+
+@benchmark('with_indent.large_params')
+def bench_with_indent_large():
+    d = make_processor(10000)
+    s = TEMPLATE.format(5000)
+    return lambda: d.with_indent(s, 4)
+
+
+@benchmark('dedent.selector')
+def bench_dedent_selector():
+    d = make_processor(10000)
+    s = '%(module5.func.parameters|keep:param1,param3)s'
+    return lambda: d.dedent(s)
+
+
+@benchmark('dedent.decorator')
+def bench_dedent_decorator():
+    d = make_processor(10000)
+    s = TEMPLATE.format(5000)
+
+    def func():
+        pass
+
+    def run():
+        func.__doc__ = s
+        d.dedent(func)
+
+    return run
+
+
+# -- running and comparing ----------------------------------------------------
+
+def run_benchmark(func, repeat=5, min_time=0.2):
+    """Time one benchmark
+
+    Returns
+    -------
+    dict
+        The minimum and the median time per call in seconds and the number of
+        loops"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+    times = sorted(t / number for t in timer.repeat(repeat, number))
+    return {'min': times[0], 'median': times[len(times) // 2],
+            'number': number}
+
+
+def select(pattern=None):
+    names = sorted(benchmarks)
+    if pattern:
+        names = [name for name in names if re.search(pattern, name)]
+    return names
+
+
+def run(args):
+    results = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for name in select(args.k):
+            results[name] = result = run_benchmark(
+                benchmarks[name](), args.repeat, args.min_time)
+            print('%-30s %12.3f us' % (name, result['min'] * 1e6))
+    if args.output:
+        meta = {'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'docrep': docrep.__version__}
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1,
+                      sort_keys=True)
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+    regressions = []
+    print('%-30s %12s %12s %8s' % ('benchmark', 'base [us]', 'new [us]',
+                                   'ratio'))
+    for name in sorted(set(baseline) & set(current)):
+        base = baseline[name][args.stat]
+        new = current[name][args.stat]
+        ratio = new / base
+        flag = ''
+        if ratio > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1. / args.threshold:
+            flag = '  faster'
+        print('%-30s %12.3f %12.3f %8.2f%s' % (
+            name, base * 1e6, new * 1e6, ratio, flag))
+    for name in sorted(set(baseline) ^ set(current)):
+        print('%-30s only in %s' % (
+            name, 'baseline' if name in baseline else 'current results'))
+    if regressions:
+        print('\n%i regression(s) above a ratio of %s' % (
+            len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks")
+    run_parser.add_argument('-o', '--output',
+                            help="The JSON file for the results")
+    run_parser.add_argument('-k', help="Regex to select benchmarks")
+    run_parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help="Number of repetitions. Default: %(default)s")
+    run_parser.add_argument(
+        '--min-time', type=float, default=0.2,
+        help="Minimal duration of one repetition in seconds. "
+        "Default: %(default)s")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser(
+        'compare', help="Compare results with a baseline")
+    compare_parser.add_argument('baseline', help="The baseline JSON file")
+    compare_parser.add_argument('current', help="The new JSON file")
+    compare_parser.add_argument(
+        '-t', '--threshold', type=float, default=1.2,
+        help="Ratio of the times above which a benchmark counts as "
+        "regression. Default: %(default)s")
+    compare_parser.add_argument(
+        '--stat', choices=['min', 'median'], default='min',
+        help="The statistic to compare. Default: %(default)s")
+    compare_parser.set_defaults(func=compare)
+
+    list_parser = subparsers.add_parser('list', help="List the benchmarks")
+    list_parser.add_argument('-k', help="Regex to select benchmarks")
+    list_parser.set_defaults(
+        func=lambda args: print('\n'.join(select(args.k))))
+
+    args = parser.parse_args(args)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
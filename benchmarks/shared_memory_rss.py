@@ -0,0 +1,90 @@
+"""Compare the memory of forked workers with and without shared params.
+
+The parent process builds a :class:`docrep.DocstringProcessor` with many
+parameters and forks a number of workers that render docstrings using all of
+them. Each worker reports its resident set size (RSS) and its unique set size
+(USS, the private memory that is not shared with the parent). The benchmark is
+run once with the default params and once with the params in shared memory
+(see :meth:`docrep.DocstringProcessor.share_params`).
+
+Usage::
+
+    $ python benchmarks/shared_memory_rss.py --workers 16 --keys 100000
+
+This requires Linux (for ``/proc/self/smaps_rollup``) and python 3.8 or later.
+"""
+import argparse
+import multiprocessing as mp
+
+import docrep
+
+
+def memory_usage():
+    """Get the RSS and the USS of the current process in MiB"""
+    ret = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ['Rss:', 'Private_Clean:', 'Private_Dirty:']:
+                ret[parts[0][:-1]] = int(parts[1]) / 1024.
+    return ret['Rss'], ret['Private_Clean'] + ret['Private_Dirty']
+
+
+def create_processor(nkeys):
+    """Create a processor with `nkeys` parameter sections"""
+    d = docrep.DocstringProcessor()
+    section = '\n'.join('param%i: int\n    The description of parameter %i'
+                        % (i, i) for i in range(5))
+    d.params.update(('module%i.func.parameters' % i, section + ' ' * (i % 7))
+                    for i in range(nkeys))
+    return d
+
+
+def render(d, nkeys, queue):
+    """Render docstrings with all parameters in a worker process"""
+    template = ("Summary\n\nParameters\n----------\n"
+                "%(module{}.func.parameters)s")
+    for i in range(nkeys):
+        d.dedent(template.format(i))
+    queue.put(memory_usage())
+
+
+def run(d, nkeys, nworkers):
+    ctx = mp.get_context('fork')
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=render, args=(d, nkeys, queue))
+             for i in range(nworkers)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for p in procs]
+    for p in procs:
+        p.join()
+    return (sum(r[0] for r in results) / nworkers,
+            sum(r[1] for r in results) / nworkers)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-w', '--workers', type=int, default=16,
+        help="Number of worker processes. Default: %(default)s")
+    parser.add_argument('-k', '--keys', type=int, default=100000,
+                        help="Number of parameters. Default: %(default)s")
+    args = parser.parse_args(args)
+
+    print("%-8s %12s %12s %14s" % ("params", "RSS [MiB]", "USS [MiB]",
+                                   "total USS [MiB]"))
+    for mode in ['dict', 'shared']:
+        d = create_processor(args.keys)
+        if mode == 'shared':
+            shared = d.share_params()
+        rss, uss = run(d, args.keys, args.workers)
+        print("%-8s %12.1f %12.1f %14.1f" % (mode, rss, uss,
+                                             uss * args.workers))
+        if mode == 'shared':
+            shared.close()
+            shared.unlink()
+
+
+if __name__ == '__main__':
+    main()
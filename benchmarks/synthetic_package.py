@@ -0,0 +1,363 @@
+"""Measure the import time of a large synthetic package that uses docrep.
+
+The script generates a package with ``--modules`` modules of ``--functions``
+functions and ``--classes`` classes each. Every module extracts the parameters
+of its first function, and the other functions derive new keys from their
+predecessor via :meth:`~docrep.DocstringProcessor.delete_params` and insert
+them with :meth:`~docrep.DocstringProcessor.with_indent`. This creates chains
+of up to ``--chain`` derivations within a module. Each module also uses one
+parameter of the previous module via
+:meth:`~docrep.DocstringProcessor.keep_params`, and its classes form an
+inheritance hierarchy that reuses the parameters of the functions.
+
+For comparison, the same package is generated a second time with the rendered
+docstrings written literally into the source code (``plain``), i.e. without
+docrep. The harness imports both packages in fresh interpreters, once without
+bytecode cache (cold) and then with the cache (warm), and reports the import
+time, the peak memory (maximum resident set size) and the size of the
+docstrings.
+
+Usage::
+
+    $ python benchmarks/synthetic_package.py --modules 100 --functions 100
+
+This creates 10000 functions. Use ``-o`` to save the results as JSON and
+``--keep`` to keep the generated packages in a directory.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import os.path as osp
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+FUNCTION_TEMPLATE = '''
+
+@d.get_sections(base='{key}')
+@d.with_indent(4)
+def {name}({mod}_a{i}, {mod}_b{i}, {mod}_c{i}, x=None):
+    """
+    Function {i} of module {mod}
+
+    Parameters
+    ----------
+    {mod}_a{i}: int
+        The first parameter of function {i}
+    {mod}_b{i}: str
+        The second parameter of function {i}
+    {mod}_c{i}: float
+        The third parameter of function {i}
+    %({parent})s
+    x: object
+        A parameter that is passed through all functions
+    """
+    return {mod}_a{i}
+
+
+d.delete_params('{key}.parameters', 'x', '{mod}_c{i}')
+'''
+
+
+FIRST_FUNCTION_TEMPLATE = '''
+
+@d.get_sections(base='{key}')
+@d.dedent
+def {name}(x=None):
+    """
+    The first function of module {mod}
+
+    Parameters
+    ----------
+    %({parent})s
+    x: object
+        A parameter that is passed through all functions
+    """
+
+
+d.delete_params('{key}.parameters', 'x')
+'''
+
+
+CLASS_TEMPLATE = '''
+
+@d.process_class
+class {name}({base}):
+    """
+    Class {i} of module {mod}
+
+    Parameters
+    ----------
+    %({func})s
+    """
+
+    def method(self, value):
+        """
+        Process a value
+
+        Parameters
+        ----------
+        value: int
+            The value in {name}
+        %({func})s
+        """
+        return value
+'''
+
+
+INIT_TEMPLATE = '''
+"""A synthetic package to benchmark docrep"""
+import docrep
+
+d = docrep.DocstringProcessor()
+d.params['{name}.root.parameters'] = """root: int
+    The root parameter"""
+
+from {name} import {modules}
+'''
+
+
+def derived_key(name, mod, i):
+    """The key of the parameters that function `i` of `mod` passes on"""
+    key = '%s.%s.func%i.parameters.no_x' % (name, mod, i)
+    return key if i == 0 else key + '|%s_c%i' % (mod, i)
+
+
+def generate(path, name, nmodules, nfunctions, nclasses, chain=10):
+    """Generate a synthetic package that uses docrep
+
+    Parameters
+    ----------
+    path: str
+        The directory for the package
+    name: str
+        The name of the package
+    nmodules: int
+        The number of modules
+    nfunctions: int
+        The number of functions per module
+    nclasses: int
+        The number of classes per module
+    chain: int
+        The maximum length of the chains of derived parameters within a
+        module. Every `chain` functions, a new chain starts from the first
+        function of the module
+    """
+    pkg_dir = osp.join(path, name)
+    os.makedirs(pkg_dir)
+    modules = ['mod%i' % i for i in range(nmodules)]
+    with open(osp.join(pkg_dir, '__init__.py'), 'w') as f:
+        f.write(INIT_TEMPLATE.format(name=name, modules=', '.join(modules)))
+    for m, mod in enumerate(modules):
+        lines = ['from %s import d\n' % name]
+        if m == 0:
+            parent = '%s.root.parameters' % name
+        else:
+            # keep one parameter of the last function in the previous module
+            last = nfunctions - 1
+            param = 'mod%i_a%i' % (m - 1, last) if last else 'x'
+            base = '%s.mod%i.func%i.parameters' % (name, m - 1, last)
+            lines.append('\nd.keep_params(%r, %r)\n' % (base, param))
+            parent = base + '.' + param
+        for i in range(nfunctions):
+            key = '%s.%s.func%i' % (name, mod, i)
+            if i == 0:
+                lines.append(FIRST_FUNCTION_TEMPLATE.format(
+                    key=key, name='func0', mod=mod, parent=parent))
+            else:
+                lines.append(FUNCTION_TEMPLATE.format(
+                    key=key, name='func%i' % i, mod=mod, i=i,
+                    parent=derived_key(name, mod, i - 1 if (i - 1) % chain
+                                       else 0)))
+        for i in range(nclasses):
+            j = min(i, nfunctions - 1)
+            base = 'Class%i' % (i - 1) if i else 'object'
+            lines.append(CLASS_TEMPLATE.format(
+                name='Class%i' % i, base=base,
+                i=i, mod=mod, func=derived_key(name, mod, j)))
+        with open(osp.join(pkg_dir, mod + '.py'), 'w') as f:
+            f.write(''.join(lines))
+
+
+def iter_documented(module):
+    """Iterate over the functions, classes and methods of a module"""
+    for obj in vars(module).values():
+        if getattr(obj, '__module__', None) != module.__name__:
+            continue
+        yield obj
+        if isinstance(obj, type):
+            for attr in vars(obj).values():
+                if callable(attr):
+                    yield attr
+
+
+def generate_plain(path, name, docrep_name):
+    """Generate a copy of an imported package without docrep
+
+    The docstrings that docrep rendered are written literally into the source
+    code."""
+    import importlib
+    import warnings
+    sys.path.insert(0, path)
+    warnings.simplefilter('ignore')
+    pkg = importlib.import_module(docrep_name)
+    pkg_dir = osp.join(path, name)
+    os.makedirs(pkg_dir)
+    with open(osp.join(pkg_dir, '__init__.py'), 'w') as f:
+        f.write('from %s import %s\n' % (name, ', '.join(
+            mod for mod in sorted(vars(pkg)) if mod.startswith('mod'))))
+    for modname in sorted(vars(pkg)):
+        if not modname.startswith('mod'):
+            continue
+        module = getattr(pkg, modname)
+        lines = []
+        for obj in iter_documented(module):
+            if isinstance(obj, type):
+                base = obj.__bases__[0]
+                lines.append('\n\nclass %s(%s):\n    %r\n\n'
+                             '    def method(self, value):\n        %r\n'
+                             '        return value\n' % (
+                                 obj.__name__, base.__name__, obj.__doc__,
+                                 obj.method.__doc__))
+            elif obj.__name__.startswith('func'):
+                lines.append('\n\ndef %s(*args, **kwargs):\n    %r\n' % (
+                    obj.__name__, obj.__doc__))
+        with open(osp.join(pkg_dir, modname + '.py'), 'w') as f:
+            f.write(''.join(lines))
+
+
+CHILD_CODE = '''
+import gc, importlib, json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+name = sys.argv[2]
+import docrep  # do not count the import of docrep itself
+gc.collect()
+rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+pkg = importlib.import_module(name)
+elapsed = time.perf_counter() - t0
+rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+doc_bytes = 0
+ndocs = 0
+for modname, mod in list(sys.modules.items()):
+    if not modname.startswith(name + '.'):
+        continue
+    for obj in vars(mod).values():
+        if getattr(obj, '__module__', None) != modname:
+            continue
+        objs = [obj] + ([v for v in vars(obj).values() if callable(v)]
+                        if isinstance(obj, type) else [])
+        for o in objs:
+            if o.__doc__:
+                ndocs += 1
+                doc_bytes += len(o.__doc__.encode('utf-8'))
+d = getattr(pkg, 'd', None)
+print(json.dumps({
+    'import_time': elapsed,
+    'maxrss_mib': rss1 / 1024.,
+    'maxrss_increase_mib': (rss1 - rss0) / 1024.,
+    'docs': ndocs,
+    'doc_bytes': doc_bytes,
+    'params_keys': len(d.params) if d is not None else 0,
+    'params_chars': d.stats()['params_chars'] if d is not None else 0,
+}))
+'''
+
+
+def clear_cache(pkg_dir):
+    shutil.rmtree(osp.join(pkg_dir, '__pycache__'), ignore_errors=True)
+    for fname in os.listdir(pkg_dir):
+        if fname.endswith('.pyc'):
+            os.remove(osp.join(pkg_dir, fname))
+
+
+def measure(path, name, cold):
+    """Import a package in a fresh interpreter and measure the import"""
+    if cold:
+        clear_cache(osp.join(path, name))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [osp.dirname(osp.dirname(osp.abspath(__file__)))] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output(
+        [sys.executable, '-W', 'ignore', '-c', CHILD_CODE, path, name],
+        env=env)
+    return json.loads(out.decode('utf-8'))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-m', '--modules', type=int, default=100,
+                        help="Number of modules. Default: %(default)s")
+    parser.add_argument(
+        '-f', '--functions', type=int, default=100,
+        help="Number of functions per module. Default: %(default)s")
+    parser.add_argument('-c', '--classes', type=int, default=10,
+                        help="Number of classes per module. Default: "
+                        "%(default)s")
+    parser.add_argument(
+        '--chain', type=int, default=10,
+        help="Maximum length of the chains of derived parameters. "
+        "Default: %(default)s")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="Number of warm imports. Default: %(default)s")
+    parser.add_argument('-o', '--output', help="JSON file for the results")
+    parser.add_argument('--keep', help="Directory for the generated packages. "
+                        "If not set, a temporary directory is used and "
+                        "removed afterwards")
+    args = parser.parse_args(args)
+
+    path = args.keep or tempfile.mkdtemp()
+    if args.keep and not osp.exists(path):
+        os.makedirs(path)
+    try:
+        generate(path, 'docrep_synth', args.modules, args.functions,
+                 args.classes, args.chain)
+        # generate the plain package in a separate process to not increase
+        # the maximum resident set size that the measurements inherit
+        proc = multiprocessing.get_context('spawn').Process(
+            target=generate_plain,
+            args=(path, 'docrep_synth_plain', 'docrep_synth'))
+        proc.start()
+        proc.join()
+        if proc.exitcode:
+            raise RuntimeError("Failed to generate the plain package")
+        results = {'config': {'modules': args.modules,
+                              'functions': args.functions,
+                              'classes': args.classes,
+                              'chain': args.chain,
+                              'python': sys.version.split()[0]}}
+        print('%-8s %-5s %12s %14s %10s %12s' % (
+            'package', 'mode', 'import [s]', 'max RSS [MiB]', 'docs',
+            'doc [MiB]'))
+        for variant, name in [('docrep', 'docrep_synth'),
+                              ('plain', 'docrep_synth_plain')]:
+            cold = measure(path, name, cold=True)
+            warm = [measure(path, name, cold=False)
+                    for i in range(args.repeat)]
+            warm = min(warm, key=lambda r: r['import_time'])
+            results[variant] = {'cold': cold, 'warm': warm}
+            for mode, r in [('cold', cold), ('warm', warm)]:
+                print('%-8s %-5s %12.3f %14.1f %10i %12.2f' % (
+                    variant, mode, r['import_time'], r['maxrss_mib'],
+                    r['docs'], r['doc_bytes'] / 1024. ** 2))
+        overhead = (results['docrep']['warm']['import_time'] -
+                    results['plain']['warm']['import_time'])
+        nfuncs = args.modules * args.functions
+        print('\ndocrep overhead (warm): %.3f s, %.1f us per function' % (
+            overhead, overhead / nfuncs * 1e6))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=1, sort_keys=True)
+    finally:
+        if not args.keep:
+            shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,12 +17,30 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import six
+import atexit
+import copy
+import functools
+import heapq
 import inspect
+import importlib
+import io
+import json
+import os.path as osp
+import pkgutil
 import re
+import sys
+import weakref
+from collections import OrderedDict
 from warnings import warn
+from six.moves import collections_abc
 
+from docrep.tracing import (
+    traced, traceable, labelled, object_label, Tracer)
 from docrep.decorators import (
-    updates_docstring, reads_docstring, deprecated)
+    updates_docstring, reads_docstring, derives_params, deprecated,
+    _set_object_doc)
+from docrep.backends import (
+    ParamsBackend, DictBackend, ChainedParams, SharedMemoryParams, LazyValue)
 
 
 __version__ = '0.3.2'
@@ -31,6 +49,7 @@ __author__ = 'Philipp Sommer'
 
 
 __all__ = [
+    "CircularReferenceError",
     "safe_modulo",
     "delete_params",
     "delete_types",
@@ -49,6 +68,33 @@ substitution_pattern = re.compile(
 summary_patt = re.compile(r'(?s).*?(?=(\n\s*\n)|$)')
 
 
+_content_patt = re.compile(r'\S')
+
+
+_param_section_end_patt = re.compile(r'\n\n\S')
+
+
+#: The counters of :meth:`DocstringProcessor.stats` and their descriptions
+stat_counters = OrderedDict([
+    ('renders', 'Number of rendered docstrings'),
+    ('rendered_chars', 'Number of characters of the rendered docstrings'),
+    ('missing_keys', 'Number of placeholders with an invalid key'),
+    ('selector_cache_hits', 'Number of selector results from the cache'),
+    ('selector_cache_misses', 'Number of computed selector results'),
+    ('ref_cache_hits', 'Number of cached references that were used'),
+    ('ref_cache_misses', 'Number of extracted references'),
+    ('template_cache_hits', 'Number of cached templates that were used'),
+    ('template_cache_misses', 'Number of rendered templates'),
+])
+
+
+#: The gauges of :meth:`DocstringProcessor.stats` and their descriptions
+stat_gauges = OrderedDict([
+    ('keys_stored', 'Number of keys stored in the processor'),
+    ('params_chars', 'Number of characters of the stored parameters'),
+])
+
+
 class _StrWithIndentation(object):
     """A convenience class that indents the given string if requested through
     the __str__ method"""
@@ -64,7 +110,267 @@ class _StrWithIndentation(object):
         return repr(self._indent.join(self._s.splitlines()))
 
 
-def safe_modulo(s, meta, checked='', print_warning=True, stacklevel=2):
+class _SectionView(LazyValue):
+    """A section of a docstring that is only copied when it is needed
+
+    Parameters
+    ----------
+    source: str
+        The (dedented) docstring that contains the section
+    start: int
+        The start of the section in `source`
+    end: int
+        The end of the section in `source`. Trailing whitespace is stripped
+        when the view is materialized"""
+
+    __slots__ = ('source', 'start', 'end')
+
+    def __init__(self, source, start, end):
+        self.source = source
+        self.start = start
+        self.end = end
+
+    def materialize(self):
+        source, start, end = self.source, self.start, self.end
+        while end > start and source[end - 1].isspace():
+            end -= 1
+        return source[start:end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return '<%s of %r>' % (self.__class__.__name__, self.materialize())
+
+
+class _SectionRef(LazyValue):
+    """A reference to a section of the docstring of another object
+
+    The section is only extracted (and the parameters selected) when the
+    reference is materialized. The result is cached in the `cache` of the
+    processor that created the reference.
+
+    Parameters
+    ----------
+    processor: DocstringProcessor
+        The processor that extracts the section
+    obj: object or str
+        The object whose ``__doc__`` to use (or the docstring itself)
+    section: str
+        The name of the section
+    keep: tuple of str
+        If not None, only these parameters are kept
+    drop: tuple of str
+        If not None, the parameters to remove"""
+
+    __slots__ = ('processor', 'obj', 'section', 'keep', 'drop')
+
+    def __init__(self, processor, obj, section, keep=None, drop=None):
+        self.processor = processor
+        self.obj = obj
+        self.section = section
+        self.keep = keep
+        self.drop = drop
+
+    def materialize(self):
+        processor = self.processor
+        cache_key = (self.obj, self.section, self.keep, self.drop)
+        try:
+            ret = processor._ref_cache[cache_key]
+        except KeyError:
+            processor._counters['ref_cache_misses'] += 1
+        else:
+            processor._counters['ref_cache_hits'] += 1
+            return ret
+        s = self.obj
+        if not isinstance(s, six.string_types):
+            s = s.__doc__ or ''
+        ret = processor._get_section(processor._remove_summary(s),
+                                     self.section)
+        if self.keep is not None:
+            ret = keep_params(ret, *self.keep)
+        if self.drop is not None:
+            ret = delete_params(ret, *self.drop)
+        processor._ref_cache[cache_key] = ret
+        return ret
+
+    def __repr__(self):
+        return '<%s to %s of %r>' % (
+            self.__class__.__name__, self.section,
+            getattr(self.obj, '__qualname__',
+                    getattr(self.obj, '__name__', self.obj)))
+
+
+class CircularReferenceError(ValueError):
+    """A parameter of the :class:`DocstringProcessor` references itself"""
+    pass
+
+
+class _NestedParams(collections_abc.Mapping):
+    """A read-only view on a mapping that expands nested placeholders
+
+    Values that contain placeholders like ``%(other.key)s`` are substituted
+    with the (expanded) values of the mapping. Each value is only expanded
+    once per view. Escaped percent signs (``%%``) are kept as they are, like
+    in the values that do not contain placeholders."""
+
+    def __init__(self, params, stacklevel=2, on_missing=None,
+                 print_warning=True):
+        self._params = params
+        self._stacklevel = stacklevel
+        self._on_missing = on_missing
+        self._print_warning = print_warning
+        self._expanded = {}
+        self._stack = []
+
+    def __getitem__(self, key):
+        try:
+            return self._expanded[key]
+        except KeyError:
+            pass
+        value = self._params[key]
+        if (isinstance(value, six.string_types) and
+                substitution_pattern.search(value)):
+            if key in self._stack:
+                raise CircularReferenceError(
+                    "Circular reference in the parameters: " + ' -> '.join(
+                        map(repr, self._stack[self._stack.index(key):] +
+                            [key])))
+            self._stack.append(key)
+            try:
+                value = safe_modulo(value.replace('%%', '%%%%'), self,
+                                    print_warning=self._print_warning,
+                                    stacklevel=self._stacklevel + 1,
+                                    on_missing=self._on_missing)
+            finally:
+                self._stack.pop()
+        self._expanded[key] = value
+        return value
+
+    def __contains__(self, key):
+        return key in self._params
+
+    def __iter__(self):
+        return iter(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+
+class _IndentedParams(collections_abc.Mapping):
+    """A read-only view on a mapping that indents the values on access"""
+
+    def __init__(self, params, indent=0):
+        self._params = params
+        self._indent = indent
+
+    def __getitem__(self, key):
+        return _StrWithIndentation(self._params[key], self._indent)
+
+    def __contains__(self, key):
+        return key in self._params
+
+    def __iter__(self):
+        return iter(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+
+def _is_docrep_frame(frame):
+    modname = frame.f_globals.get('__name__', '')
+    return modname == __name__ or modname.startswith(__name__ + '.')
+
+
+def _external_stacklevel(stacklevel):
+    """Make sure that a warning does not point to a frame inside docrep
+
+    Parameters
+    ----------
+    stacklevel: int
+        The stacklevel for :func:`warnings.warn`, relative to the caller of
+        this function
+
+    Returns
+    -------
+    int
+        `stacklevel`, increased such that it points to the first frame outside
+        of docrep"""
+    try:
+        frame = sys._getframe(stacklevel)
+    except ValueError:  # call stack is not deep enough
+        return stacklevel
+    while frame is not None and _is_docrep_frame(frame):
+        frame = frame.f_back
+        stacklevel += 1
+    return stacklevel if frame is not None else stacklevel - 1
+
+
+def _external_origin():
+    """Get the file name and line number of the first frame outside docrep"""
+    frame = sys._getframe(1)
+    while frame is not None and _is_docrep_frame(frame):
+        frame = frame.f_back
+    if frame is None:
+        return '<unknown>', 0
+    return frame.f_code.co_filename, frame.f_lineno
+
+
+def _take_snapshot():
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        raise RuntimeError(
+            "tracemalloc is not tracing memory allocations. Start it via "
+            "tracemalloc.start(25) before processing the docstrings.")
+    return tracemalloc.take_snapshot()
+
+
+def _traced_sizes(snapshot):
+    """Get the memory that has been allocated by docrep per calling module
+
+    Each memory block in the :mod:`tracemalloc` `snapshot`, that has been
+    allocated within docrep, is attributed to the first frame outside of
+    docrep. Blocks that have been allocated while importing a module are
+    ignored."""
+    docrep_dir = osp.dirname(osp.abspath(__file__)) + osp.sep
+    modules = {}
+    for modname, mod in list(sys.modules.items()):
+        fname = getattr(mod, '__file__', None)
+        if fname:
+            modules.setdefault(osp.abspath(fname), modname)
+    ret = {}
+    for trace in snapshot.traces:
+        in_docrep = False
+        # the frames are sorted from the oldest to the most recent frame
+        for frame in reversed(trace.traceback):
+            fname = frame.filename
+            if fname.startswith(docrep_dir):
+                in_docrep = True
+            elif fname.startswith('<frozen importlib'):
+                # a module that is imported by docrep or imports docrep
+                break
+            elif in_docrep:
+                modname = modules.get(osp.abspath(fname))
+                ret[modname] = ret.get(modname, 0) + trace.size
+                break
+    return ret
+
+
+def _report_missing_at_exit(ref):
+    processor = ref()
+    if processor is not None:
+        processor.report_missing()
+
+
+@traced('warning')
+def _warn_invalid_key(key, stacklevel):
+    warn("%r is not a valid key!" % key, SyntaxWarning,
+         _external_stacklevel(stacklevel + 1))
+
+
+@traced('safe_modulo')
+def safe_modulo(s, meta, checked='', print_warning=True, stacklevel=2,
+                on_missing=None):
     """Safe version of the modulo operation (%) of strings
 
     Parameters
@@ -82,6 +388,9 @@ def safe_modulo(s, meta, checked='', print_warning=True, stacklevel=2):
         If True and a key is not existent in `s`, a warning is raised
     stacklevel: int
         The stacklevel for the :func:`warnings.warn` function
+    on_missing: callable
+        A function that is called with each key in `s` that is not existent
+        in `meta`
 
 
     Examples
@@ -103,30 +412,37 @@ def safe_modulo(s, meta, checked='', print_warning=True, stacklevel=2):
     """
     try:
         return s % meta
+    except CircularReferenceError:
+        raise
     except (ValueError, TypeError, KeyError):
         # replace the missing fields by %%
         keys = substitution_pattern.finditer(s)
         for m in keys:
             key = m.group('key')
-            if not isinstance(meta, dict) or key not in meta:
+            if (not isinstance(meta, collections_abc.Mapping) or
+                    key not in meta):
+                if on_missing is not None:
+                    on_missing(key)
                 if print_warning:
-                    warn("%r is not a valid key!" % key, SyntaxWarning,
-                         stacklevel)
+                    _warn_invalid_key(key, stacklevel + 1)
                 full = m.group()
                 s = s.replace(full, '%' + full)
         if 'KEY' not in checked:
             return safe_modulo(s, meta, checked=checked + 'KEY',
                                print_warning=print_warning,
-                               stacklevel=stacklevel)
-        if not isinstance(meta, dict) or 'VALUE' in checked:
+                               stacklevel=stacklevel, on_missing=on_missing)
+        if (not isinstance(meta, collections_abc.Mapping) or
+                'VALUE' in checked):
             raise
         s = re.sub(r"""(?<!%)(%%)*%(?!%) # uneven number of %
                     \s*(\w|$)         # format strings""", r'%\g<0>', s,
                    flags=re.VERBOSE)
         return safe_modulo(s, meta, checked=checked + 'VALUE',
-                           print_warning=print_warning, stacklevel=stacklevel)
+                           print_warning=print_warning, stacklevel=stacklevel,
+                           on_missing=on_missing)
 
 
+@traced('delete_params')
 def delete_params(s, *params):
     """
     Delete the given parameters from a string.
@@ -151,6 +467,7 @@ def delete_params(s, *params):
     return re.sub(patt, '', '\n' + s.strip() + '\n').strip()
 
 
+@traced('delete_types')
 def delete_types(s, *types):
     """
     Delete the given types from a string.
@@ -175,6 +492,7 @@ def delete_types(s, *types):
     return re.sub(patt, '', '\n' + s.strip() + '\n',).strip()
 
 
+@traced('delete_kwargs')
 def delete_kwargs(s, args=None, kwargs=None):
     """
     Delete the ``*args`` or ``**kwargs`` part from the parameters section.
@@ -207,6 +525,7 @@ def delete_kwargs(s, args=None, kwargs=None):
     return delete_types(s, *types)
 
 
+@traced('keep_params')
 def keep_params(s, *params):
     """
     Keep the given parameters from a string.
@@ -231,6 +550,7 @@ def keep_params(s, *params):
     return ''.join(re.findall(patt, '\n' + s.strip() + '\n')).rstrip()
 
 
+@traced('keep_types')
 def keep_types(s, *types):
     """
     Keep the given types from a string.
@@ -255,6 +575,205 @@ def keep_types(s, *types):
     return ''.join(re.findall(patt, '\n' + s.strip() + '\n')).rstrip()
 
 
+#: Functions for the selectors in placeholders like ``%(key|keep:a,b)s``
+selectors = {
+    'keep': keep_params,
+    'drop': delete_params,
+    'keep_types': keep_types,
+    'drop_types': delete_types,
+}
+
+
+def _split_selectors(key):
+    """Split a key like ``'base|keep:a,b|drop:a'`` into base and selectors
+
+    Returns
+    -------
+    str
+        The base key
+    list of tuple
+        The name and the arguments of the selectors"""
+    if '|' not in key or ':' not in key:
+        return key, []
+    parts = key.split('|')
+    ret = []
+    while len(parts) > 1:
+        name, sep, args = parts[-1].partition(':')
+        name = name.strip()
+        if not sep or name not in selectors:
+            break
+        ret.insert(0, (name, [arg.strip() for arg in args.split(',')
+                              if arg.strip()]))
+        parts.pop()
+    return '|'.join(parts), ret
+
+
+class _SelectorParams(collections_abc.Mapping):
+    """A read-only view on a mapping that resolves selectors in the keys
+
+    Keys like ``'base|keep:a,b'`` or ``'base|drop:c'`` that are not in the
+    mapping are computed from the value of ``'base'`` with the corresponding
+    function in :data:`selectors`. The results are stored in `cache` and the
+    cache hits and misses are counted in `counters`."""
+
+    def __init__(self, params, cache, counters):
+        self._params = params
+        self._cache = cache
+        self._counters = counters
+
+    def __getitem__(self, key):
+        try:
+            return self._params[key]
+        except KeyError:
+            base, sels = _split_selectors(key)
+            if not sels:
+                raise
+        value = self._params[base]
+        try:
+            source, ret = self._cache[key]
+        except KeyError:
+            pass
+        else:
+            if source is value or source == value:
+                self._counters['selector_cache_hits'] += 1
+                return ret
+        self._counters['selector_cache_misses'] += 1
+        ret = value
+        for name, args in sels:
+            ret = selectors[name](ret, *args)
+        self._cache[key] = (value, ret)
+        return ret
+
+    def __contains__(self, key):
+        if key in self._params:
+            return True
+        base, sels = _split_selectors(key)
+        return bool(sels) and base in self._params
+
+    def __iter__(self):
+        return iter(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+
+class _RecordingParams(ParamsBackend):
+    """A view on the parameters that records the keys that are read
+
+    Parameters
+    ----------
+    local: ParamsBackend
+        The parameters of the processor
+    accessed: set
+        The set for the keys that are read"""
+
+    def __init__(self, local, accessed):
+        self.local = local
+        self.accessed = accessed
+
+    @property
+    def supports_lazy_values(self):
+        return getattr(self.local, 'supports_lazy_values', False)
+
+    def __getitem__(self, key):
+        value = self.local[key]
+        self.accessed.add(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.local[key] = value
+
+    def __delitem__(self, key):
+        del self.local[key]
+
+    def __contains__(self, key):
+        return key in self.local
+
+    def __iter__(self):
+        return iter(self.local)
+
+    def __len__(self):
+        return len(self.local)
+
+    def update(self, *args, **kwargs):
+        self.local.update(*args, **kwargs)
+
+
+class _AccessRecorder(object):
+    """Context manager for :meth:`DocstringProcessor.record_access`"""
+
+    def __init__(self, processor, fname=None):
+        self.processor = processor
+        self.fname = fname
+        #: The keys that have been read
+        self.keys = set()
+        #: The labels of the objects whose docstrings have been rendered
+        self.objects = set()
+
+    def __enter__(self):
+        processor = self.processor
+        # positional parameters are used as they are
+        if isinstance(processor.params, collections_abc.Mapping):
+            processor.params = _RecordingParams(processor.params, self.keys)
+        processor._access = self
+        return self
+
+    def __exit__(self, *args):
+        processor = self.processor
+        if isinstance(processor.params, _RecordingParams):
+            processor.params = processor.params.local
+        processor._access = None
+        if self.fname is not None:
+            self.save(self.fname)
+
+    def get_profile(self):
+        """Get the access profile
+
+        Returns
+        -------
+        dict
+            The sorted lists of the accessed ``'keys'``, the rendered
+            ``'objects'`` and the stored keys that have not been accessed
+            (``'unused_keys'``)"""
+        stored = self.processor._own_params()
+        if not isinstance(stored, collections_abc.Mapping):
+            stored = ()
+        return {
+            'keys': sorted(self.keys),
+            'objects': sorted(self.objects),
+            'unused_keys': sorted(key for key in stored
+                                  if key not in self.keys),
+            }
+
+    def save(self, fname):
+        """Save the :meth:`get_profile` as JSON to `fname`"""
+        with io.open(fname, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(json.dumps(self.get_profile(), indent=1)))
+
+
+def _base_label(self, s, base=None, *args, **kwargs):
+    return base
+
+
+def _delete_params_key(base_key, *params):
+    return base_key + '.no_' + '|'.join(params)
+
+
+def _delete_kwargs_key(base_key, args=None, kwargs=None):
+    if not args and not kwargs:
+        return None
+    return base_key + '.no' + ('_args' if args else '') + (
+        '_kwargs' if kwargs else '')
+
+
+def _types_key(base_key, out_key, *types):
+    return '%s.%s' % (base_key, out_key)
+
+
+def _keep_params_key(base_key, *params):
+    return base_key + '.' + '|'.join(params)
+
+
 # assign delete_params a new name for the deprecation of the corresponding
 # DocstringProcessor method
 _delete_params_s = lambda s, params: delete_params(s, *params)
@@ -264,6 +783,211 @@ _keep_params_s = lambda s, params: keep_params(s, *params)
 _keep_types_s = lambda s, types: keep_types(s, *types)
 
 
+class _SectionMatchers(collections_abc.Mapping):
+    """The compiled patterns for the sections of a
+    :class:`DocstringProcessor`
+
+    This mapping from section name to the pattern that extracts the section
+    compiles the patterns when they are requested for the first time.
+
+    Parameters
+    ----------
+    param_like_sections: tuple of str
+        The :attr:`DocstringProcessor.param_like_sections`
+    text_sections: tuple of str
+        The :attr:`DocstringProcessor.text_sections`
+    base: _SectionMatchers
+        Other matchers whose patterns for the param-like sections shall be
+        reused"""
+
+    def __init__(self, param_like_sections, text_sections, base=None):
+        self.param_like_sections = param_like_sections
+        self.text_sections = text_sections
+        all_sections_patt = '|'.join(
+            '%s\n%s\n' % (s, '-'*len(s))
+            for s in param_like_sections + text_sections)
+        self._all_sections_patt_str = all_sections_patt
+        self.all_sections_patt = re.compile(all_sections_patt)
+        self.extended_summary_patt = re.compile(
+            '(?s)(.+?)(?=%s|$)' % all_sections_patt)
+        self._compiled = {}
+        if base is not None:
+            # the patterns of param-like sections do not depend on the others
+            self._compiled.update(
+                (section, patt) for section, patt in six.iteritems(
+                    base._compiled) if section in param_like_sections)
+
+    def __getitem__(self, section):
+        try:
+            return self._compiled[section]
+        except KeyError:
+            pass
+        if section in self.param_like_sections:
+            patt = re.compile(
+                r'(?s)(?<=%s\n%s\n)(.+?)(?=\n\n\S+|$)' % (
+                    section, '-'*len(section)))
+        elif section in self.text_sections:
+            patt = re.compile(
+                '(?s)(?<=%s\n%s\n)(.+?)(?=%s|$)' % (
+                    section, '-'*len(section), self._all_sections_patt_str))
+        else:
+            raise KeyError(section)
+        self._compiled[section] = patt
+        return patt
+
+    def __iter__(self):
+        return iter(self.param_like_sections + self.text_sections)
+
+    def __len__(self):
+        return len(self.param_like_sections) + len(self.text_sections)
+
+
+class _SectionPatterns(collections_abc.MutableMapping):
+    """The section patterns of one :class:`DocstringProcessor`
+
+    A copy-on-write layer on the shared :class:`_SectionMatchers`. Patterns
+    that are set (or deleted) only affect this processor.
+
+    Parameters
+    ----------
+    matchers: _SectionMatchers
+        The shared compiled patterns
+    overrides: dict
+        The patterns of this processor that replace the shared ones. A value
+        of None means that the section has been deleted"""
+
+    def __init__(self, matchers, overrides=None):
+        self.matchers = matchers
+        self._overrides = dict(overrides or {})
+
+    def __getitem__(self, section):
+        try:
+            patt = self._overrides[section]
+        except KeyError:
+            return self.matchers[section]
+        if patt is None:
+            raise KeyError(section)
+        return patt
+
+    def __setitem__(self, section, patt):
+        self._overrides[section] = patt
+
+    def __delitem__(self, section):
+        if section not in self:
+            raise KeyError(section)
+        self._overrides[section] = None
+
+    def __contains__(self, section):
+        try:
+            patt = self._overrides[section]
+        except KeyError:
+            return section in self.matchers
+        return patt is not None
+
+    def __iter__(self):
+        overrides = self._overrides
+        for section in self.matchers:
+            if overrides.get(section, True) is not None:
+                yield section
+        for section, patt in six.iteritems(overrides):
+            if patt is not None and section not in self.matchers:
+                yield section
+
+    def __len__(self):
+        return sum(1 for section in self)
+
+    def copy(self):
+        return self.__class__(self.matchers, self._overrides)
+
+
+#: The compiled :class:`_SectionMatchers` for the combinations of
+#: :attr:`DocstringProcessor.param_like_sections` and
+#: :attr:`DocstringProcessor.text_sections`
+_section_matchers = {}
+
+
+class _DeferredOperation(object):
+    """An operation of the :class:`DocstringProcessor` in deferred mode
+
+    Parameters
+    ----------
+    func: callable
+        The undecorated method of the :class:`DocstringProcessor`
+    obj: object
+        The object whose docstring is read or updated (or None, if the
+        operation only derives a new key from the params)
+    args: tuple
+        The positional arguments for `func` (without the docstring)
+    kwargs: dict
+        The keyword arguments for `func`
+    prefix: str
+        The base of the keys that are stored by the operation
+    key: str
+        The key that is stored by the operation
+    consumes: list of str
+        The keys that are used by the operation"""
+
+    __slots__ = ('func', 'obj', 'args', 'kwargs', 'prefix', 'key',
+                 'consumes')
+
+    def __init__(self, func, obj, args, kwargs, prefix=None, key=None,
+                 consumes=()):
+        self.func = func
+        self.obj = obj
+        self.args = args
+        self.kwargs = kwargs
+        self.prefix = prefix
+        self.key = key
+        self.consumes = consumes
+
+    def __call__(self, processor):
+        func, obj = self.func, self.obj
+        if obj is None:
+            labelled(self.key, func, processor, *self.args, **self.kwargs)
+        elif self.prefix is not None:
+            labelled(obj, func, processor, obj.__doc__, *self.args,
+                     **self.kwargs)
+        else:
+            doc = labelled(obj, func, processor, obj.__doc__, *self.args,
+                           **self.kwargs)
+            processor._set_doc(obj, doc)
+
+
+def _unwrap_method(obj):
+    """Get the function of a static or class method"""
+    if isinstance(obj, (staticmethod, classmethod)):
+        return obj.__func__
+    return obj
+
+
+def _iter_documented(namespace, modname, seen):
+    """Iterate over the documentable objects of a module or class namespace
+
+    Parameters
+    ----------
+    namespace: dict
+        The ``__dict__`` of the module or class
+    modname: str
+        The name of the module. Objects from other modules are ignored
+    seen: set
+        The ids of the objects that have already been visited"""
+    for obj in list(six.itervalues(namespace)):
+        obj = _unwrap_method(obj)
+        if id(obj) in seen:
+            continue
+        if inspect.isclass(obj) or inspect.isfunction(obj):
+            if getattr(obj, '__module__', None) != modname:
+                continue
+        elif not isinstance(obj, property):
+            continue
+        seen.add(id(obj))
+        yield obj
+        if inspect.isclass(obj):
+            for child in _iter_documented(vars(obj), modname, seen):
+                yield child
+
+
+@traceable
 class DocstringProcessor(object):
     """Class that is intended to process docstrings.
 
@@ -340,230 +1064,1631 @@ class DocstringProcessor(object):
         --------
         Some dummy example doc
 
-    Another example uses non-dedented docstrings::
+    Another example uses non-dedented docstrings::
+
+        >>> @d.get_sections(base='not_dedented')
+        ... def doc_test2(a=1):
+        ...     '''That's the summary
+        ...
+        ...     Parameters
+        ...     ----------
+        ...     a: int, optional
+        ...         A dummy parameter description'''
+        ...     print(a)
+
+    These sections must then be used with the :meth:`with_indent` method to
+    indent the inserted parameters::
+
+        >>> @d.with_indent(4)
+        ... def second_test2(a=1):
+        ...     '''
+        ...     My second function where I want to use the docstring from
+        ...     above
+        ...
+        ...     Parameters
+        ...     ----------
+        ...     %(not_dedented.parameters)s'''
+        ...     pass
+
+    """
+
+    #: Mapping containing the compiled patterns to identify the Parameters,
+    #: Other Parameters, Warnings and Notes sections in a docstring. The
+    #: compiled patterns are shared between all processors with the same
+    #: sections, but patterns that are set in this mapping only affect this
+    #: processor
+    patterns = {}
+
+    #: :class:`dict`. Dictionary containing the parameters that are used in for
+    #: substitution. By default, this is a :class:`docrep.backends.DictBackend`
+    #: (a subclass of :class:`dict`, see :attr:`params_backend`)
+    params = {}
+
+    #: sections that behave the same as the `Parameter` section by defining a
+    #: list
+    param_like_sections = ['Parameters', 'Other Parameters', 'Returns',
+                           'Raises']
+    #: sections that include (possibly not list-like) text
+    text_sections = ['Warnings', 'Notes', 'Examples', 'See Also',
+                     'References']
+
+    #: The action on how to react on classes in python 2
+    #:
+    #: When calling::
+    #:
+    #:     >>> @docstrings
+    #:     ... class NewClass(object):
+    #:     ...     """%(replacement)s"""
+    #:
+    #: This normaly raises an AttributeError, because the ``__doc__`` attribute
+    #: of a class in python 2 is not writable. This attribute may be one of
+    #: ``'ignore', 'raise' or 'warn'``
+    python2_classes = 'ignore'
+
+    #: The factory for the storage of the :attr:`params`. It is called with
+    #: the initial parameters and must return a
+    #: :class:`docrep.backends.ParamsBackend` (see also
+    #: :meth:`set_params_backend`)
+    params_backend = DictBackend
+
+    #: If True, the decorators of this processor do not process the docstrings
+    #: immediately but queue them until :meth:`resolve` is called. This allows
+    #: to use keys in a docstring that are registered later (see
+    #: :meth:`resolve`)
+    deferred = False
+
+    #: If True, placeholders in the values of the :attr:`params` are expanded,
+    #: too, when they are inserted into a docstring (see also
+    #: :meth:`expand_params`)
+    expand_nested = False
+
+    #: What to do with invalid keys in a docstring. ``'warn'`` raises a
+    #: warning for every invalid key, ``'collect'`` records the invalid keys
+    #: and their origin to report them at once via :meth:`report_missing` and
+    #: ``'ignore'`` leaves the invalid keys silently in the docstring
+    missing_keys = 'warn'
+
+    def __init__(self, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        ``*args``
+            Positional parameters that shall be used for the substitution. Note
+            that you can only provide either ``*args`` or ``**kwargs``,
+            furthermore most of the methods like `get_sections` require
+            ``**kwargs`` to be provided (if any).
+        ``**kwargs``
+            Initial parameters to use
+        """
+        if args and kwargs:
+            raise ValueError("Only positional or keyword args are allowed")
+        self.params = args or self.params_backend(kwargs)
+        self._set_section_matchers()
+        self._parent_sections = weakref.WeakKeyDictionary()
+        self._processed_classes = weakref.WeakSet()
+        self._deferred_ops = []
+        self._selector_cache = {}
+        self._ref_cache = {}
+        self._counters = dict.fromkeys(stat_counters, 0)
+        self._missing = OrderedDict()
+        self._report_at_exit = False
+        self._rendered = weakref.WeakKeyDictionary()
+        self._access = None
+
+    def _set_section_matchers(self, base=None):
+        """Get the compiled patterns for the sections of this processor"""
+        key = (tuple(self.param_like_sections), tuple(self.text_sections))
+        try:
+            matchers = _section_matchers[key]
+        except KeyError:
+            matchers = _section_matchers[key] = _SectionMatchers(
+                key[0], key[1], base)
+        patterns = self.__dict__.get('patterns')
+        if isinstance(patterns, _SectionPatterns):
+            patterns.matchers = matchers
+        else:
+            # a plain mapping (e.g. of a subclass) overrides the shared
+            # patterns
+            self.patterns = _SectionPatterns(matchers, self.patterns)
+        self._extended_summary_patt = matchers.extended_summary_patt
+        self._all_sections_patt = matchers.all_sections_patt
+
+    def add_section(self, section, param_like=True):
+        """
+        Add a section that can be extracted with :meth:`get_sections`.
+
+        This method adds a new section to the :attr:`param_like_sections` or
+        :attr:`text_sections` of this processor only. Contrary to
+        subclassing, only the patterns that depend on the new section are
+        compiled.
+
+        Parameters
+        ----------
+        section: str
+            The name of the section (e.g. ``'Rules'``)
+        param_like: bool
+            If True, the section contains a list like the ``'Parameters'``
+            section (see :attr:`param_like_sections`). Otherwise it is a
+            text section (see :attr:`text_sections`)
+
+        Examples
+        --------
+        ::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> d.add_section('Rules')
+            >>> @d.get_sections(base='increase', sections=['Rules'])
+            ... def increase(b):
+            ...     '''Increase a number.
+            ...
+            ...     Rules
+            ...     -----
+            ...     greater_0
+            ...         The input parameter b must be greater than zero!'''
+            >>> print(d.params['increase.rules'])
+            greater_0
+                The input parameter b must be greater than zero!
+        """
+        if (section in self.param_like_sections or
+                section in self.text_sections):
+            return
+        if param_like:
+            self.param_like_sections = self.param_like_sections + [section]
+        else:
+            self.text_sections = self.text_sections + [section]
+        self._set_section_matchers(getattr(self.patterns, 'matchers', None))
+
+    @updates_docstring
+    @traced('__call__')
+    def __call__(self, s):
+        """
+        Substitute in a docstring of a function with :attr:`params`.
+
+        Parameters
+        ----------
+        func: function
+            function with the documentation whose sections
+            shall be inserted from the :attr:`params` attribute
+
+        See Also
+        --------
+        dedent: also dedents the doc
+        with_indent: also indents the doc
+        """
+        return self._substitute(s, self._render_params(), stacklevel=3)
+
+    @reads_docstring
+    @traced('get_sections', label=_base_label)
+    def get_sections(self, s, base=None,
+                     sections=['Parameters', 'Other Parameters']):
+        r"""Exctract sections out of a docstring.
+
+        This method extracts the specified `sections` out of the given string
+        if (and only if) the docstring follows the numpy documentation
+        guidelines [1]_. Note that the section either must appear in the
+        :attr:`param_like_sections` or the :attr:`text_sections` attribute.
+
+        Parameters
+        ----------
+        s: str
+            Docstring to split
+        base: str
+            base to use in the :attr:`sections` attribute
+        sections: list of str
+            sections to look for. Each section must be followed by a newline
+            character ('\n') and a bar of '-' (following the numpy (napoleon)
+            docstring conventions).
+
+        Returns
+        -------
+        dict
+            A mapping from section identifier to section string
+
+        References
+        ----------
+        .. [1] https://github.com/numpy/numpy/blob/master/doc/HOWTO_DOCUMENT.rst.txt
+
+        See Also
+        --------
+        delete_params, keep_params, delete_types, keep_types, delete_kwargs:
+            For manipulating the docstring sections
+        save_docstring:
+            for saving an entire docstring
+        """
+        # Remove the summary and dedent the rest
+        s = self._remove_summary(s)
+
+        if base:
+            # store all sections at once to allow batched writes in the
+            # params backend. If possible, we only store views on the
+            # docstring that are copied when they are accessed
+            lazy = getattr(self.params, 'supports_lazy_values', False)
+            self.params.update(
+                ('%s.%s' % (base, section.lower().replace(' ', '_')),
+                 self._get_section(s, section, lazy))
+                for section in sections)
+        return s
+
+    def extract_many(self, objects,
+                     sections=['Parameters', 'Other Parameters'], base=None):
+        """Extract sections out of many docstrings at once.
+
+        This method is the batch version of :meth:`get_sections`. Each
+        docstring is scanned only once for all section headers (instead of
+        once per section) and the :attr:`params` are updated in one step.
+
+        Parameters
+        ----------
+        objects: list of str or objects
+            The docstrings or the objects whose ``__doc__`` to use
+        sections: list of str
+            sections to look for (see :meth:`get_sections`)
+        base: str or callable
+            The base to use for the keys in the :attr:`params`. If callable,
+            it is called with each object and must return the base. If a
+            string, it is a template that is formatted (via
+            :meth:`str.format`) with the ``name``, ``qualname`` and
+            ``module`` of the object and the ``index`` of the object in
+            `objects`. If None, nothing is stored in the :attr:`params`
+
+        Returns
+        -------
+        list of dict
+            For each object, a mapping from section to section string
+
+        Examples
+        --------
+        Register the sections of multiple functions at once via::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> def func1(a):
+            ...     '''First function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     a: int
+            ...         A parameter'''
+            >>> def func2(b):
+            ...     '''Second function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     b: int
+            ...         Another parameter'''
+            >>> results = d.extract_many([func1, func2], ['Parameters'],
+            ...                          base='{module}.{name}')
+            >>> print(d.params['docrep.func2.parameters'])
+            b: int
+                Another parameter
+        """
+        new = {}
+        ret = []
+        for i, obj in enumerate(objects):
+            if isinstance(obj, six.string_types):
+                s = obj
+            else:
+                s = obj.__doc__
+            found = self._tokenize(self._remove_summary(s or ''))
+            ret.append({section: found.get(section, '')
+                        for section in sections})
+            if base is None:
+                continue
+            elif callable(base):
+                key = base(obj)
+            else:
+                key = base.format(
+                    index=i, name=getattr(obj, '__name__', ''),
+                    qualname=getattr(obj, '__qualname__', ''),
+                    module=getattr(obj, '__module__', ''))
+            for section, section_doc in six.iteritems(ret[-1]):
+                new['%s.%s' % (key, section.lower().replace(' ', '_'))] = (
+                    section_doc)
+        if new:
+            self.params.update(new)
+        return ret
+
+    def ref(self, obj, section='Parameters', keep=None, drop=None, key=None):
+        """Reference a section of another docstring without extracting it.
+
+        Other than :meth:`get_sections`, this method does not parse the
+        docstring of `obj`. The section is only extracted (and the
+        parameters selected) when the returned value is used for the first
+        time, e.g. when a docstring with the corresponding placeholder is
+        rendered. The result is cached in the processor.
+
+        Parameters
+        ----------
+        obj: object or str
+            The object whose ``__doc__`` to use (or the docstring itself)
+        section: str
+            The name of the section
+        keep: list of str
+            If not None, only these parameters are kept (see
+            :func:`keep_params`)
+        drop: list of str
+            If not None, these parameters are removed (see
+            :func:`delete_params`)
+        key: str
+            If not None, the reference is stored under this key in the
+            :attr:`params`
+
+        Returns
+        -------
+        docrep.backends.LazyValue
+            The reference whose string is the section
+
+        Examples
+        --------
+        ::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> def other_func(a, b):
+            ...     '''Some function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     a: int
+            ...         The first parameter
+            ...     b: int
+            ...         The second parameter'''
+            >>> ref = d.ref(other_func, keep=['a'], key='other.params')
+            >>> @d.dedent
+            ... def func(a):
+            ...     '''Another function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     %(other.params)s'''
+            >>> print(func.__doc__)
+            Another function
+            <BLANKLINE>
+            Parameters
+            ----------
+            a: int
+                The first parameter
+        """
+        value = _SectionRef(self, obj, section,
+                            None if keep is None else tuple(keep),
+                            None if drop is None else tuple(drop))
+        if key is not None:
+            self.params[key] = value
+        return value
+
+    def _tokenize(self, s):
+        """Get all sections of a (dedented) docstring in one pass
+
+        This gives the same results as :meth:`_get_section` for all sections
+        but searches for the section headers only once."""
+        param_like = self.param_like_sections
+        headers = [(m.start(), m.end(), m.group().split('\n', 1)[0])
+                   for m in self._all_sections_patt.finditer(s)]
+        ret = {}
+        for i, (header_start, start, section) in enumerate(headers):
+            if section in ret or start == len(s):
+                continue
+            if section in param_like:
+                m = _param_section_end_patt.search(s, start + 1)
+                end = m.start() if m else len(s)
+            else:
+                end = next((pos for pos, _, _ in headers[i+1:] if pos > start),
+                           len(s))
+            ret[section] = s[start:end].rstrip()
+        return ret
+
+    def iter_sections(self, lines, sections=None):
+        r"""Extract sections from a stream of lines.
+
+        This method is the streaming counterpart of :meth:`get_sections` for
+        large (already dedented) numpy-style documents that are not python
+        docstrings, e.g. files. It only keeps the lines of the current
+        section in memory and yields every section as soon as it is complete.
+
+        Parameters
+        ----------
+        lines: iterable of str
+            The lines of the document, e.g. an open file. If a string is
+            given, it is split into lines
+        sections: list of str
+            The sections to yield. Each section must appear in the
+            :attr:`param_like_sections` or the :attr:`text_sections`. If None,
+            all of these sections are yielded
+
+        Yields
+        ------
+        str
+            The name of the section
+        str
+            The content of the section (as it would be stored by
+            :meth:`get_sections`)
+
+        Notes
+        -----
+        Contrary to :meth:`get_sections`, this method yields every occurrence
+        of a section (and not only the first one) and section headers are only
+        recognized at the beginning of a line. As for :meth:`get_sections`, a
+        param-like section only ends with an empty line that is followed by a
+        non-indented line.
+
+        Examples
+        --------
+        Iterate over the sections of a file via::
+
+            >>> import io
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> f = io.StringIO(u'''
+            ... Parameters
+            ... ----------
+            ... a: int
+            ...     A parameter
+            ...
+            ... Notes
+            ... -----
+            ... Some notes''')
+            >>> for section, content in d.iter_sections(f):
+            ...     print(section + ': ' + repr(content))
+            Parameters: 'a: int\n    A parameter'
+            Notes: 'Some notes'
+        """
+        if isinstance(lines, six.string_types):
+            lines = lines.splitlines()
+        param_like = set(self.param_like_sections)
+        all_sections = param_like.union(self.text_sections)
+        wanted = all_sections if sections is None else set(sections)
+
+        def ends_param_section(buf, line):
+            # param-like sections end with an empty line that is followed by
+            # a non-indented line
+            return (line and not line[0].isspace() and len(buf) >= 2 and
+                    not buf[-1] and (len(buf) > 2 or buf[0]))
+
+        current = None  # the section we are currently in
+        buf = []  # the lines of the current section
+        prev = None  # the last line that might be a section header
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if (prev is not None and current in param_like and
+                    ends_param_section(buf, prev)):
+                if current in wanted:
+                    yield current, '\n'.join(buf[:-1]).rstrip()
+                current, buf = None, []
+            if (prev in all_sections and line and line[0] == '-' and
+                    line == '-' * len(prev) and current not in param_like):
+                if current in wanted:
+                    yield current, '\n'.join(buf).rstrip()
+                current, buf, prev = prev, [], None
+                continue
+            if prev is not None and current is not None:
+                buf.append(prev)
+            prev = line
+        if current in param_like and ends_param_section(buf, prev):
+            buf.pop()
+        elif prev is not None:
+            buf.append(prev)
+        if current in wanted:
+            yield current, '\n'.join(buf).rstrip()
+
+    def _remove_summary(self, s):
+        # if the string does not start with one of the sections, we remove the
+        # summary
+        if not self._all_sections_patt.match(s.lstrip()):
+            # remove the summary and look for the first line with content
+            start = summary_patt.match(s).end()
+            m = _content_patt.search(s, start)
+            if m is not None:
+                start = s.rfind('\n', 0, m.start()) + 1
+            # dedent the lines
+            s = inspect.cleandoc('\n' + s[start:])
+        return s
+
+    def _get_section(self, s, section, lazy=False):
+        m = self.patterns[section].search(s)
+        if m is None:
+            return ''
+        view = _SectionView(s, m.start(), m.end())
+        return view if lazy else view.materialize()
+
+    @updates_docstring
+    @traced('dedent')
+    def dedent(self, s, stacklevel=3):
+        """
+        Dedent a string and substitute with the :attr:`params` attribute.
+
+        Parameters
+        ----------
+        s: str
+            string to dedent and insert the sections of the :attr:`params`
+            attribute
+        stacklevel: int
+            The stacklevel for the warning raised in :func:`safe_module` when
+            encountering an invalid key in the string
+        """
+        s = inspect.cleandoc(s)
+        return self._substitute(s, self._render_params(), stacklevel)
+
+    @updates_docstring
+    @traced('with_indent')
+    def with_indent(self, s, indent=0, stacklevel=3):
+        """
+        Substitute a string with the indented :attr:`params`.
+
+        Parameters
+        ----------
+        s: str
+            The string in which to substitute
+        indent: int
+            The number of spaces that the substitution should be indented
+        stacklevel: int
+            The stacklevel for the warning raised in :func:`safe_module` when
+            encountering an invalid key in the string
+
+        Returns
+        -------
+        str
+            The substituted string
+
+        See Also
+        --------
+        with_indent, dedent
+        """
+        # we use a view on the params that indents the original strings when
+        # they are accessed. Note that the first line is not indented
+        params = self._render_params()
+        if isinstance(params, collections_abc.Mapping):
+            d = _IndentedParams(params, indent)
+        else:
+            d = tuple(_StrWithIndentation(val, indent) for val in params)
+        return self._substitute(s, d, stacklevel)
+
+    def _render_params(self):
+        """Get the mapping to substitute the docstrings with"""
+        if not isinstance(self.params, collections_abc.Mapping):
+            # positional parameters (see :meth:`__init__`)
+            return self.params
+        params = _SelectorParams(self.params, self._selector_cache,
+                                 self._counters)
+        if self.expand_nested:
+            return _NestedParams(
+                params, on_missing=self._count_missing,
+                print_warning=self.missing_keys == 'warn')
+        return params
+
+    def _substitute(self, s, params, stacklevel=3):
+        """Substitute a docstring and count the rendered characters"""
+        ret = safe_modulo(s, params, stacklevel=stacklevel + 1,
+                          print_warning=self.missing_keys == 'warn',
+                          on_missing=self._count_missing)
+        counters = self._counters
+        counters['renders'] += 1
+        counters['rendered_chars'] += len(ret)
+        return ret
+
+    def _set_doc(self, obj, doc):
+        """Set the rendered docstring of an object and remember its size"""
+        _set_object_doc(obj, doc, stacklevel=4,
+                        py2_class=self.python2_classes)
+        # properties cannot be weakly referenced, so we use their getter
+        key = obj.fget if isinstance(obj, property) else getattr(
+            obj, '__func__', obj)
+        modname = getattr(obj, '__module__', None) or getattr(
+            key, '__module__', None)
+        try:
+            self._rendered[key] = (modname, sys.getsizeof(doc))
+        except TypeError:  # cannot be weakly referenced
+            pass
+        if self._access is not None:
+            self._access.objects.add(object_label(obj))
+
+    def _count_missing(self, key):
+        self._counters['missing_keys'] += 1
+        if self.missing_keys == 'collect':
+            if not self._missing:
+                if not self._report_at_exit:
+                    atexit.register(_report_missing_at_exit,
+                                    weakref.ref(self))
+                    self._report_at_exit = True
+            self._missing.setdefault(key, []).append(_external_origin())
+
+    def report_missing(self, clear=True):
+        """
+        Report the invalid keys that have been collected.
+
+        If :attr:`missing_keys` is ``'collect'``, the processor records the
+        invalid keys together with the location of the templates instead of
+        warning about each of them. This method emits one
+        :class:`SyntaxWarning` for all of them. It is called automatically
+        when the interpreter exits, but you can call it at the end of your
+        package's ``__init__.py``, too.
+
+        Parameters
+        ----------
+        clear: bool
+            If True, the collected keys are removed, such that they are only
+            reported once
+
+        Returns
+        -------
+        dict
+            The mapping from invalid key to the list of ``(filename, lineno)``
+            tuples of the templates that use it
+        """
+        missing = self._missing
+        if clear:
+            self._missing = OrderedDict()
+        if missing:
+            lines = ['%i invalid keys in %i placeholders:' % (
+                len(missing), sum(map(len, six.itervalues(missing))))]
+            for key, origins in six.iteritems(missing):
+                lines.append('    %r (%ix): %s' % (
+                    key, len(origins), ', '.join(
+                        '%s:%i' % origin for origin in origins)))
+            warn('\n'.join(lines), SyntaxWarning, stacklevel=2)
+        return dict(missing)
+
+    def expand_params(self):
+        """
+        Expand the placeholders in the values of the :attr:`params`.
+
+        Each value that contains placeholders like ``%(other.key)s`` is
+        substituted with the (expanded) value of the referenced key and the
+        result is stored in the :attr:`params`. Only the parameters that are
+        stored in this processor itself are expanded, but they may reference
+        the keys of a registry (see :meth:`use_registry`) or of a parent
+        processor (see :meth:`child`). Every key is expanded only
+        once, such that the total time is linear in the size of the
+        :attr:`params`. Positional parameters (see :meth:`__init__`) are not
+        expanded.
+
+        Returns
+        -------
+        list of str
+            The keys that have been expanded
+
+        Raises
+        ------
+        CircularReferenceError
+            If a value references itself (directly or indirectly)
+
+        See Also
+        --------
+        expand_nested: expand the values during the substitution
+
+        Examples
+        --------
+        ::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor(
+            ...     a='first parameter', b='%(a)s and second parameter')
+            >>> d.expand_params()
+            ['b']
+            >>> d.params['b']
+            'first parameter and second parameter'
+        """
+        params = self._own_params()
+        if not isinstance(params, collections_abc.Mapping):
+            return []
+        nested = _NestedParams(self.params)
+        expanded = {}
+        for key in list(params):
+            value = nested[key]
+            if value != params[key]:
+                expanded[key] = value
+        if expanded:
+            params.update(expanded)
+        return sorted(expanded)
+
+    def process_module(self, module, recursive=False, dedent=False):
+        """
+        Substitute the docstrings of all objects in a module.
+
+        This method can be called once at the end of a module instead of
+        decorating each function, class, method and property with the
+        :meth:`__call__` (or :meth:`dedent`) method. All docstrings with
+        placeholders are rendered against one snapshot of the :attr:`params`
+        and identical docstrings are rendered only once.
+
+        Parameters
+        ----------
+        module: module or str
+            The module (or its name) whose objects to process
+        recursive: bool
+            If True and `module` is a package, process all its submodules, too
+        dedent: bool
+            If True, dedent the docstrings (as in :meth:`dedent`)
+
+        Returns
+        -------
+        list
+            The objects whose docstrings have been updated
+
+        Examples
+        --------
+        Instead of decorating the functions in a module::
+
+            from docrep import DocstringProcessor
+
+            docstrings = DocstringProcessor(key='substituted')
+
+            def func():
+                '''A %(key)s docstring'''
+
+        put the following line at the end of the module::
+
+            docstrings.process_module(__name__)
+        """
+        if isinstance(module, six.string_types):
+            module = importlib.import_module(module)
+        modules = [module]
+        if recursive and hasattr(module, '__path__'):
+            modules.extend(
+                importlib.import_module(name) for _, name, _ in
+                pkgutil.walk_packages(module.__path__,
+                                      module.__name__ + '.'))
+        objects = []
+        seen = set()
+        for mod in modules:
+            objects.extend(_iter_documented(vars(mod), mod.__name__, seen))
+        return self._render_objects(objects, dedent)
+
+    def _render_objects(self, objects, dedent=False, extra=None):
+        """Substitute the docstrings of multiple objects at once
+
+        Parameters
+        ----------
+        objects: list
+            The objects to render
+        dedent: bool
+            Whether to dedent the docstrings
+        extra: callable
+            A function that is called with the object and returns a
+            :class:`dict` with additional parameters for its substitution (or
+            None)
+
+        Returns
+        -------
+        list
+            The objects whose docstrings have been updated"""
+        templates = []
+        keys = set()
+        for obj in objects:
+            doc = obj.__doc__
+            if doc and substitution_pattern.search(doc):
+                templates.append((obj, doc))
+                keys.update(m.group('key') for m in
+                            substitution_pattern.finditer(doc))
+        if not templates:
+            return []
+        # take one snapshot of the parameters that we need
+        params = self._render_params()
+        snapshot = {key: params[key] for key in keys if key in params}
+        cache = {}
+        for obj, doc in templates:
+            additional = extra(obj) if extra is not None else None
+            if additional:
+                meta = snapshot.copy()
+                meta.update(additional)
+                template = inspect.cleandoc(doc) if dedent else doc
+                rendered = self._substitute(template, meta)
+            else:
+                try:
+                    rendered = cache[doc]
+                except KeyError:
+                    self._counters['template_cache_misses'] += 1
+                    template = inspect.cleandoc(doc) if dedent else doc
+                    rendered = cache[doc] = self._substitute(
+                        template, snapshot)
+                else:
+                    self._counters['template_cache_hits'] += 1
+                    self._counters['renders'] += 1
+                    self._counters['rendered_chars'] += len(rendered)
+            self._set_doc(obj, rendered)
+        return [obj for obj, doc in templates]
+
+    def process_class(self, cls=None, dedent=False):
+        """
+        Substitute the docstrings of a class and all its subclasses.
+
+        This class decorator substitutes the docstrings of the class and of
+        all its methods and properties at once (see :meth:`process_module`).
+        Furthermore it
+
+        - lets methods and properties without docstring inherit the (already
+          substituted) docstring of the parent class
+        - provides the sections of the parent's docstring as
+          ``'super.parameters'``, ``'super.returns'``, etc. (see
+          :meth:`get_sections`) for the substitution in the methods that
+          override them (or in the class docstring)
+        - processes every subclass the same way when it is created (this
+          requires python 3.6 or later)
+
+        Every class is processed only once by this processor, i.e. decorating
+        a subclass of a processed class has no further effect.
+
+        The sections of the parent docstrings are cached per class and
+        method, such that they are only extracted once, independent of the
+        number of subclasses.
+
+        Parameters
+        ----------
+        cls: type
+            The class to process
+        dedent: bool
+            If True, dedent the docstrings (as in :meth:`dedent`)
+
+        Returns
+        -------
+        type
+            `cls`
+
+        Examples
+        --------
+        Reuse the parameters of the parent method via::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> @d.process_class(dedent=True)
+            ... class Base(object):
+            ...     def run(self, a):
+            ...         '''Run something
+            ...
+            ...         Parameters
+            ...         ----------
+            ...         a: int
+            ...             The first parameter'''
+            >>> class Child(Base):
+            ...     def run(self, a, b=1):
+            ...         '''Run something else
+            ...
+            ...         Parameters
+            ...         ----------
+            ...         %(super.parameters)s
+            ...         b: int
+            ...             The second parameter'''
+            >>> print(Child.run.__doc__)
+            Run something else
+            <BLANKLINE>
+            Parameters
+            ----------
+            a: int
+                The first parameter
+            b: int
+                The second parameter
+        """
+        if cls is None:
+            return functools.partial(self.process_class, dedent=dedent)
+        self._process_class(cls, dedent)
+
+        processor = self
+        init_subclass = cls.__dict__.get('__init_subclass__')
+
+        def __init_subclass__(subcls, **kwargs):
+            if init_subclass is not None:
+                init_subclass.__get__(None, subcls)(**kwargs)
+            else:
+                super(cls, subcls).__init_subclass__(**kwargs)
+            processor._process_class(subcls, dedent)
+
+        cls.__init_subclass__ = classmethod(__init_subclass__)
+        return cls
+
+    def _process_class(self, cls, dedent=False):
+        """Substitute the docstrings in the namespace of one class"""
+        if cls in self._processed_classes:
+            return []
+        self._processed_classes.add(cls)
+        names = {id(cls): None}
+        objects = [cls]
+        for name, obj in list(six.iteritems(vars(cls))):
+            obj = _unwrap_method(obj)
+            if not (inspect.isfunction(obj) or isinstance(obj, property)):
+                continue
+            if obj.__doc__:
+                names[id(obj)] = name
+                objects.append(obj)
+            else:
+                parent = self._get_parent_doc(cls, name)
+                if parent is not None:
+                    _set_object_doc(obj, parent[1])
+
+        def super_params(obj):
+            if 'super.' not in obj.__doc__:
+                return None
+            parent = self._get_parent_doc(cls, names[id(obj)])
+            if parent is None:
+                return None
+            return self._get_parent_sections(parent[0], names[id(obj)],
+                                             parent[1])
+
+        return self._render_objects(objects, dedent, super_params)
+
+    @staticmethod
+    def _get_parent_doc(cls, name):
+        """Get the docstring of the attribute `name` of the parent class
+
+        Returns
+        -------
+        tuple
+            The parent class and the docstring, or None if no parent defines
+            the attribute `name` (or the class docstring if `name` is None)
+            with a docstring"""
+        for base in cls.__mro__[1:]:
+            if name is None:
+                doc = base.__doc__
+            elif name in vars(base):
+                obj = _unwrap_method(vars(base)[name])
+                if not (inspect.isfunction(obj) or isinstance(obj, property)):
+                    continue
+                doc = obj.__doc__
+            else:
+                continue
+            if doc:
+                return base, doc
+        return None
+
+    def _get_parent_sections(self, base, name, doc):
+        """Get the cached sections of the docstring of `name` in `base`"""
+        try:
+            cache = self._parent_sections[base]
+        except KeyError:
+            cache = self._parent_sections[base] = {}
+        try:
+            return cache[name]
+        except KeyError:
+            sections = self._tokenize(self._remove_summary(doc))
+            ret = cache[name] = {
+                'super.' + section.lower().replace(' ', '_'): section_doc
+                for section, section_doc in six.iteritems(sections)}
+            return ret
+
+    def _defer(self, func, obj, args, kwargs, prefix=None, key=None,
+               consumes=None):
+        """Queue an operation until :meth:`resolve` is called"""
+        if consumes is None:
+            consumes = [_split_selectors(m.group('key'))[0] for m in
+                        substitution_pattern.finditer(obj.__doc__ or '')]
+        self._deferred_ops.append(_DeferredOperation(
+            func, obj, args, kwargs, prefix, key, consumes))
+
+    def resolve(self, objects=None):
+        """
+        Process all operations that have been queued in :attr:`deferred` mode.
+
+        This method builds the dependency graph of the queued operations and
+        processes them in topological order, i.e. every key is registered
+        (via :meth:`get_sections`, :meth:`keep_params`, etc.) before it is
+        used in a docstring, independent of the order in which the decorators
+        have been applied. Operations on the same object are processed in the
+        order they have been queued.
+
+        Parameters
+        ----------
+        objects: list
+            If not None, only process the operations on these objects (or the
+            objects with these labels, see :meth:`record_access`) and the
+            operations they depend on. The other operations remain in the
+            queue for the next call of this method
+
+        Returns
+        -------
+        int
+            The number of processed operations
+
+        Notes
+        -----
+        The docstrings of the queued objects are not updated before this
+        method is called. Operations that form a cycle are processed in the
+        order they have been queued.
+
+        Examples
+        --------
+        Use a key before it is registered via::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor()
+            >>> d.deferred = True
+            >>> @d.dedent
+            ... def second(a):
+            ...     '''Another function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     %(first.parameters)s'''
+            >>> @d.get_sections(base='first')
+            ... def first(a):
+            ...     '''A function
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     a: int
+            ...         A parameter'''
+            >>> d.resolve()
+            2
+            >>> print(second.__doc__)
+            Another function
+            <BLANKLINE>
+            Parameters
+            ----------
+            a: int
+                A parameter
+        """
+        ops, self._deferred_ops = self._deferred_ops, []
+        if objects is not None:
+            ops, self._deferred_ops = self._select_operations(ops, objects)
+        for op in self._sort_operations(ops):
+            op(self)
+        return len(ops)
+
+    @classmethod
+    def _select_operations(cls, ops, objects):
+        """Select the operations on `objects` and their dependencies
 
-        >>> @d.get_sections(base='not_dedented')
-        ... def doc_test2(a=1):
-        ...     '''That's the summary
-        ...
-        ...     Parameters
-        ...     ----------
-        ...     a: int, optional
-        ...         A dummy parameter description'''
-        ...     print(a)
+        Returns
+        -------
+        list
+            The selected operations
+        list
+            The other operations"""
+        ids = set()
+        labels = set()
+        for obj in objects:
+            if isinstance(obj, six.string_types):
+                labels.add(obj)
+            else:
+                ids.add(id(obj))
+        deps = cls._get_dependencies(ops)
+        selected = set()
+        stack = [i for i, op in enumerate(ops) if op.obj is not None and (
+            id(op.obj) in ids or object_label(op.obj) in labels)]
+        while stack:
+            i = stack.pop()
+            if i not in selected:
+                selected.add(i)
+                stack.extend(deps[i])
+        return ([op for i, op in enumerate(ops) if i in selected],
+                [op for i, op in enumerate(ops) if i not in selected])
 
-    These sections must then be used with the :meth:`with_indent` method to
-    indent the inserted parameters::
+    @staticmethod
+    def _get_dependencies(ops):
+        """Get the indices of the operations that each operation depends on
+        """
+        producers = {}  # keys (or prefixes) to indices of operations
+        for i, op in enumerate(ops):
+            if op.prefix is not None:
+                producers.setdefault(op.prefix, []).append(i)
+            elif op.key is not None:
+                producers.setdefault(op.key, []).append(i)
+        deps = [set() for op in ops]
+        last_on_obj = {}
+        for i, op in enumerate(ops):
+            if op.obj is not None:
+                prev = last_on_obj.get(id(op.obj))
+                if prev is not None:
+                    deps[i].add(prev)
+                last_on_obj[id(op.obj)] = i
+            for key in op.consumes:
+                # a key like 'a.b.c' may have been stored by an operation
+                # with the prefix 'a', 'a.b' or 'a.b.c'
+                parts = key.split('.')
+                for j in range(1, len(parts) + 1):
+                    deps[i].update(producers.get('.'.join(parts[:j]), []))
+            deps[i].discard(i)
+        return deps
 
-        >>> @d.with_indent(4)
-        ... def second_test2(a=1):
-        ...     '''
-        ...     My second function where I want to use the docstring from
-        ...     above
-        ...
-        ...     Parameters
-        ...     ----------
-        ...     %(not_dedented.parameters)s'''
-        ...     pass
+    @classmethod
+    def _sort_operations(cls, ops):
+        """Sort deferred operations topologically"""
+        deps = cls._get_dependencies(ops)
+        dependents = [[] for op in ops]
+        for i, d in enumerate(deps):
+            for j in d:
+                dependents[j].append(i)
+        remaining = [len(d) for d in deps]
+        ready = [i for i, n in enumerate(remaining) if not n]
+        heapq.heapify(ready)
+        done = set()
+        while len(done) < len(ops):
+            if not ready:  # cycle -> use the first remaining operation
+                ready.append(next(i for i in range(len(ops))
+                                  if i not in done))
+            i = heapq.heappop(ready)
+            done.add(i)
+            yield ops[i]
+            for j in dependents[i]:
+                remaining[j] -= 1
+                if not remaining[j] and j not in done:
+                    heapq.heappush(ready, j)
+
+    def trace(self):
+        """
+        Record the timings of the docrep operations.
 
-    """
+        This method returns a :class:`docrep.tracing.Tracer` that records the
+        wall time and the input and output sizes of :meth:`get_sections`,
+        :meth:`dedent`, :meth:`with_indent`, :func:`safe_modulo` and the
+        functions that select parameters (e.g. :func:`keep_params`), when it
+        is used as a context manager. Each record is attributed to the module
+        and function that called docrep. Note that the tracer records the
+        operations of all processors.
 
-    #: :class:`dict`. Dictionary containing the compiled patterns to identify
-    #: the Parameters, Other Parameters, Warnings and Notes sections in a
-    #: docstring
-    patterns = {}
+        Returns
+        -------
+        docrep.tracing.Tracer
+            The tracer. Use its :meth:`~docrep.tracing.Tracer.dump` method to
+            print a sorted summary
 
-    #: :class:`dict`. Dictionary containing the parameters that are used in for
-    #: substitution.
-    params = {}
+        See Also
+        --------
+        docrep.tracing
+        """
+        return Tracer()
 
-    #: sections that behave the same as the `Parameter` section by defining a
-    #: list
-    param_like_sections = ['Parameters', 'Other Parameters', 'Returns',
-                           'Raises']
-    #: sections that include (possibly not list-like) text
-    text_sections = ['Warnings', 'Notes', 'Examples', 'See Also',
-                     'References']
+    def stats(self):
+        """
+        Get the runtime statistics of this processor.
 
-    #: The action on how to react on classes in python 2
-    #:
-    #: When calling::
-    #:
-    #:     >>> @docstrings
-    #:     ... class NewClass(object):
-    #:     ...     """%(replacement)s"""
-    #:
-    #: This normaly raises an AttributeError, because the ``__doc__`` attribute
-    #: of a class in python 2 is not writable. This attribute may be one of
-    #: ``'ignore', 'raise' or 'warn'``
-    python2_classes = 'ignore'
+        The processor counts the rendered docstrings, the cache hits and
+        misses and the invalid keys (see :data:`docrep.stat_counters`) since
+        it has been created. The size of the :attr:`params` (see
+        :data:`docrep.stat_gauges`) is computed when this method is called.
+        It only considers the parameters that are stored in this processor,
+        i.e. not those of a parent (see :meth:`child`) or of a registry (see
+        :meth:`use_registry`). Positional parameters (see :meth:`__init__`)
+        are not counted.
 
-    def __init__(self, *args, **kwargs):
+        Returns
+        -------
+        dict
+            A mapping from the name of the counter or gauge to its value
+
+        See Also
+        --------
+        export_stats
+        """
+        ret = dict(self._counters)
+        params = self._own_params()
+        if not isinstance(params, collections_abc.Mapping):
+            ret['keys_stored'] = ret['params_chars'] = 0
+            return ret
+        ret['keys_stored'] = len(params)
+        nchars = getattr(params, 'nchars', None)
+        ret['params_chars'] = nchars() if nchars is not None else sum(
+            len(params[key]) for key in params)
+        return ret
+
+    def _own_params(self):
+        """Get the parameters that are stored in this processor itself"""
+        params = self.params
+        while isinstance(params, (ChainedParams, _RecordingParams)):
+            params = params.local
+        return params
+
+    def _set_own_params(self, params):
+        """Replace the parameters that are stored in this processor itself
+
+        Layers on top of them (e.g. of :meth:`use_registry` or
+        :meth:`child`) are kept."""
+        layer = None
+        current = self.params
+        while isinstance(current, (ChainedParams, _RecordingParams)):
+            layer, current = current, current.local
+        if layer is None:
+            self.params = params
+        else:
+            layer.local = params
+        self._selector_cache.clear()
+
+    def export_stats(self, fname, format='json', prefix='docrep_'):
         """
+        Export the :meth:`stats` to a file.
+
         Parameters
         ----------
-        ``*args``
-            Positional parameters that shall be used for the substitution. Note
-            that you can only provide either ``*args`` or ``**kwargs``,
-            furthermore most of the methods like `get_sections` require
-            ``**kwargs`` to be provided (if any).
-        ``**kwargs``
-            Initial parameters to use
-        """
-        if args and kwargs:
-            raise ValueError("Only positional or keyword args are allowed")
-        self.params = args or kwargs
-        patterns = {}
-        all_sections = self.param_like_sections + self.text_sections
-        for section in self.param_like_sections:
-            patterns[section] = re.compile(
-                r'(?s)(?<=%s\n%s\n)(.+?)(?=\n\n\S+|$)' % (
-                    section, '-'*len(section)))
-        all_sections_patt = '|'.join(
-            '%s\n%s\n' % (s, '-'*len(s)) for s in all_sections)
-        # examples and see also
-        for section in self.text_sections:
-            patterns[section] = re.compile(
-                '(?s)(?<=%s\n%s\n)(.+?)(?=%s|$)' % (
-                    section, '-'*len(section), all_sections_patt))
-        self._extended_summary_patt = re.compile(
-            '(?s)(.+?)(?=%s|$)' % all_sections_patt)
-        self._all_sections_patt = re.compile(all_sections_patt)
-        self.patterns = patterns
+        fname: str
+            The path to the file
+        format: {'json', 'openmetrics'}
+            The format of the file. ``'openmetrics'`` writes the statistics
+            in the OpenMetrics text format that can be read by Prometheus
+        prefix: str
+            The prefix for the metric names in the ``'openmetrics'`` format
 
-    @updates_docstring
-    def __call__(self, s):
+        Returns
+        -------
+        dict
+            The exported statistics
         """
-        Substitute in a docstring of a function with :attr:`params`.
+        stats = self.stats()
+        if format == 'json':
+            content = json.dumps(stats, indent=1, sort_keys=True)
+        elif format == 'openmetrics':
+            lines = []
+            for kind, descriptions in [('counter', stat_counters),
+                                       ('gauge', stat_gauges)]:
+                for name, description in six.iteritems(descriptions):
+                    metric = prefix + name
+                    lines.append('# TYPE %s %s' % (metric, kind))
+                    lines.append('# HELP %s %s.' % (metric, description))
+                    if kind == 'counter':
+                        metric += '_total'
+                    lines.append('%s %s' % (metric, stats[name]))
+            lines.append('# EOF')
+            content = '\n'.join(lines) + '\n'
+        else:
+            raise ValueError(
+                "Unknown format %r. Use 'json' or 'openmetrics'." % (format, ))
+        with io.open(fname, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(content))
+        return stats
+
+    def memory_report(self, depth=1, use_tracemalloc=False):
+        """
+        Report the memory that is used for the docstrings.
+
+        The report groups the :attr:`params` by the first `depth` components
+        of their keys (e.g. ``'func'`` for ``'func.parameters'``) and the
+        docstrings that have been rendered by this processor by the first
+        `depth` components of the name of their module.
 
         Parameters
         ----------
-        func: function
-            function with the documentation whose sections
-            shall be inserted from the :attr:`params` attribute
+        depth: int
+            The number of dot-separated components of the keys and module
+            names to group by
+        use_tracemalloc: bool
+            If True, take a :mod:`tracemalloc` snapshot and add the size of
+            the memory blocks that have been allocated by docrep and are still
+            alive. They are grouped by the module that called docrep. Note
+            that :mod:`tracemalloc` must have been started with more than one
+            frame before the docstrings were processed, e.g. via
+            ``python -X tracemalloc=25`` or ``tracemalloc.start(25)``
+
+        Returns
+        -------
+        list of dict
+            One row per group, sorted by the total number of bytes. The
+            columns are
+
+            prefix
+                The key prefix or module name
+            keys
+                The number of keys in the :attr:`params`
+            bytes
+                The size of the stored values (see :func:`sys.getsizeof`).
+                Values that have not been accessed yet (see
+                :meth:`get_sections`) only count with the size of their view
+                on the original docstring
+            duplicated_bytes
+                The size of values that are equal to the value of another
+                key, but stored in a separate object
+            docs
+                The number of rendered docstrings
+            doc_bytes
+                The size of the rendered docstrings
+            traced_bytes
+                The memory that has been allocated by docrep (only if
+                `use_tracemalloc` is True)
 
         See Also
         --------
-        dedent: also dedents the doc
-        with_indent: also indents the doc
+        stats
         """
-        return safe_modulo(s, self.params, stacklevel=3)
+        columns = ['keys', 'bytes', 'duplicated_bytes', 'docs', 'doc_bytes']
+        if use_tracemalloc:
+            # take the snapshot before we allocate anything here
+            snapshot = _take_snapshot()
+            columns.append('traced_bytes')
+        rows = {}
+
+        def get_row(name):
+            prefix = '.'.join(name.split('.')[:depth]) if name else '<unknown>'
+            try:
+                return rows[prefix]
+            except KeyError:
+                row = rows[prefix] = dict.fromkeys(columns, 0)
+                row['prefix'] = prefix
+                return row
+
+        seen = {}
+        params = self._own_params()
+        iter_stored = getattr(params, 'iter_stored', None)
+        if not isinstance(params, collections_abc.Mapping):
+            items = []  # positional parameters have no keys
+        elif iter_stored is not None:
+            items = iter_stored()
+        else:
+            items = ((key, params[key]) for key in params)
+        for key, value in items:
+            row = get_row(key)
+            size = sys.getsizeof(value)
+            row['keys'] += 1
+            row['bytes'] += size
+            if isinstance(value, six.string_types) and value:
+                first = seen.setdefault(value, value)
+                if first is not value:
+                    row['duplicated_bytes'] += size
+        for modname, size in six.itervalues(self._rendered):
+            row = get_row(modname)
+            row['docs'] += 1
+            row['doc_bytes'] += size
+        if use_tracemalloc:
+            for modname, size in six.iteritems(_traced_sizes(snapshot)):
+                get_row(modname)['traced_bytes'] += size
+        return sorted(six.itervalues(rows), reverse=True,
+                      key=lambda row: row['bytes'] + row['doc_bytes'])
+
+    def record_access(self, fname=None):
+        """
+        Record which parameters and docstrings are used.
 
-    @reads_docstring
-    def get_sections(self, s, base=None,
-                     sections=['Parameters', 'Other Parameters']):
-        r"""Exctract sections out of a docstring.
+        Use the returned object as a context manager during a representative
+        run of your program. It records the keys of the :attr:`params` that
+        are read (when rendering docstrings or deriving new keys) and the
+        objects whose docstrings are rendered by this processor.
 
-        This method extracts the specified `sections` out of the given string
-        if (and only if) the docstring follows the numpy documentation
-        guidelines [1]_. Note that the section either must appear in the
-        :attr:`param_like_sections` or the :attr:`text_sections` attribute.
+        The resulting profile can be used in a later process to render only
+        the hot docstrings in :attr:`deferred` mode (via the `objects`
+        parameter of :meth:`resolve`) and to drop the keys that are never used
+        (see :meth:`prune_params`). The ``'unused_keys'`` of the profile point
+        to dead documentation fragments.
 
         Parameters
         ----------
-        s: str
-            Docstring to split
-        base: str
-            base to use in the :attr:`sections` attribute
-        sections: list of str
-            sections to look for. Each section must be followed by a newline
-            character ('\n') and a bar of '-' (following the numpy (napoleon)
-            docstring conventions).
+        fname: str
+            If not None, the profile is saved as JSON to this file when the
+            context is left
 
         Returns
         -------
-        dict
-            A mapping from section identifier to section string
+        object
+            The context manager. Its ``get_profile`` method returns the
+            profile as :class:`dict`
 
-        References
-        ----------
-        .. [1] https://github.com/numpy/numpy/blob/master/doc/HOWTO_DOCUMENT.rst.txt
+        Notes
+        -----
+        Reading the ``__doc__`` attribute of a function cannot be
+        intercepted. The profile therefore contains the docstrings that have
+        been rendered during the run, not those that have been read.
 
-        See Also
+        Examples
         --------
-        delete_params, keep_params, delete_types, keep_types, delete_kwargs:
-            For manipulating the docstring sections
-        save_docstring:
-            for saving an entire docstring
+        ::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor(used='used value', unused='other value')
+            >>> with d.record_access() as recorder:
+            ...     @d.dedent
+            ...     def func():
+            ...         '''%(used)s'''
+            >>> profile = recorder.get_profile()
+            >>> profile['keys'], profile['unused_keys']
+            (['used'], ['unused'])
+            >>> profile['objects']  # doctest: +ELLIPSIS
+            ['...func']
         """
-        params = self.params
-        # Remove the summary and dedent the rest
-        s = self._remove_summary(s)
+        return _AccessRecorder(self, fname)
 
-        ret = {}
+    @staticmethod
+    def load_access_profile(fname):
+        """
+        Load a profile that has been saved by :meth:`record_access`.
 
-        for section in sections:
-            ret[section] = section_doc = self._get_section(s, section)
-            if base:
-                key = '%s.%s' % (base, section.lower().replace(' ', '_'))
-                params[key] = section_doc
-        return s
+        Parameters
+        ----------
+        fname: str
+            The path to the JSON file
 
-    def _remove_summary(self, s):
-        # if the string does not start with one of the sections, we remove the
-        # summary
-        if not self._all_sections_patt.match(s.lstrip()):
-            # remove the summary
-            lines = summary_patt.sub('', s, 1).splitlines()
-            # look for the first line with content
-            first = next((i for i, l in enumerate(lines) if l.strip()), 0)
-            # dedent the lines
-            s = inspect.cleandoc('\n' + '\n'.join(lines[first:]))
-        return s
+        Returns
+        -------
+        dict
+            The sets of the accessed ``'keys'``, the rendered ``'objects'``
+            and the ``'unused_keys'``
+        """
+        with io.open(fname, encoding='utf-8') as f:
+            profile = json.load(f)
+        return {key: set(val) for key, val in six.iteritems(profile)}
 
-    def _get_section(self, s, section):
-        try:
-            return self.patterns[section].search(s).group(0).rstrip()
-        except AttributeError:
-            return ''
+    def prune_params(self, keys):
+        """
+        Remove all parameters except for the given keys.
 
-    @updates_docstring
-    def dedent(self, s, stacklevel=3):
+        Parameters
+        ----------
+        keys: set of str or dict
+            The keys to keep, or a profile from :meth:`load_access_profile`
+
+        Returns
+        -------
+        list of str
+            The keys that have been removed
+
+        Notes
+        -----
+        Only the parameters that are stored in this processor itself are
+        removed, i.e. not those of a parent (see :meth:`child`). Positional
+        parameters (see :meth:`__init__`) are kept.
         """
-        Dedent a string and substitute with the :attr:`params` attribute.
+        if isinstance(keys, dict):
+            keys = keys['keys']
+        params = self._own_params()
+        if not isinstance(params, collections_abc.Mapping):
+            return []
+        removed = [key for key in params if key not in keys]
+        for key in removed:
+            del params[key]
+        self._selector_cache.clear()
+        return removed
+
+    def set_params_backend(self, backend):
+        """
+        Use a different storage for the :attr:`params`.
+
+        The parameters that are already stored in this processor are copied
+        to the new `backend`. The parameters of a registry (see
+        :meth:`use_registry`) or of a parent processor (see :meth:`child`)
+        are not copied but remain available.
 
         Parameters
         ----------
-        s: str
-            string to dedent and insert the sections of the :attr:`params`
-            attribute
-        stacklevel: int
-            The stacklevel for the warning raised in :func:`safe_module` when
-            encountering an invalid key in the string
+        backend: docrep.backends.ParamsBackend
+            The new storage for the parameters, e.g. a
+            :class:`docrep.backends.SQLiteBackend`
+
+        See Also
+        --------
+        params_backend
         """
-        s = inspect.cleandoc(s)
-        return safe_modulo(s, self.params, stacklevel=stacklevel)
+        params = self._own_params()
+        if params:
+            backend.update(params)
+        self._set_own_params(backend)
 
-    @updates_docstring
-    def with_indent(self, s, indent=0, stacklevel=3):
+    def child(self, **kwargs):
         """
-        Substitute a string with the indented :attr:`params`.
+        Create a processor that shares the parameters of this one.
+
+        The :attr:`params` of the new processor are a layered view (see
+        :class:`docrep.backends.ChainedParams`) on the :attr:`params` of this
+        processor: new keys are stored in the child only, lookups fall
+        through to this processor. The compiled section patterns are shared,
+        too, such that creating a child is cheap, independent of the number
+        of parameters.
 
         Parameters
         ----------
-        s: str
-            The string in which to substitute
-        indent: int
-            The number of spaces that the substitution should be indented
-        stacklevel: int
-            The stacklevel for the warning raised in :func:`safe_module` when
-            encountering an invalid key in the string
+        ``**kwargs``
+            Initial parameters for the child
 
         Returns
         -------
-        str
-            The substituted string
+        DocstringProcessor
+            The new processor
+
+        Examples
+        --------
+        ::
+
+            >>> from docrep import DocstringProcessor
+            >>> d = DocstringProcessor(key='parent value')
+            >>> child = d.child(other='child value')
+            >>> print(child.dedent('%(key)s and %(other)s'))
+            parent value and child value
+            >>> 'other' in d.params
+            False
+        """
+        child = copy.copy(self)
+        child.params = ChainedParams(self.params,
+                                     self.params_backend(kwargs))
+        child._deferred_ops = []
+        child._selector_cache = {}
+        child._counters = dict.fromkeys(stat_counters, 0)
+        child._missing = OrderedDict()
+        child._report_at_exit = False
+        child._rendered = weakref.WeakKeyDictionary()
+        child._processed_classes = weakref.WeakSet()
+        child.patterns = self.patterns.copy()
+        child._access = None
+        return child
+
+    def share_params(self, name=None):
+        """
+        Move the :attr:`params` into shared memory.
+
+        This method copies the :attr:`params` into a shared memory block and
+        replaces them by a read-only view on this block (see
+        :class:`docrep.backends.SharedMemoryParams`). Worker processes that
+        are forked afterwards use the same memory pages to render their
+        docstrings instead of making private copies. Note that no parameters
+        can be stored in the processor afterwards. Only the parameters that
+        are stored in this processor itself are moved, the ones of a registry
+        (see :meth:`use_registry`) or of a parent processor (see
+        :meth:`child`) remain where they are.
+
+        Parameters
+        ----------
+        name: str
+            The name of the shared memory block. If None, a unique name is
+            created
+
+        Returns
+        -------
+        docrep.backends.SharedMemoryParams
+            The new :attr:`params`. Call its
+            :meth:`~docrep.backends.SharedMemoryParams.unlink` method in the
+            parent process when the parameters are not needed anymore.
+        """
+        params = SharedMemoryParams.create(self._own_params(), name)
+        self._set_own_params(params)
+        return params
+
+    def use_registry(self, registry=None):
+        """
+        Make the parameters that are published by other packages available.
+
+        The :attr:`params` are replaced by a layered view (see
+        :class:`docrep.backends.ChainedParams`) on the `registry`: new keys
+        are stored in the former :attr:`params`, lookups of unknown keys fall
+        through to the `registry`. The parameters of another package are
+        only loaded when one of its keys, e.g.
+        ``'%(upstream.func.parameters)s'``, is used in a docstring.
+
+        Parameters
+        ----------
+        registry: collections.abc.Mapping
+            The published parameters. If None, the
+            :attr:`docrep.registry.registry` for the ``docrep.params`` entry
+            points is used
 
         See Also
         --------
-        with_indent, dedent
+        export_params, docrep.registry.ParamsRegistry
+        """
+        if registry is None:
+            from docrep.registry import registry
+        self.params = ChainedParams(registry, self.params)
+        self._selector_cache.clear()
+
+    def export_params(self, fname, prefix=None):
         """
-        # we make a new dictionary with objects that indent the original
-        # strings if necessary. Note that the first line is not indented
-        d = {key: _StrWithIndentation(val, indent)
-             for key, val in six.iteritems(self.params)}
-        return safe_modulo(s, d, stacklevel=stacklevel)
+        Export the :attr:`params` to a JSON file.
 
+        Only the parameters that are stored in this processor itself are
+        exported, not the ones of a registry (see :meth:`use_registry`) or of
+        a parent processor (see :meth:`child`).
+
+        The file can be published through an entry point in the
+        ``docrep.params`` group to make the parameters available to other
+        packages (see :mod:`docrep.registry`). For a file
+        ``docrep_params.json`` in the package ``mypackage``, use in the
+        ``setup.cfg``::
+
+            [options.entry_points]
+            docrep.params =
+                mypackage = mypackage:docrep_params.json
+
+        Parameters
+        ----------
+        fname: str
+            The path to the file
+        prefix: str
+            If not None, only the keys that start with `prefix` are exported
+
+        Returns
+        -------
+        dict
+            The exported parameters
+        """
+        own = self._own_params()
+        params = {key: str(own[key]) for key in own
+                  if prefix is None or key.startswith(prefix)}
+        with io.open(fname, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(json.dumps(params, indent=1,
+                                             sort_keys=True)))
+        return params
+
+    @derives_params(_delete_params_key)
     def delete_params(self, base_key, *params):
         """
         Delete a parameter from a parameter documentation.
@@ -591,10 +2716,10 @@ class DocstringProcessor(object):
         --------
         delete_types, keep_params
         """
-        self.params[
-            base_key + '.no_' + '|'.join(params)] = delete_params(
-                self.params[base_key], *params)
+        self.params[_delete_params_key(base_key, *params)] = delete_params(
+            self.params[base_key], *params)
 
+    @derives_params(_delete_kwargs_key)
     def delete_kwargs(self, base_key, args=None, kwargs=None):
         """
         Delete the ``*args`` or ``**kwargs`` part from the parameters section.
@@ -629,11 +2754,11 @@ class DocstringProcessor(object):
             warn("Neither args nor kwargs are given. I do nothing for %s" % (
                 base_key))
             return
-        ext = '.no' + ('_args' if args else '') + ('_kwargs' if kwargs else '')
         ret = delete_kwargs(self.params[base_key], args, kwargs)
-        self.params[base_key + ext] = ret
+        self.params[_delete_kwargs_key(base_key, args, kwargs)] = ret
         return ret
 
+    @derives_params(_types_key)
     def delete_types(self, base_key, out_key, *types):
         """
         Delete a parameter from a parameter documentation.
@@ -660,9 +2785,10 @@ class DocstringProcessor(object):
         --------
         delete_params
         """
-        self.params['%s.%s' % (base_key, out_key)] = delete_types(
+        self.params[_types_key(base_key, out_key)] = delete_types(
             self.params[base_key], *types)
 
+    @derives_params(_keep_params_key)
     def keep_params(self, base_key, *params):
         """
         Keep only specific parameters from a parameter documentation.
@@ -747,10 +2873,34 @@ class DocstringProcessor(object):
             ...     %(do_something.parameters.no_b)s'''
             ...     pass
 
+        Both can also be done on the fly, without registering a new key, by
+        using a ``keep`` or ``drop`` selector (see :data:`docrep.selectors`)
+        in the placeholder::
+
+            >>> @d.dedent
+            ... def do_less(a=1, c=4):
+            ...     '''
+            ...     My second function with only `a` and `c`
+            ...
+            ...     Parameters
+            ...     ----------
+            ...     %(do_something.parameters|drop:b)s'''
+            ...     pass
+
+            >>> print(do_less.__doc__)
+            My second function with only `a` and `c`
+            <BLANKLINE>
+            Parameters
+            ----------
+            a: int, optional
+                A dummy parameter description
+            c: float, optional
+                A third parameter
         """
-        self.params[base_key + '.' + '|'.join(params)] = keep_params(
+        self.params[_keep_params_key(base_key, *params)] = keep_params(
             self.params[base_key], *params)
 
+    @derives_params(_types_key)
     def keep_types(self, base_key, out_key, *types):
         """
         Keep only specific parameters from a parameter documentation.
@@ -830,7 +2980,7 @@ class DocstringProcessor(object):
             ...     %(do_something.returns.no_float)s'''
             ...     return do_something()[1]
         """
-        self.params['%s.%s' % (base_key, out_key)] = keep_types(
+        self.params[_types_key(base_key, out_key)] = keep_types(
             self.params[base_key], *types)
 
     @reads_docstring
@@ -1000,3 +3150,7 @@ class DocstringProcessor(object):
             removed_in="0.4.0")
 def dedents(s):
     pass
+
+
+# install the traced functions of this module while a tracer is active
+traceable(sys.modules[__name__])
@@ -0,0 +1,45 @@
+"""Command line interface of docrep.
+
+Available commands are
+
+check
+    Check the placeholders of a package (see :mod:`docrep.check`)
+profile
+    Attribute the import time of a package to docrep (see
+    :mod:`docrep.profile`)
+
+Run ``python -m docrep <command> --help`` for the options of a command.
+"""
+from __future__ import print_function
+import sys
+import importlib
+
+
+#: Mapping from command to the module that implements it
+commands = {
+    'check': 'docrep.check',
+    'profile': 'docrep.profile',
+}
+
+
+def main(args=None):
+    """Run a command of docrep
+
+    Parameters
+    ----------
+    args: list of str
+        The command line arguments. If None, :data:`sys.argv` is used
+    """
+    if args is None:
+        args = sys.argv[1:]
+    if not args or args[0] not in commands:
+        print("usage: python -m docrep {%s} ..." % ','.join(sorted(commands)),
+              file=sys.stderr)
+        return 0 if args and args[0] in ['-h', '--help'] else 2
+    command = args[0]
+    module = importlib.import_module(commands[command])
+    return module.main(args[1:], prog='python -m docrep ' + command) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
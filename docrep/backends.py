@@ -0,0 +1,585 @@
+"""Storage backends for the parameters of the :class:`DocstringProcessor`.
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import six
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+from six.moves import collections_abc
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # python < 3.8
+    shared_memory = resource_tracker = None
+
+
+#: The names of the shared memory blocks created in this process (or the
+#: process it has been forked from)
+_created_blocks = set()
+
+
+__all__ = [
+    "LazyValue",
+    "ParamsBackend",
+    "DictBackend",
+    "SQLiteBackend",
+    "ChainedParams",
+    "SharedMemoryParams",
+]
+
+
+class LazyValue(object):
+    """Base class for parameter values that are computed on first access.
+
+    Backends that set :attr:`ParamsBackend.supports_lazy_values` store these
+    objects as they are and replace them by the result of :meth:`materialize`
+    when the value is accessed for the first time. Subclasses may implement
+    ``__len__`` if the length is known without materializing the value."""
+
+    __slots__ = ()
+
+    def materialize(self):
+        """Compute the string of this value"""
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.materialize()
+
+
+class ParamsBackend(collections_abc.MutableMapping):
+    """Base class for the storage of the :attr:`DocstringProcessor.params`.
+
+    Subclasses have to implement the abstract methods of the
+    :class:`collections.abc.MutableMapping` interface. The :meth:`update`
+    method is called whenever the :class:`DocstringProcessor` stores several
+    keys at once (e.g. in :meth:`DocstringProcessor.get_sections`) and may be
+    reimplemented to write them in one batch.
+    """
+
+    #: Whether the backend accepts :class:`LazyValue` instances and
+    #: materializes them on access
+    supports_lazy_values = False
+
+    def close(self):
+        """Release the resources of this backend"""
+        pass
+
+    def nchars(self):
+        """Get the total number of characters of the stored values"""
+        return sum(len(self[key]) for key in self)
+
+    def iter_stored(self):
+        """Iterate over the keys and the values as they are stored
+
+        Other than :meth:`items`, this method does not materialize
+        :class:`LazyValue` instances."""
+        return ((key, self[key]) for key in self)
+
+    def __repr__(self):
+        return '<%s with %i keys>' % (self.__class__.__name__, len(self))
+
+
+class DictBackend(dict, ParamsBackend):
+    """The default backend that keeps all parameters in a :class:`dict`
+
+    This backend is a subclass of :class:`dict`, such that the
+    :attr:`DocstringProcessor.params` can still be used like a plain
+    dictionary (e.g. with :meth:`dict.copy` or :func:`json.dumps`).
+    :class:`LazyValue` instances are replaced by their string when they are
+    accessed for the first time."""
+
+    supports_lazy_values = True
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyValue):
+            value = value.materialize()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __iter__(self):
+        # reimplemented such that dict(backend) uses __getitem__
+        return dict.__iter__(self)
+
+    def _materialize(self):
+        """Replace all :class:`LazyValue` instances by their strings"""
+        lazy = [key for key, value in self.iter_stored()
+                if isinstance(value, LazyValue)]
+        for key in lazy:
+            self[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *args):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        if isinstance(value, LazyValue):
+            value = value.materialize()
+        return key, value
+
+    def items(self):
+        self._materialize()
+        return dict.items(self)
+
+    def values(self):
+        self._materialize()
+        return dict.values(self)
+
+    if six.PY2:
+        def iteritems(self):
+            self._materialize()
+            return dict.iteritems(self)
+
+        def itervalues(self):
+            self._materialize()
+            return dict.itervalues(self)
+
+    def copy(self):
+        """Get a plain :class:`dict` with the (materialized) parameters"""
+        self._materialize()
+        return dict(self.iter_stored())
+
+    def __eq__(self, other):
+        self._materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._materialize()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        return (self.__class__, (self.copy(), ))
+
+    def iter_stored(self):
+        return dict.iteritems(self) if six.PY2 else iter(dict.items(self))
+
+    def nchars(self):
+        """Get the total number of characters of the stored values
+
+        :class:`LazyValue` instances are not materialized. They are counted
+        with their length, if they define one, and with 0 otherwise."""
+        ret = 0
+        for key, value in self.iter_stored():
+            try:
+                ret += len(value)
+            except TypeError:  # a lazy value without length
+                pass
+        return ret
+
+
+class SQLiteBackend(ParamsBackend):
+    """A backend that stores the parameters in a SQLite database.
+
+    Only the `cache_size` most recently used values are kept in memory, such
+    that the memory usage is bounded independent of the number of keys. Note
+    that all values are stored as text. The backend can be used from multiple
+    threads, the access to the database and the cache is serialized with a
+    lock.
+
+    Parameters
+    ----------
+    database: str or dict
+        The path to the database file (or ``':memory:'``). If this is a
+        mapping, it is used as the initial `data` of an in-memory database,
+        such that the class can be used as
+        :attr:`~docrep.DocstringProcessor.params_backend`
+    data: dict
+        Initial parameters to store in the database
+    cache_size: int
+        The number of values to keep in the in-memory LRU cache
+    table: str
+        The name of the table to use in the database
+
+    Examples
+    --------
+    Use the backend for a new :class:`DocstringProcessor` via::
+
+        >>> from docrep import DocstringProcessor
+        >>> from docrep.backends import SQLiteBackend
+        >>> d = DocstringProcessor()
+        >>> d.set_params_backend(SQLiteBackend(':memory:'))
+        >>> @d.get_sections(base='func')
+        ... def func(a):
+        ...     '''A function
+        ...
+        ...     Parameters
+        ...     ----------
+        ...     a: int
+        ...         A parameter'''
+        >>> d.params['func.parameters']
+        'a: int\\n    A parameter'
+
+    To store the parameters of all processors of a subclass in a file, use
+    :func:`functools.partial` as the
+    :attr:`~docrep.DocstringProcessor.params_backend`::
+
+        >>> import functools
+        >>> class Processor(DocstringProcessor):
+        ...     params_backend = functools.partial(
+        ...         SQLiteBackend, ':memory:')
+        >>> Processor(a='x').params['a']
+        'x'
+    """
+
+    def __init__(self, database=':memory:', data=None, cache_size=256,
+                 table='docrep_params'):
+        if isinstance(database, collections_abc.Mapping):
+            database, data = ':memory:', database
+        self.database = database
+        self.table = table
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(database, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS "%s" '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL)' % table)
+        if data:
+            self.update(data)
+
+    def _cache_value(self, key, value):
+        cache = self._cache
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._cache.pop(key)
+            except KeyError:
+                row = self._conn.execute(
+                    'SELECT value FROM "%s" WHERE key = ?' % self.table,
+                    (key, )).fetchone()
+                if row is None:
+                    raise KeyError(key)
+                value = row[0]
+            self._cache_value(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        value = six.text_type(value)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO "%s" (key, value) VALUES (?, ?)' % (
+                    self.table), (key, value))
+            self._cache_value(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM "%s" WHERE key = ?' % self.table, (key, ))
+            self._cache.pop(key, None)
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._cache:
+                return True
+            return self._conn.execute(
+                'SELECT 1 FROM "%s" WHERE key = ?' % self.table,
+                (key, )).fetchone() is not None
+
+    def __iter__(self):
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute(
+                'SELECT key FROM "%s"' % self.table)]
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM "%s"' % self.table).fetchone()[0]
+
+    def update(self, *args, **kwargs):
+        """Store multiple values in one transaction"""
+        items = [(key, six.text_type(value)) for key, value in six.iteritems(
+            dict(*args, **kwargs))]
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO "%s" (key, value) VALUES (?, ?)' % (
+                    self.table), items)
+            if self.cache_size:
+                for key, value in items[-self.cache_size:]:
+                    self._cache_value(key, value)
+
+    def nchars(self):
+        """Get the total number of characters of the stored values"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COALESCE(SUM(LENGTH(value)), 0) FROM "%s"' % (
+                    self.table)).fetchone()[0]
+
+    def close(self):
+        """Close the connection to the database"""
+        with self._lock:
+            self._cache.clear()
+            self._conn.close()
+
+
+class ChainedParams(ParamsBackend):
+    """A layered view on the parameters of a parent processor.
+
+    Values are stored in the `local` backend, lookups fall through to the
+    `parent` mapping if the key is not found locally. Creating this view does
+    not copy any parameters and later updates of the parent are visible.
+
+    Parameters
+    ----------
+    parent: collections.abc.Mapping
+        The parameters of the parent
+    local: ParamsBackend
+        The storage for the local parameters. If None, a new
+        :class:`DictBackend` is used
+    """
+
+    def __init__(self, parent, local=None):
+        self.parent = parent
+        self.local = DictBackend() if local is None else local
+
+    @property
+    def supports_lazy_values(self):
+        return getattr(self.local, 'supports_lazy_values', False)
+
+    def __getitem__(self, key):
+        try:
+            return self.local[key]
+        except KeyError:
+            return self.parent[key]
+
+    def __setitem__(self, key, value):
+        self.local[key] = value
+
+    def __delitem__(self, key):
+        """Delete a local key. Keys of the parent cannot be deleted"""
+        del self.local[key]
+
+    def __contains__(self, key):
+        return key in self.local or key in self.parent
+
+    def __iter__(self):
+        local = self.local
+        for key in local:
+            yield key
+        for key in self.parent:
+            if key not in local:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def update(self, *args, **kwargs):
+        self.local.update(*args, **kwargs)
+
+
+class SharedMemoryParams(collections_abc.Mapping):
+    """A read-only view on parameters in a shared memory segment.
+
+    The keys and values are stored as UTF-8 in a
+    :class:`multiprocessing.shared_memory.SharedMemory` block together with a
+    sorted index. Lookups use a binary search on the index and decode only the
+    requested value, such that processes that fork from the creating process
+    can render their docstrings without making private copies of the
+    parameters (as it happens with a :class:`dict` whose reference counts are
+    updated in every process).
+
+    Use the :meth:`create` method (or
+    :meth:`DocstringProcessor.share_params`) to put parameters into shared
+    memory and :meth:`attach` to access them from an unrelated process. This
+    requires python 3.8 or later.
+
+    Parameters
+    ----------
+    shm: multiprocessing.shared_memory.SharedMemory
+        The shared memory block with the parameters
+    """
+
+    _magic = b'DOCREP01'
+
+    _header = struct.Struct('<8sQ')
+
+    _entry = struct.Struct('<4Q')
+
+    def __init__(self, shm):
+        self.shm = shm
+        self._buf = shm.buf.toreadonly()
+        magic, self._n = self._header.unpack_from(self._buf, 0)
+        if magic != self._magic:
+            raise ValueError(
+                "Shared memory block %s does not contain docrep parameters" % (
+                    shm.name))
+
+    @property
+    def name(self):
+        """The name of the shared memory block"""
+        return self.shm.name
+
+    @classmethod
+    def create(cls, params, name=None):
+        """Copy parameters into a new shared memory block.
+
+        Parameters
+        ----------
+        params: dict
+            The parameters to share
+        name: str
+            The name of the shared memory block. If None, a unique name is
+            created
+
+        Returns
+        -------
+        SharedMemoryParams
+            The read-only view on the shared parameters
+        """
+        if shared_memory is None:
+            raise ImportError(
+                "Shared parameters require python 3.8 or later!")
+        items = sorted(
+            (six.text_type(key).encode('utf-8'),
+             six.text_type(value).encode('utf-8'))
+            for key, value in six.iteritems(dict(params)))
+        offset = cls._header.size + cls._entry.size * len(items)
+        index = []
+        for key, value in items:
+            index.append((offset, len(key), offset + len(key), len(value)))
+            offset += len(key) + len(value)
+        shm = shared_memory.SharedMemory(name, create=True,
+                                         size=max(offset, 1))
+        buf = shm.buf
+        cls._header.pack_into(buf, 0, cls._magic, len(items))
+        pos = cls._header.size
+        for (key, value), entry in zip(items, index):
+            cls._entry.pack_into(buf, pos, *entry)
+            pos += cls._entry.size
+            buf[entry[0]:entry[0] + entry[1]] = key
+            buf[entry[2]:entry[2] + entry[3]] = value
+        del buf
+        _created_blocks.add(shm.name)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing block of shared parameters.
+
+        Parameters
+        ----------
+        name: str
+            The name of the shared memory block (see :attr:`name`)
+        """
+        if shared_memory is None:
+            raise ImportError(
+                "Shared parameters require python 3.8 or later!")
+        try:
+            shm = shared_memory.SharedMemory(name, track=False)
+        except TypeError:  # python < 3.13
+            shm = shared_memory.SharedMemory(name)
+            # otherwise the resource tracker of this process would destroy
+            # the block when the process exits. The tracker of a forked
+            # process is shared with the process that created the block
+            if os.name == 'posix' and shm.name not in _created_blocks:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm)
+
+    def _get_entry(self, i):
+        return self._entry.unpack_from(
+            self._buf, self._header.size + i * self._entry.size)
+
+    def _find(self, key):
+        key = six.text_type(key).encode('utf-8')
+        buf = self._buf
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, val_off, val_len = self._get_entry(mid)
+            candidate = buf[key_off:key_off + key_len].tobytes()
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return val_off, val_len
+        return None
+
+    def __getitem__(self, key):
+        entry = self._find(key)
+        if entry is None:
+            raise KeyError(key)
+        return six.text_type(
+            self._buf[entry[0]:entry[0] + entry[1]].tobytes(), 'utf-8')
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __iter__(self):
+        buf = self._buf
+        for i in range(self._n):
+            key_off, key_len = self._get_entry(i)[:2]
+            yield six.text_type(
+                buf[key_off:key_off + key_len].tobytes(), 'utf-8')
+
+    def __len__(self):
+        return self._n
+
+    def __setitem__(self, key, value):
+        raise TypeError("Shared parameters are read-only!")
+
+    def update(self, *args, **kwargs):
+        raise TypeError("Shared parameters are read-only!")
+
+    def __repr__(self):
+        return '<%s %r with %i keys>' % (
+            self.__class__.__name__, self.name, len(self))
+
+    def close(self):
+        """Close the access to the shared memory in this process"""
+        self._buf.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory block
+
+        This should be called once (and only once) by the process that
+        created the block, when the parameters are not needed anymore."""
+        self.shm.unlink()
+        _created_blocks.discard(self.name)
@@ -0,0 +1,540 @@
+"""Check the docrep placeholders of a package.
+
+This module imports every module of one or more packages and reports
+
+- placeholders like ``%(key)s`` whose key is not registered (invalid keys),
+  together with the location of the template, and
+- keys of the :class:`~docrep.DocstringProcessor` instances that are never
+  used in a docstring or to derive another key (unused keys).
+
+The modules are imported in a pool of worker processes. Every worker imports
+one module in a fresh (spawned) process and the reports of the workers are
+merged.
+The results are cached by the hashes of the source files that were imported
+for a module, such that unchanged modules are skipped on the next run. Run it
+via::
+
+    python -m docrep check <package> [<package> ...]
+
+Use ``python -m docrep check --help`` for the available options. Note that
+this module requires python 3.
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os.path as osp
+import sys
+import ast
+import gc
+import re
+import json
+import hashlib
+import argparse
+import importlib
+import importlib.machinery
+import multiprocessing
+import pkgutil
+import traceback
+import warnings
+import docrep
+from docrep.backends import DictBackend
+
+
+__all__ = [
+    "CheckReport",
+    "find_modules",
+    "check_module",
+    "check_static",
+    "check_packages",
+    "main",
+]
+
+
+#: The default file for the cache of the results
+CACHE_FILE = '.docrep_check_cache.json'
+
+
+_invalid_key_patt = re.compile(r'(.+) is not a valid key!$')
+
+
+class _RecordingBackend(DictBackend):
+    """A :class:`~docrep.backends.DictBackend` that records the keys that are
+    read
+
+    It is used as the :attr:`~docrep.DocstringProcessor.params_backend` of the
+    processors that are created in a worker of :func:`check_module`."""
+
+    #: The keys that have been read from any instance
+    accessed = set()
+
+    def __getitem__(self, key):
+        value = super(_RecordingBackend, self).__getitem__(key)
+        self.accessed.add(key)
+        return value
+
+
+def _parse_invalid_key(w):
+    """Get the key of a warning about an invalid key (or None)"""
+    m = _invalid_key_patt.match(str(w.message))
+    if not issubclass(w.category, SyntaxWarning) or m is None:
+        return None
+    try:
+        return ast.literal_eval(m.group(1))
+    except (ValueError, SyntaxError):
+        return m.group(1)
+
+
+def _hash_file(fname):
+    with open(fname, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _find_spec(modname):
+    """Find the spec of a module without importing its parent packages"""
+    spec = None
+    path = None
+    parts = modname.split('.')
+    for i in range(len(parts)):
+        spec = importlib.machinery.PathFinder.find_spec(
+            '.'.join(parts[:i+1]), path)
+        if spec is None:
+            return None
+        path = spec.submodule_search_locations
+        if path is None and i < len(parts) - 1:
+            return None
+    return spec
+
+
+def find_modules(package):
+    """Find a package and all its submodules without importing them
+
+    Parameters
+    ----------
+    package: str
+        The name of the package (or module)
+
+    Returns
+    -------
+    list of str
+        The names of `package` and all its submodules
+
+    Raises
+    ------
+    ImportError
+        If `package` cannot be found
+    """
+    spec = _find_spec(package)
+    if spec is None:
+        raise ImportError("No module named %r" % package)
+    ret = [package]
+    if spec.submodule_search_locations is not None:
+        for finder, name, ispkg in pkgutil.iter_modules(
+                spec.submodule_search_locations):
+            ret.extend(find_modules(package + '.' + name))
+    return ret
+
+
+class _KeyRecorder(object):
+    """Record the registered, used and invalid keys of all processors
+
+    Within the context, new processors record the keys that are read and all
+    warnings about invalid keys are collected."""
+
+    def __enter__(self):
+        Processor = docrep.DocstringProcessor
+        self._old = (Processor.__dict__.get('params_backend'),
+                     Processor.__dict__.get('missing_keys'))
+        Processor.params_backend = _RecordingBackend
+        Processor.missing_keys = 'warn'
+        _RecordingBackend.accessed = self.accessed = set()
+        self._catcher = warnings.catch_warnings(record=True)
+        self.caught = self._catcher.__enter__()
+        warnings.simplefilter('always', SyntaxWarning)
+        return self
+
+    def __exit__(self, *args):
+        self._catcher.__exit__(*args)
+        Processor = docrep.DocstringProcessor
+        Processor.params_backend, Processor.missing_keys = self._old
+
+    def registered(self, processors=None):
+        """Get the keys with a non-empty value in the `processors` (by
+        default all processors)"""
+        registered = set()
+        if processors is None:
+            processors = _find_processors()
+        for processor in processors:
+            registered.update(key for key, val in processor._own_params(
+                ).iter_stored() if val)
+        return sorted(registered)
+
+    def missing(self):
+        """Get the invalid keys as list of ``[key, filename, lineno]``"""
+        ret = []
+        for w in self.caught:
+            key = _parse_invalid_key(w)
+            if key is not None:
+                entry = [key, w.filename, w.lineno]
+                if entry not in ret:
+                    ret.append(entry)
+        return ret
+
+
+def check_module(modname, roots=()):
+    """Import a module and record the registered, used and invalid keys
+
+    This function is meant to run in a fresh process (see
+    :func:`check_packages`). The :class:`~docrep.DocstringProcessor` instances
+    that are created during the import record which keys are read, and the
+    warnings about invalid keys are collected.
+
+    Parameters
+    ----------
+    modname: str
+        The name of the module to import
+    roots: list of str
+        The directories of the checked packages. The hashes of all source
+        files in these directories that are imported together with `modname`
+        are part of the result
+
+    Returns
+    -------
+    dict
+        The report with the ``'module'``, the hashes of the imported
+        ``'files'``, the ``'registered'`` and ``'used'`` keys, the
+        ``'missing'`` keys as a list of ``[key, filename, lineno]`` and the
+        ``'error'`` (a traceback) if the module could not be imported
+    """
+    ret = {'module': modname, 'files': {}, 'registered': [], 'used': [],
+           'missing': [], 'error': None}
+    with _KeyRecorder() as recorder:
+        try:
+            importlib.import_module(modname)
+            # render the docstrings of processors in deferred mode
+            for processor in _find_processors():
+                if processor._deferred_ops:
+                    processor.resolve()
+        except Exception:
+            ret['error'] = traceback.format_exc()
+    ret['registered'] = recorder.registered()
+    ret['used'] = sorted(recorder.accessed)
+    ret['missing'] = recorder.missing()
+    roots = [osp.join(osp.abspath(root), '') for root in roots]
+    for module in list(sys.modules.values()):
+        fname = getattr(module, '__file__', None)
+        if fname and osp.exists(fname) and any(
+                osp.abspath(fname).startswith(root) for root in roots):
+            ret['files'][osp.abspath(fname)] = _hash_file(fname)
+    spec = _find_spec(modname)
+    if spec is not None and spec.origin and osp.exists(spec.origin):
+        ret['files'][osp.abspath(spec.origin)] = _hash_file(spec.origin)
+    return ret
+
+
+def check_static(packages):
+    """Extract packages statically and record the registered, used and
+    invalid keys
+
+    This function uses the :class:`docrep.static.StaticExtractor` and is
+    meant to run in a separate process because dynamic modules are
+    imported (see :func:`check_packages`).
+
+    Parameters
+    ----------
+    packages: list of str
+        The names of the packages
+
+    Returns
+    -------
+    list of dict
+        The reports of the modules (see :func:`check_module`). The registered
+        and used keys of all modules are part of the first report
+    """
+    from docrep.static import StaticExtractor
+    extractor = StaticExtractor()
+    with _KeyRecorder() as recorder:
+        modules = [module for package in packages
+                   for module in extractor.extract_package(package)]
+    ret = []
+    for module in modules:
+        ret.append({'module': module.name, 'files': {}, 'registered': [],
+                    'used': [], 'missing': [list(t) for t in module.missing],
+                    'error': module.error})
+    if not ret:
+        return ret
+    # only the processors of the packages, not the ones that this process
+    # inherited from its parent
+    first = ret[0]
+    first['registered'] = recorder.registered(
+        set(extractor.processors.values()))
+    first['used'] = sorted(recorder.accessed)
+    first['missing'].extend(entry for entry in recorder.missing()
+                            if entry not in first['missing'])
+    return ret
+
+
+def _find_processors():
+    return [obj for obj in gc.get_objects()
+            if isinstance(obj, docrep.DocstringProcessor)]
+
+
+class CheckReport(object):
+    """The merged results of :func:`check_module` for several modules"""
+
+    def __init__(self):
+        #: The modules that have been checked
+        self.modules = []
+        #: The modules whose results have been taken from the cache
+        self.cached = []
+        #: Mapping from the invalid keys to a sorted list of
+        #: ``(filename, lineno)`` tuples
+        self.missing = {}
+        #: The keys that are registered in any processor
+        self.registered = set()
+        #: The keys that are used in any docstring or for deriving other keys
+        self.used = set()
+        #: Mapping from module name to the traceback of the import error
+        self.errors = {}
+
+    @property
+    def unused(self):
+        """The registered keys that are never used"""
+        return self.registered - self.used
+
+    def add(self, result, cached=False):
+        """Add the result of :func:`check_module`"""
+        modname = result['module']
+        self.modules.append(modname)
+        if cached:
+            self.cached.append(modname)
+        self.registered.update(result['registered'])
+        self.used.update(result['used'])
+        for key, fname, lineno in result['missing']:
+            origins = self.missing.setdefault(key, [])
+            if (fname, lineno) not in origins:
+                origins.append((fname, lineno))
+                origins.sort()
+        if result['error']:
+            self.errors[modname] = result['error']
+
+    def format(self, unused=True):
+        """Format the report as text
+
+        Parameters
+        ----------
+        unused: bool
+            If True, include the unused keys"""
+        if not self.modules:
+            return 'nothing to check'
+        lines = []
+        for modname, error in sorted(self.errors.items()):
+            lines.append('error: failed to import %s\n%s' % (
+                modname, error.rstrip()))
+        for key, origins in sorted(self.missing.items()):
+            lines.extend('%s:%i: invalid key %r' % (fname, lineno, key)
+                         for fname, lineno in origins)
+        if unused:
+            lines.extend('unused key %r' % key for key in sorted(self.unused))
+        lines.append(
+            '%i modules checked (%i cached): %i invalid keys, %s%i errors' % (
+                len(self.modules), len(self.cached), len(self.missing),
+                '%i unused keys, ' % len(self.unused) if unused else '',
+                len(self.errors)))
+        return '\n'.join(lines)
+
+    def to_dict(self, unused=True):
+        """Get the report as a JSON serializable :class:`dict`"""
+        ret = {
+            'modules': sorted(self.modules),
+            'cached': sorted(self.cached),
+            'missing': {key: [list(o) for o in origins]
+                        for key, origins in self.missing.items()},
+            'errors': self.errors,
+            }
+        if unused:
+            ret['unused'] = sorted(self.unused)
+        return ret
+
+    def failed(self, unused=True):
+        """Check whether the report contains any problem"""
+        return bool(self.errors or self.missing or (unused and self.unused))
+
+
+def _load_cache(fname):
+    if not fname or not osp.exists(fname):
+        return {}
+    try:
+        with open(fname) as f:
+            cache = json.load(f)
+    except ValueError:
+        return {}
+    if cache.get('docrep') != docrep.__version__:
+        return {}
+    return cache.get('modules', {})
+
+
+def _is_valid(result, hashes):
+    """Check whether the imported files of a cached result are unchanged"""
+    for fname, sha in result['files'].items():
+        if fname not in hashes:
+            hashes[fname] = _hash_file(fname) if osp.exists(fname) else None
+        if hashes[fname] != sha:
+            return False
+    return bool(result['files'])
+
+
+def _get_pool(processes=None):
+    """Get a pool of fresh worker processes
+
+    The workers are spawned, because forked workers would inherit the modules
+    that have already been imported by the calling process and nothing would
+    be recorded for them."""
+    return multiprocessing.get_context('spawn').Pool(
+        processes, maxtasksperchild=1)
+
+
+def check_packages(packages, processes=None, cache=CACHE_FILE,
+                   static=False):
+    """Check the docrep placeholders of packages
+
+    Parameters
+    ----------
+    packages: list of str
+        The names of the packages to check
+    processes: int
+        The number of worker processes. If None, the number of CPUs is used
+    cache: str
+        The JSON file for caching the results. If None, no cache is used
+    static: bool
+        If True, extract the docstrings with the
+        :class:`docrep.static.StaticExtractor` in one worker process instead
+        of importing every module. Only the modules that cannot be processed
+        statically are imported. `processes` and `cache` are ignored in this
+        case
+
+    Returns
+    -------
+    CheckReport
+        The merged results of all modules
+    """
+    if static:
+        pool = _get_pool(1)
+        try:
+            results = pool.apply(check_static, (packages, ))
+        finally:
+            pool.close()
+            pool.join()
+        report = CheckReport()
+        for result in results:
+            report.add(result)
+        return report
+    modules = []
+    roots = []
+    for package in packages:
+        spec = _find_spec(package)
+        if spec is None:
+            raise ImportError("No module named %r" % package)
+        roots.extend(spec.submodule_search_locations or
+                     [osp.dirname(spec.origin)])
+        modules.extend(find_modules(package))
+    cached = _load_cache(cache)
+    hashes = {}
+    report = CheckReport()
+    todo = []
+    for modname in modules:
+        result = cached.get(modname)
+        if result is not None and not result['error'] and _is_valid(
+                result, hashes):
+            report.add(result, cached=True)
+        else:
+            todo.append(modname)
+    if todo:
+        # every module is imported in a new process
+        pool = _get_pool(processes)
+        try:
+            results = pool.starmap(check_module,
+                                   [(modname, roots) for modname in todo],
+                                   chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        for result in results:
+            report.add(result)
+            cached[result['module']] = result
+    if cache:
+        with open(cache, 'w') as f:
+            json.dump({'docrep': docrep.__version__,
+                       'modules': {modname: cached[modname]
+                                   for modname in modules}},
+                      f, indent=1, sort_keys=True)
+    return report
+
+
+def main(args=None, prog='python -m docrep check'):
+    """Run the check from the command line
+
+    Parameters
+    ----------
+    args: list of str
+        The command line arguments. If None, :data:`sys.argv` is used
+    prog: str
+        The name of the program in the help
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any invalid or unused key has been found or a
+        module could not be imported, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=("Check that all placeholders in the docstrings of a "
+                     "package are valid and that all registered keys are "
+                     "used."))
+    parser.add_argument('packages', nargs='+', metavar='package',
+                        help="The packages to check")
+    parser.add_argument(
+        '-j', '--jobs', type=int,
+        help="The number of worker processes. Default: number of CPUs")
+    parser.add_argument(
+        '--cache', default=CACHE_FILE,
+        help="The file for caching the results. Default: %(default)s")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not use and do not update the cache")
+    parser.add_argument('--ignore-unused', action='store_true',
+                        help="Do not report keys that are never used")
+    parser.add_argument('--json', action='store_true',
+                        help="Print the report as JSON")
+    parser.add_argument(
+        '--static', action='store_true',
+        help=("Extract the docstrings from the source code without importing "
+              "the modules (see docrep.static). Only modules that cannot be "
+              "processed statically are imported"))
+    args = parser.parse_args(args)
+
+    report = check_packages(args.packages, args.jobs,
+                            None if args.no_cache else args.cache,
+                            args.static)
+    unused = not args.ignore_unused
+    if args.json:
+        print(json.dumps(report.to_dict(unused), indent=1, sort_keys=True))
+    else:
+        print(report.format(unused))
+    return int(report.failed(unused))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
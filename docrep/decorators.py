@@ -21,6 +21,7 @@ import types
 import inspect
 from warnings import warn
 import functools
+from docrep import tracing
 
 
 deprecated_doc = """
@@ -32,6 +33,24 @@ deprecated_doc = """
 """
 
 
+def _with_traced(decorator):
+    """Apply a decorator to the traced version of a function, too
+
+    See :func:`docrep.tracing.traced`"""
+
+    @functools.wraps(decorator)
+    def decorate(func, *args, **kwargs):
+        ret = decorator(func, *args, **kwargs)
+        trace = getattr(func, '_traced', None)
+        if trace is not None:
+            ret._traced = decorator(trace, *args, **kwargs)
+            ret._traced._untraced = ret
+        return ret
+
+    return decorate
+
+
+@_with_traced
 def updates_docstring(func):
     """Decorate a method that updates the docstring of a function."""
 
@@ -40,19 +59,28 @@ def updates_docstring(func):
         if not len(args) or isinstance(args[0], six.string_types):
             return func(self, *args, **kwargs)
         elif len(args) and callable(args[0]):
-            doc = func(self, args[0].__doc__, *args[1:], **kwargs)
-            _set_object_doc(args[0], doc, py2_class=self.python2_classes)
+            if self.deferred:
+                self._defer(func, args[0], args[1:], kwargs)
+                return args[0]
+            doc = tracing.labelled(args[0], func, self, args[0].__doc__,
+                                   *args[1:], **kwargs)
+            self._set_doc(args[0], doc)
             return args[0]
         else:
             def decorator(f):
-                doc = func(self, f.__doc__, *args, **kwargs)
-                _set_object_doc(f, doc, py2_class=self.python2_classes)
+                if self.deferred:
+                    self._defer(func, f, args, kwargs)
+                    return f
+                doc = tracing.labelled(f, func, self, f.__doc__, *args,
+                                       **kwargs)
+                self._set_doc(f, doc)
                 return f
             return decorator
 
     return update_docstring
 
 
+@_with_traced
 def reads_docstring(func):
     """Decorate a method that accepts a string or function."""
 
@@ -61,13 +89,23 @@ def reads_docstring(func):
         # if only the base key is provided, use this method
         if s:
             if callable(s):
-                return func(self, s.__doc__, base, *args, **kwargs)
+                if self.deferred and base:
+                    self._defer(func, s, (base, ) + args, kwargs, prefix=base)
+                    # extract from the current docstring without storing the
+                    # keys to return the same as in immediate mode
+                    return func(self, s.__doc__, None, *args, **kwargs)
+                return tracing.labelled(s, func, self, s.__doc__, base,
+                                        *args, **kwargs)
             else:
                 return func(self, s, base, *args, **kwargs)
         elif base:
 
             def decorator(f):
-                func(self, f.__doc__, base, *args, **kwargs)
+                if self.deferred:
+                    self._defer(func, f, (base, ) + args, kwargs, prefix=base)
+                    return f
+                tracing.labelled(f, func, self, f.__doc__, base, *args,
+                                 **kwargs)
                 return f
 
             return decorator
@@ -77,6 +115,39 @@ def reads_docstring(func):
     return use_docstring
 
 
+def derives_params(get_key):
+    """Decorate a method that derives a new key from another one.
+
+    Parameters
+    ----------
+    get_key: callable
+        A function that takes the arguments of the decorated method (without
+        ``self``) and returns the key that the method stores in the
+        :attr:`~docrep.DocstringProcessor.params` (or None, if the method does
+        not store anything)
+    """
+
+    def decorate(func):
+
+        @functools.wraps(func)
+        def derive(self, base_key, *args, **kwargs):
+            if self.deferred:
+                key = get_key(base_key, *args, **kwargs)
+                if key is not None:
+                    self._defer(func, None, (base_key, ) + args, kwargs,
+                                key=key, consumes=[base_key])
+                    return
+            if tracing.active_tracer is not None:
+                return tracing.labelled(
+                    get_key(base_key, *args, **kwargs), func, self,
+                    base_key, *args, **kwargs)
+            return func(self, base_key, *args, **kwargs)
+
+        return derive
+
+    return decorate
+
+
 def deprecated(replacement, version, replace=True, replacement_name=None,
                removed_in=None):
     """Mark a method as deprecated.
@@ -0,0 +1,289 @@
+"""Attribute the import time of a package to docrep.
+
+This module imports a package with :mod:`docrep.tracing` enabled and prints
+an ``-X importtime`` like tree that shows for each imported module the time
+spent in docrep (extracting sections, deriving parameters, rendering
+docstrings and emitting warnings) and the time of the module's own import
+work, followed by the most expensive templates and keys. Run it via::
+
+    python -m docrep.profile <package>
+
+Use ``python -m docrep.profile --help`` for the available options. Note that
+this module requires python 3.
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import sys
+import argparse
+import importlib
+import pkgutil
+from docrep.tracing import Tracer, _timer
+
+
+__all__ = [
+    "categories",
+    "ImportNode",
+    "ImportProfiler",
+    "profile_import",
+    "main",
+]
+
+
+#: Mapping from the category in the report to the traced operations
+categories = {
+    'extract': ['get_sections'],
+    'derive': ['delete_params', 'delete_types', 'delete_kwargs',
+               'keep_params', 'keep_types'],
+    'render': ['__call__', 'dedent', 'with_indent', 'safe_modulo'],
+    'warn': ['warning'],
+}
+
+
+class ImportNode(object):
+    """A module in the import tree
+
+    Parameters
+    ----------
+    name: str
+        The name of the module
+    """
+
+    def __init__(self, name):
+        self.name = name
+        #: The modules that have been imported by this module
+        self.children = []
+        #: The time for importing this module (including its children)
+        self.cumulative = 0.0
+        #: The time spent in docrep per category in :data:`categories`
+        self.docrep = dict.fromkeys(categories, 0.0)
+
+    @property
+    def docrep_total(self):
+        """The time spent in docrep during the import of this module
+
+        Warnings are emitted during the rendering and therefore not part of
+        the total."""
+        docrep = self.docrep
+        return docrep['extract'] + docrep['derive'] + docrep['render']
+
+    @property
+    def self_time(self):
+        """The time of the module's own import work (without docrep)"""
+        return (self.cumulative - self.docrep_total -
+                sum(child.cumulative for child in self.children))
+
+    def walk(self, depth=0):
+        """Iterate over this node and all its descendants
+
+        Yields
+        ------
+        int
+            The depth of the node in the tree
+        ImportNode
+            The node"""
+        yield depth, self
+        for child in self.children:
+            for item in child.walk(depth + 1):
+                yield item
+
+
+class _TimedLoader(object):
+    """A proxy for a loader that measures the execution of a module"""
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self.profiler.stack
+        node = ImportNode(module.__name__)
+        stack[-1].children.append(node)
+        stack.append(node)
+        t0 = _timer()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            node.cumulative = _timer() - t0
+            stack.pop()
+            # restore the original loader
+            module.__loader__ = self.loader
+            if getattr(module, '__spec__', None) is not None:
+                module.__spec__.loader = self.loader
+
+
+class ImportProfiler(object):
+    """A meta path finder that measures the import time of the modules
+
+    Use it as a context manager to record the import tree in :attr:`root`.
+    """
+
+    def __init__(self):
+        #: The root of the import tree
+        self.root = ImportNode(None)
+        self.stack = [self.root]
+        self._finding = set()
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *args):
+        sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                find_spec = getattr(finder, 'find_spec', None)
+                if finder is self or find_spec is None:
+                    continue
+                spec = find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+
+def profile_import(modname, recursive=False):
+    """Import a module and record the import tree and the docrep operations
+
+    Parameters
+    ----------
+    modname: str
+        The name of the module to import. It must not have been imported
+        already
+    recursive: bool
+        If True and `modname` is a package, import all its submodules, too
+
+    Returns
+    -------
+    ImportNode
+        The root of the import tree. The time in docrep is attributed to the
+        modules in the tree
+    docrep.tracing.Tracer
+        The tracer with the records of the docrep operations
+    """
+    with Tracer() as tracer, ImportProfiler() as profiler:
+        module = importlib.import_module(modname)
+        if recursive and hasattr(module, '__path__'):
+            for finder, name, ispkg in pkgutil.walk_packages(
+                    module.__path__, module.__name__ + '.'):
+                importlib.import_module(name)
+    nodes = {}
+    for depth, node in profiler.root.walk():
+        nodes.setdefault(node.name, node)
+    op_categories = {op: category for category, ops in categories.items()
+                     for op in ops}
+    for record in tracer.records:
+        category = op_categories.get(record.op)
+        node = nodes.get(record.module)
+        if category is None or node is None:
+            continue
+        if record.depth == 0 or category == 'warn':
+            node.docrep[category] += record.time
+    return profiler.root, tracer
+
+
+def _format_tree(root, min_time=0.0):
+    header = ['self [ms]', 'docrep [ms]', 'cumulative [ms]'] + [
+        '%s [ms]' % category for category in categories] + ['module']
+    rows = []
+    for depth, node in root.walk(-1):
+        if node is root or node.cumulative * 1e3 < min_time:
+            continue
+        rows.append(
+            ['%.3f' % (t * 1e3) for t in [
+                node.self_time, node.docrep_total, node.cumulative] +
+             [node.docrep[category] for category in categories]] +
+            ['  ' * depth + node.name])
+    return _format_table(header, rows)
+
+
+def _format_table(header, rows):
+    widths = [max(len(row[i]) for row in [header] + rows)
+              for i in range(len(header) - 1)]
+    return '\n'.join(
+        ' | '.join([cell.rjust(w) for cell, w in zip(row, widths)] +
+                   [row[-1]])
+        for row in [header] + rows)
+
+
+def _format_top(tracer, ops, title, top):
+    groups = tracer.summary(by=('label', 'module'), depth=0, ops=ops)[:top]
+    header = ['time [ms]', 'count', 'output', title]
+    rows = [['%.3f' % (g['time'] * 1e3), str(g['count']),
+             str(g['output_size']), '%s (%s)' % (g['label'], g['module'])]
+            for g in groups]
+    return _format_table(header, rows)
+
+
+def main(args=None, prog='python -m docrep.profile'):
+    """Run the profiler from the command line
+
+    Parameters
+    ----------
+    args: list of str
+        The command line arguments. If None, :data:`sys.argv` is used
+    prog: str
+        The name of the program in the help
+    """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=("Import a package and report the time spent in docrep "
+                     "for every imported module."))
+    parser.add_argument('package', help="The package to import")
+    parser.add_argument(
+        '-n', '--top', type=int, default=10,
+        help="The number of templates and keys to show. Default: %(default)s")
+    parser.add_argument(
+        '-r', '--recursive', action='store_true',
+        help="Import all submodules of the package, too")
+    parser.add_argument(
+        '--min-time', type=float, default=0.0,
+        help=("Hide modules whose cumulative import time in milliseconds is "
+              "below this threshold. Default: %(default)s"))
+    args = parser.parse_args(args)
+
+    if args.package in sys.modules:
+        parser.error("%s has already been imported" % args.package)
+
+    root, tracer = profile_import(args.package, args.recursive)
+    print(_format_tree(root, args.min_time))
+    print()
+    print("Most expensive templates")
+    print(_format_top(tracer, categories['render'], 'template', args.top))
+    print()
+    print("Most expensive keys")
+    print(_format_top(tracer, categories['extract'] + categories['derive'],
+                      'key', args.top))
+
+
+if __name__ == '__main__':
+    main()
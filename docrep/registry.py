@@ -0,0 +1,201 @@
+"""A registry for parameters that are published by other packages.
+
+Packages can publish precomputed parameters of their
+:class:`~docrep.DocstringProcessor` through an entry point in the
+``docrep.params`` group. The name of the entry point is the prefix for the keys
+and its value is an object reference of the form ``module:attr``, where
+
+- ``attr`` is the name of a JSON file in the directory of the package
+  ``module`` (as created by :meth:`docrep.DocstringProcessor.export_params`),
+  e.g. in the ``setup.cfg``::
+
+      [options.entry_points]
+      docrep.params =
+          upstream = upstream:docrep_params.json
+
+  The file is located without importing the publishing package at all.
+  Remember to include the file in the package data of the distribution.
+- or ``attr`` is a mapping (or a callable that returns a mapping), e.g.
+  ``upstream.docs:params``. The module is imported when the first key is
+  requested.
+
+The :class:`ParamsRegistry` resolves the keys lazily, i.e. the export of
+``upstream`` is only loaded when a key like ``'upstream.func.parameters'`` is
+requested. Use :meth:`docrep.DocstringProcessor.use_registry` to make the
+published parameters available to a processor.
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import io
+import os
+import json
+import importlib.util
+import six
+from six.moves import collections_abc
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # python < 3.8
+    try:
+        import importlib_metadata
+    except ImportError:
+        importlib_metadata = None
+
+
+__all__ = [
+    "ENTRY_POINT_GROUP",
+    "ParamsRegistry",
+    "load_export",
+    "registry",
+]
+
+
+#: The entry point group for published parameters
+ENTRY_POINT_GROUP = 'docrep.params'
+
+
+def load_export(fname):
+    """Load parameters that have been exported to a JSON file
+
+    Parameters
+    ----------
+    fname: str
+        The path to the file
+
+    Returns
+    -------
+    dict
+        The exported parameters
+
+    See Also
+    --------
+    docrep.DocstringProcessor.export_params
+    """
+    with io.open(str(fname), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _locate_resource(module, fname):
+    """Get the path of a file in the directory of a package
+
+    The package (and its parents) are not imported."""
+    from docrep.check import _find_spec
+    spec = _find_spec(module) or importlib.util.find_spec(module)
+    if spec is None:
+        raise ImportError("No module named %r" % module)
+    dirs = spec.submodule_search_locations or [os.path.dirname(spec.origin)]
+    for dirname in dirs:
+        path = os.path.join(dirname, fname)
+        if os.path.exists(path):
+            return path
+    raise IOError("No file %r in the directory of %s" % (fname, module))
+
+
+class ParamsRegistry(collections_abc.Mapping):
+    """A lazy mapping of the parameters that are published by other packages.
+
+    Keys are of the form ``'<name>.<key>'``, where ``<name>`` is the name of
+    the entry point (or of a source that has been added via :meth:`register`)
+    and ``<key>`` is a key in its export. The export of a source is only
+    loaded when one of its keys is requested.
+
+    Parameters
+    ----------
+    group: str
+        The entry point group to use. If None, no entry points are used and
+        all sources must be added via :meth:`register`
+    """
+
+    def __init__(self, group=ENTRY_POINT_GROUP):
+        self.group = group
+        self._sources = None
+        self._loaded = {}
+
+    @property
+    def sources(self):
+        """Mapping from source name to the source of the export
+
+        The values are either an entry point, the path to an exported JSON
+        file, a mapping or a callable that returns a mapping"""
+        if self._sources is None:
+            self._sources = {}
+            if self.group is not None and importlib_metadata is not None:
+                for dist in importlib_metadata.distributions():
+                    for ep in dist.entry_points:
+                        if ep.group == self.group:
+                            self._sources.setdefault(ep.name, (dist, ep))
+        return self._sources
+
+    def register(self, name, source):
+        """Add a source for parameters
+
+        Parameters
+        ----------
+        name: str
+            The name of the source, i.e. the prefix for its keys
+        source: str or mapping or callable
+            The path to a JSON file created by
+            :meth:`docrep.DocstringProcessor.export_params`, a mapping or a
+            callable that returns the mapping
+        """
+        self.sources[name] = source
+        self._loaded.pop(name, None)
+
+    def _load(self, name):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        source = self.sources[name]
+        if isinstance(source, tuple):  # entry point
+            dist, ep = source
+            module, sep, attr = ep.value.partition(':')
+            if attr.strip().endswith('.json'):
+                source = _locate_resource(module.strip(), attr.strip())
+            else:
+                source = ep.load()
+        if isinstance(source, six.string_types) or hasattr(
+                source, '__fspath__'):
+            params = load_export(source)
+        elif callable(source):
+            params = source()
+        else:
+            params = source
+        self._loaded[name] = params
+        return params
+
+    def __getitem__(self, key):
+        name, sep, rest = key.partition('.')
+        if not sep or name not in self.sources:
+            raise KeyError(key)
+        return self._load(name)[rest]
+
+    def __contains__(self, key):
+        name, sep, rest = key.partition('.')
+        return bool(sep) and name in self.sources and rest in self._load(name)
+
+    def __iter__(self):
+        for name in list(self.sources):
+            for key in self._load(name):
+                yield name + '.' + key
+
+    def __len__(self):
+        return sum(len(self._load(name)) for name in list(self.sources))
+
+
+#: The default registry for the entry points in the ``docrep.params`` group
+registry = ParamsRegistry()
@@ -0,0 +1,660 @@
+"""Extract the docstrings of docrep without importing the modules.
+
+The :class:`StaticExtractor` parses the source files with :mod:`ast` and
+recognizes the common patterns of docrep, i.e.
+
+- the creation of a :class:`~docrep.DocstringProcessor` (with literal keyword
+  arguments) and its import from other modules of the package,
+- the decorators of the processor (``@d.get_sections(base=...)``,
+  ``@d.dedent``, ``@d.with_indent(4)``, ``@d``, etc.) on functions, classes
+  and methods,
+- the derivation of new keys (``d.keep_params(...)``,
+  ``d.delete_params(...)``, etc.) and
+- the assignment of literal strings to ``d.params[...]``.
+
+The decorators and derivations are processed by a real
+:class:`~docrep.DocstringProcessor`, but the rest of the module is never
+executed, such that its dependencies do not have to be imported. Modules that
+use the processor in any other way (e.g. with arguments that are not
+literals, or in :attr:`~docrep.DocstringProcessor.deferred` mode) are
+*dynamic*. They are imported to get their docstrings, unless the fallback is
+disabled.
+
+Note that decorators that are not part of docrep are ignored. Use
+``python -m docrep check --static`` to check a package without importing
+it (see :mod:`docrep.check`).
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import io
+import sys
+import ast
+import types
+import importlib
+import traceback
+import warnings
+import contextlib
+from collections import OrderedDict
+import docrep
+from docrep.check import _find_spec, _parse_invalid_key, find_modules
+
+
+__all__ = [
+    "StaticModule",
+    "StaticExtractor",
+]
+
+
+#: Methods of the :class:`~docrep.DocstringProcessor` that can be used as
+#: decorators
+decorator_methods = {
+    '__call__', 'dedent', 'with_indent', 'get_sections', 'get_docstring',
+    'get_summary', 'get_extended_summary', 'get_full_description',
+}
+
+#: Methods of the :class:`~docrep.DocstringProcessor` that derive new keys
+derivation_methods = {
+    'delete_params', 'delete_kwargs', 'delete_types', 'keep_params',
+    'keep_types',
+}
+
+
+class _Dynamic(Exception):
+    """A statement that cannot be processed statically"""
+
+
+class StaticModule(object):
+    """The result of the static extraction of a module
+
+    Parameters
+    ----------
+    name: str
+        The name of the module
+    filename: str
+        The path to the source file (None for namespace packages)
+    is_package: bool
+        Whether the module is a package
+    """
+
+    def __init__(self, name, filename, is_package=False):
+        self.name = name
+        self.filename = filename
+        self.is_package = is_package
+        #: Mapping from the qualified names of the functions, classes and
+        #: methods of the module to their docstrings
+        self.docs = OrderedDict()
+        #: The invalid keys as list of ``(key, filename, lineno)``
+        self.missing = []
+        #: The reason why the module could not be processed statically, or
+        #: None
+        self.dynamic = None
+        #: True, if the module has been imported because it is dynamic
+        self.imported = False
+        #: The traceback if the (dynamic) module could not be imported
+        self.error = None
+        #: Mapping from names in the module to what they refer to
+        self.namespace = {}
+
+    def __repr__(self):
+        return '<%s %s (%s)>' % (
+            self.__class__.__name__, self.name,
+            'static' if self.dynamic is None else 'dynamic')
+
+
+def _describe(node):
+    """Get the source code of a node (or its dump in python 3.8 and earlier)
+    """
+    return getattr(ast, 'unparse', ast.dump)(node)
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise _Dynamic("%s is not a literal" % _describe(node))
+
+
+def _subscript_key(node):
+    """Get the literal key of a subscript like ``d.params['key']``"""
+    key = node.slice
+    if type(key).__name__ == 'Index':  # python 3.8 and earlier
+        key = key.value
+    return _literal(key)
+
+
+def _literal_args(call, skip=0):
+    """Get the positional (except the first `skip` ones) and keyword arguments
+    of a call"""
+    if any(kw.arg is None for kw in call.keywords) or any(
+            type(arg).__name__ == 'Starred' for arg in call.args):
+        raise _Dynamic("unpacked arguments")
+    return ([_literal(arg) for arg in call.args[skip:]],
+            {kw.arg: _literal(kw.value) for kw in call.keywords})
+
+
+def _clean_doc(doc):
+    """Clean a docstring like the compiler of python 3.13 and later"""
+    lines = doc.expandtabs().split('\n')
+    indents = [len(line) - len(line.lstrip()) for line in lines[1:]
+               if line.strip()]
+    margin = min(indents) if indents else 0
+    return '\n'.join([lines[0].lstrip()] + [line[margin:] for line in
+                                            lines[1:]])
+
+
+def _dummy():
+    pass
+
+
+class StaticExtractor(object):
+    """Extract the docstrings and parameters of modules without importing them
+
+    Parameters
+    ----------
+    fallback: bool
+        If True, modules that cannot be processed statically are imported
+    processor_class: type
+        The class for the processors. Defaults to
+        :class:`docrep.DocstringProcessor`
+
+    Examples
+    --------
+    Process a module from its source code::
+
+        >>> from docrep.static import StaticExtractor
+        >>> source = '''
+        ... import docrep
+        ... import numpy  # not needed for the extraction
+        ...
+        ... d = docrep.DocstringProcessor()
+        ...
+        ...
+        ... @d.get_sections(base='func')
+        ... def func(a, b):
+        ...     \"\"\"Summary
+        ...
+        ...     Parameters
+        ...     ----------
+        ...     a: int
+        ...         The first parameter
+        ...     b: float
+        ...         The second parameter\"\"\"
+        ...
+        ...
+        ... @d.dedent
+        ... def other(a):
+        ...     \"\"\"Another function
+        ...
+        ...     Parameters
+        ...     ----------
+        ...     %(func.parameters)s\"\"\"
+        ... '''
+        >>> extractor = StaticExtractor()
+        >>> module = extractor.extract_source(source, 'mymodule')
+        >>> print(module.docs['mymodule.other'])
+        Another function
+        <BLANKLINE>
+        Parameters
+        ----------
+        a: int
+            The first parameter
+        b: float
+            The second parameter
+        >>> list(extractor.processors['mymodule.d'].params)
+        ['func.parameters', 'func.other_parameters']
+    """
+
+    def __init__(self, fallback=True, processor_class=None):
+        self.fallback = fallback
+        self.processor_class = processor_class or docrep.DocstringProcessor
+        #: The extracted modules
+        self.modules = OrderedDict()
+        #: Mapping from ``'<module>.<name>'`` to the processors that are
+        #: defined in the modules
+        self.processors = OrderedDict()
+        self._in_progress = set()
+        self._roots = set()
+
+    # -- extraction of modules ------------------------------------------------
+
+    def extract_package(self, package):
+        """Extract a package and all its submodules
+
+        Parameters
+        ----------
+        package: str
+            The name of the package
+
+        Returns
+        -------
+        list of StaticModule
+            The results for the modules of the package
+        """
+        names = find_modules(package)
+        return [self.extract_module(name) for name in names]
+
+    def extract_module(self, modname):
+        """Extract a module from its source file
+
+        The parent packages are extracted, too.
+
+        Parameters
+        ----------
+        modname: str
+            The name of the module
+
+        Returns
+        -------
+        StaticModule
+            The result of the extraction
+
+        Raises
+        ------
+        ImportError
+            If no source file for `modname` can be found
+        """
+        self._roots.add(modname.split('.')[0])
+        module = self._get_module(modname)
+        if module is None:
+            raise ImportError("No source file for module %r" % modname)
+        return module
+
+    def extract_source(self, source, modname='__main__', filename='<string>',
+                       is_package=False):
+        """Extract a module from its source code
+
+        Parameters
+        ----------
+        source: str
+            The source code of the module
+        modname: str
+            The name of the module
+        filename: str
+            The path of the source file
+        is_package: bool
+            Whether the module is a package
+
+        Returns
+        -------
+        StaticModule
+            The result of the extraction
+        """
+        module = StaticModule(modname, filename, is_package)
+        self.modules[modname] = module
+        self._in_progress.add(modname)
+        try:
+            try:
+                tree = ast.parse(source, filename)
+            except SyntaxError as e:
+                module.dynamic = 'invalid syntax: %s' % e
+            else:
+                try:
+                    self._visit_body(module, tree.body, modname)
+                except _Dynamic as e:
+                    module.dynamic = 'line %i: %s' % (e.lineno, e)
+            if module.dynamic is not None and self.fallback:
+                self._import(module)
+        finally:
+            self._in_progress.discard(modname)
+        return module
+
+    def _get_module(self, modname):
+        """Get an extracted module or extract it, if it is in scope"""
+        if modname in self.modules:
+            return self.modules[modname]
+        if (modname in self._in_progress or
+                modname.split('.')[0] not in self._roots):
+            return None
+        parent = modname.rpartition('.')[0]
+        if parent and self._get_module(parent) is None:
+            return None
+        spec = _find_spec(modname)
+        if (spec is not None and spec.submodule_search_locations is not None
+                and spec.origin in [None, 'namespace']):
+            # a namespace package without source code
+            module = self.modules[modname] = StaticModule(modname, None, True)
+            return module
+        if (spec is None or not spec.origin or
+                not spec.origin.endswith('.py')):
+            return None
+        with io.open(spec.origin, 'rb') as f:
+            source = f.read()
+        return self.extract_source(
+            source, modname, spec.origin,
+            spec.submodule_search_locations is not None)
+
+    def _import(self, module):
+        """Import a dynamic module and take the docstrings from it"""
+        module.imported = True
+        try:
+            with self._collect_missing(module, None):
+                mod = importlib.import_module(module.name)
+        except Exception:
+            module.error = traceback.format_exc()
+            return
+        module.docs.clear()
+        for qualname, obj in self._iter_objects(mod):
+            module.docs[qualname] = obj.__doc__
+        for name, val in vars(mod).items():
+            if isinstance(val, docrep.DocstringProcessor) and not (
+                    module.namespace.get(name, (None, ))[0] == 'processor'):
+                module.namespace[name] = ('processor', val)
+                self.processors.setdefault('%s.%s' % (module.name, name),
+                                           val)
+        self._merge_params()
+
+    def _iter_objects(self, mod, prefix=None, parent=None):
+        prefix = prefix or mod.__name__
+        for name, obj in vars(parent or mod).items():
+            obj = getattr(obj, '__func__', obj)  # static- and classmethods
+            func = obj.fget if isinstance(obj, property) else obj
+            if not isinstance(func, (types.FunctionType, type)) or (
+                    getattr(func, '__module__', None) != mod.__name__):
+                continue
+            qualname = '%s.%s' % (prefix, name)
+            yield qualname, obj
+            if isinstance(obj, type):
+                for item in self._iter_objects(mod, qualname, obj):
+                    yield item
+
+    def _merge_params(self):
+        """Add the parameters of imported processors to the static ones"""
+        for key, processor in self.processors.items():
+            modname, name = key.rsplit('.', 1)
+            real = getattr(sys.modules.get(modname), name, None)
+            if (isinstance(real, docrep.DocstringProcessor) and
+                    real is not processor):
+                params = processor._own_params()
+                for key, value in real._own_params().iter_stored():
+                    if key not in params:
+                        params[key] = value
+
+    @contextlib.contextmanager
+    def _collect_missing(self, module, lineno):
+        """Record the invalid keys of the warnings in a statement
+
+        If `lineno` is None, the location of the warning is used"""
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            yield
+        for w in caught:
+            key = _parse_invalid_key(w)
+            if key is None:
+                warnings.warn_explicit(w.message, w.category, w.filename,
+                                       w.lineno)
+                continue
+            if lineno is None:
+                entry = (key, w.filename, w.lineno)
+            else:
+                entry = (key, module.filename, lineno)
+            if entry not in module.missing:
+                module.missing.append(entry)
+
+    # -- visiting the syntax tree ---------------------------------------------
+
+    def _visit_body(self, module, body, prefix, in_class=False):
+        for stmt in body:
+            try:
+                if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)) or (
+                        type(stmt).__name__ == 'AsyncFunctionDef'):
+                    self._visit_def(module, stmt, prefix)
+                elif isinstance(stmt, ast.Import) and not in_class:
+                    self._visit_import(module, stmt)
+                elif isinstance(stmt, ast.ImportFrom) and not in_class:
+                    self._visit_import_from(module, stmt)
+                elif isinstance(stmt, ast.Assign) and not in_class and (
+                        self._visit_assign(module, stmt)):
+                    pass
+                elif (isinstance(stmt, ast.Expr) and not in_class and
+                      isinstance(stmt.value, ast.Call) and
+                      self._visit_call(module, stmt)):
+                    pass
+                else:
+                    self._visit_other(module, stmt)
+            except _Dynamic as e:
+                if not hasattr(e, 'lineno'):
+                    e.lineno = stmt.lineno
+                raise
+
+    def _visit_other(self, module, stmt):
+        """Make sure that an unsupported statement does not use a processor
+        """
+        namespace = module.namespace
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name) and namespace.get(
+                    node.id, (None, ))[0] in ['processor', 'processor_class']:
+                raise _Dynamic("unsupported use of %r" % node.id)
+        if isinstance(stmt, ast.Assign):
+            # the targets are unknown from now on
+            for target in stmt.targets:
+                for node in ast.walk(target):
+                    if isinstance(node, ast.Name):
+                        namespace[node.id] = ('unknown', )
+
+    def _visit_import(self, module, stmt):
+        for alias in stmt.names:
+            if alias.asname:
+                module.namespace[alias.asname] = ('module', alias.name)
+            else:
+                name = alias.name.split('.')[0]
+                module.namespace[name] = ('module', name)
+
+    def _visit_import_from(self, module, stmt):
+        base = stmt.module or ''
+        if stmt.level:
+            parts = module.name.split('.')
+            if not module.is_package:
+                parts = parts[:-1]
+            parts = parts[:len(parts) - stmt.level + 1]
+            base = '.'.join(parts + ([base] if base else []))
+        source = None if base == 'docrep' else self._get_module(base)
+        for alias in stmt.names:
+            name = alias.asname or alias.name
+            if base == 'docrep':
+                module.namespace[name] = (
+                    'processor_class', ) if (
+                        alias.name == 'DocstringProcessor') else (
+                            'unknown', )
+            elif alias.name == '*':
+                if source is not None:
+                    module.namespace.update(
+                        (key, val) for key, val in source.namespace.items()
+                        if not key.startswith('_'))
+            elif source is not None and alias.name in source.namespace:
+                module.namespace[name] = source.namespace[alias.name]
+            elif self._get_module(base + '.' + alias.name) is not None:
+                module.namespace[name] = ('module', base + '.' + alias.name)
+            else:
+                module.namespace[name] = ('unknown', )
+
+    def _resolve(self, module, node):
+        """Resolve a name or attribute
+
+        Returns
+        -------
+        tuple
+            ``('processor', processor)``, ``('processor_class', )``,
+            ``('module', name)``, ``('method', processor, name)``,
+            ``('params', processor)`` or ``('unknown', )``"""
+        if isinstance(node, ast.Name):
+            return module.namespace.get(node.id, ('unknown', ))
+        elif isinstance(node, ast.Attribute):
+            base = self._resolve(module, node.value)
+            if base[0] == 'processor':
+                if node.attr == 'params':
+                    return ('params', base[1])
+                return ('method', base[1], node.attr)
+            elif base[0] == 'module':
+                if base[1] == 'docrep':
+                    return ('processor_class', ) if (
+                        node.attr == 'DocstringProcessor') else ('unknown', )
+                source = self._get_module(base[1])
+                if source is not None and node.attr in source.namespace:
+                    return source.namespace[node.attr]
+                if self._get_module(base[1] + '.' + node.attr) is not None:
+                    return ('module', base[1] + '.' + node.attr)
+        return ('unknown', )
+
+    def _visit_assign(self, module, stmt):
+        if len(stmt.targets) != 1:
+            return False
+        target = stmt.targets[0]
+        value = stmt.value
+        if isinstance(target, ast.Name):
+            if isinstance(value, ast.Call) and self._resolve(
+                    module, value.func)[0] == 'processor_class':
+                args, kwargs = _literal_args(value)
+                if args:
+                    raise _Dynamic("positional arguments for the processor")
+                processor = self.processor_class(**kwargs)
+                module.namespace[target.id] = ('processor', processor)
+                self.processors['%s.%s' % (module.name, target.id)] = (
+                    processor)
+                return True
+            if isinstance(value, ast.Call) and self._apply(
+                    module, value, stmt.lineno, target.id):
+                return True
+            resolved = self._resolve(module, value)
+            if resolved[0] == 'processor':
+                module.namespace[target.id] = resolved
+                return True
+            return False
+        elif isinstance(target, ast.Subscript):
+            resolved = self._resolve(module, target.value)
+            if resolved[0] != 'params':
+                return False
+            params = resolved[1].params
+            key = _subscript_key(target)
+            if isinstance(value, ast.Subscript) and self._resolve(
+                    module, value.value)[0] == 'params':
+                source = self._resolve(module, value.value)[1].params
+                value = source[_subscript_key(value)]
+            else:
+                value = _literal(value)
+            params[key] = value
+            return True
+        return False
+
+    def _apply(self, module, call, lineno, target=None):
+        """Apply a processor to a function or class of the module
+
+        This handles calls like ``d.dedent(func)`` or
+        ``Class = d.with_indent(Class, 4)``.
+
+        Returns
+        -------
+        bool
+            True if `call` has been handled"""
+        if not call.args or not isinstance(call.args[0], ast.Name):
+            return False
+        name = call.args[0].id
+        obj = module.namespace.get(name, (None, ))
+        if obj[0] != 'object' or target not in [None, name]:
+            return False
+        resolved = self._resolve(module, call.func)
+        if resolved[0] == 'processor':
+            func = resolved[1]
+        elif resolved[0] == 'method' and resolved[2] in decorator_methods:
+            func = getattr(*resolved[1:])
+        else:
+            return False
+        obj, qualname = obj[1:]
+        args, kwargs = _literal_args(call, skip=1)
+        with self._collect_missing(module, lineno):
+            func(obj, *args, **kwargs)
+        module.docs[qualname] = obj.__doc__
+        return True
+
+    def _visit_call(self, module, stmt):
+        call = stmt.value
+        if self._apply(module, call, stmt.lineno):
+            return True
+        func = call.func
+        if isinstance(func, ast.Attribute) and func.attr == 'update' and (
+                self._resolve(module, func.value)[0] == 'params'):
+            args, kwargs = _literal_args(call)
+            self._resolve(module, func.value)[1].params.update(*args,
+                                                               **kwargs)
+            return True
+        resolved = self._resolve(module, func)
+        if resolved[0] != 'method':
+            return False
+        processor, method = resolved[1:]
+        if method not in derivation_methods | decorator_methods:
+            raise _Dynamic("unsupported method %r" % method)
+        args, kwargs = _literal_args(call)
+        with self._collect_missing(module, stmt.lineno):
+            getattr(processor, method)(*args, **kwargs)
+        return True
+
+    def _get_decorator(self, module, node):
+        """Get the decorator of a processor or None for other decorators"""
+        call = node if isinstance(node, ast.Call) else None
+        resolved = self._resolve(module, call.func if call else node)
+        if resolved[0] == 'processor':
+            if call is not None:
+                raise _Dynamic("calling the processor in a decorator")
+            return resolved[1]
+        elif resolved[0] == 'method':
+            processor, method = resolved[1:]
+            if method not in decorator_methods:
+                raise _Dynamic("unsupported decorator %r" % method)
+            if call is None:
+                return getattr(processor, method)
+            args, kwargs = _literal_args(call)
+            return getattr(processor, method)(*args, **kwargs)
+        elif resolved[0] == 'unknown':
+            # an unknown object with a method of a processor is most likely
+            # a processor that we could not resolve
+            func = call.func if call else node
+            if isinstance(func, ast.Attribute) and (
+                    func.attr in decorator_methods | derivation_methods):
+                raise _Dynamic("unknown decorator %s" % _describe(func))
+        return None
+
+    def _visit_def(self, module, node, prefix):
+        qualname = '%s.%s' % (prefix, node.name)
+        doc = ast.get_docstring(node, clean=False)
+        if doc is not None and sys.version_info >= (3, 13):
+            doc = _clean_doc(doc)
+        decorators = []
+        for dec in node.decorator_list:
+            with self._collect_missing(module, dec.lineno):
+                decorator = self._get_decorator(module, dec)
+            if decorator is not None:
+                decorators.append((dec.lineno, decorator))
+        is_class = isinstance(node, ast.ClassDef)
+        if is_class:
+            # the methods are decorated before the class
+            module.docs[qualname] = doc
+            self._visit_body(module, node.body, qualname, in_class=True)
+            obj = type(str(node.name), (object, ), {
+                '__doc__': doc, '__module__': module.name})
+        else:
+            obj = types.FunctionType(_dummy.__code__, {}, str(node.name))
+            obj.__doc__ = doc
+            obj.__module__ = module.name
+        obj.__qualname__ = qualname[len(module.name) + 1:]
+        for lineno, decorator in decorators[::-1]:
+            if obj.__doc__ is None:
+                break
+            with self._collect_missing(module, lineno):
+                ret = decorator(obj)
+            obj = obj if ret is None else ret
+        module.docs[qualname] = obj.__doc__
+        if prefix == module.name:
+            module.namespace[node.name] = ('object', obj, qualname)
@@ -0,0 +1,394 @@
+"""Optional tracing of the operations of docrep.
+
+This module records the wall time and the sizes of the input and output of
+the extraction, derivation and substitution functions of docrep, attributed to
+the module and function that called docrep. Tracing is disabled by default.
+The traced versions of the functions (see :func:`traced`) are only installed
+while a :class:`Tracer` is active, such that they do not cost anything
+otherwise.
+
+Examples
+--------
+Use the :meth:`docrep.DocstringProcessor.trace` method (or a :class:`Tracer`
+directly) as a context manager and print the summary via::
+
+    >>> from docrep import DocstringProcessor
+    >>> d = DocstringProcessor()
+    >>> with d.trace() as tracer:
+    ...     @d.get_sections(base='func')
+    ...     @d.dedent
+    ...     def func(a):
+    ...         '''Some function
+    ...
+    ...         Parameters
+    ...         ----------
+    ...         a: int
+    ...             A parameter'''
+    >>> sorted(set(record.op for record in tracer.records))
+    ['dedent', 'get_sections', 'safe_modulo']
+    >>> tracer.dump()  # doctest: +SKIP
+     time [ms]  count  input  output  op            module    function
+         0.031      1     82      82  dedent        __main__  <module>
+         0.012      1     82      63  get_sections  __main__  <module>
+         0.005      1     82      82  safe_modulo   __main__  <module>
+
+Disclaimer
+----------
+Copyright 2021 Philipp S. Sommer, Helmholtz-Zentrum Geesthacht
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import six
+import sys
+import time
+import inspect
+import functools
+from collections import namedtuple
+
+
+__all__ = [
+    "Tracer",
+    "TraceRecord",
+    "traced",
+    "traceable",
+    "labelled",
+    "object_label",
+    "active_tracer",
+]
+
+
+try:
+    _timer = time.perf_counter
+except AttributeError:  # python 2
+    _timer = time.time
+
+
+#: The :class:`Tracer` that currently records the operations (or None)
+active_tracer = None
+
+
+#: The classes and modules whose :func:`traced` functions are replaced by
+#: their traced versions while a :class:`Tracer` is active
+_owners = []
+
+#: The ``(owner, name, function)`` tuples of the functions that have been
+#: replaced by their traced version
+_installed = []
+
+
+#: A traced call of a docrep operation
+TraceRecord = namedtuple('TraceRecord', [
+    'op', 'module', 'function', 'lineno', 'label', 'time', 'input_size',
+    'output_size', 'depth'])
+
+
+def _is_docrep(modname):
+    return modname == 'docrep' or modname.startswith('docrep.')
+
+
+def _get_caller():
+    """Get the first frame outside of docrep
+
+    Returns
+    -------
+    str
+        The name of the module
+    str
+        The name of the function
+    int
+        The line number"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        modname = frame.f_globals.get('__name__', '')
+        if not _is_docrep(modname):
+            return modname, frame.f_code.co_name, frame.f_lineno
+        frame = frame.f_back
+    return '', '', 0
+
+
+def object_label(obj):
+    """Get the label for the docstring of an object in the trace
+
+    Parameters
+    ----------
+    obj: object or str
+        The object or a string to use as label
+
+    Returns
+    -------
+    str
+        The label"""
+    if obj is None or isinstance(obj, six.string_types):
+        return obj
+    name = getattr(obj, '__qualname__', getattr(obj, '__name__', None))
+    if name is None:
+        return repr(obj)
+    modname = getattr(obj, '__module__', None)
+    return modname + '.' + name if modname else name
+
+
+class Tracer(object):
+    """Record the operations of docrep.
+
+    A tracer records all traced operations while it is active, i.e. between
+    :meth:`start` and :meth:`stop` (or within a ``with`` statement). Tracers
+    can be nested, the inner one records the operations until it is stopped.
+    """
+
+    #: The list of :class:`TraceRecord` instances in the order in which the
+    #: operations finished
+    records = None
+
+    #: The columns for the :meth:`summary`
+    columns = ('count', 'time', 'input_size', 'output_size')
+
+    def __init__(self):
+        self.records = []
+        self._labels = []
+        self._depth = 0
+        self._previous = None
+
+    def start(self):
+        """Start recording the operations"""
+        global active_tracer
+        if active_tracer is None:
+            for owner in _owners:
+                _install(owner)
+        self._previous, active_tracer = active_tracer, self
+
+    def stop(self):
+        """Stop recording the operations"""
+        global active_tracer
+        active_tracer, self._previous = self._previous, None
+        if active_tracer is None:
+            _uninstall()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def call(self, op, func, args, kwargs, label=None):
+        """Call a function and record the call
+
+        Parameters
+        ----------
+        op: str
+            The name of the operation
+        func: callable
+            The function to call
+        args: tuple
+            The positional arguments for `func`. The first string in `args`
+            is considered as the input of the operation
+        kwargs: dict
+            The keyword arguments for `func`
+        label: str
+            The label of the record. If None, the label of the enclosing
+            :func:`labelled` call is used
+
+        Returns
+        -------
+        object
+            The return value of `func`
+        """
+        input_size = next((len(arg) for arg in args
+                           if isinstance(arg, six.string_types)), 0)
+        modname, funcname, lineno = _get_caller()
+        if label is None and self._labels:
+            label = self._labels[-1]
+        depth = self._depth
+        ret = None
+        self._depth += 1
+        t0 = _timer()
+        try:
+            ret = func(*args, **kwargs)
+        finally:
+            elapsed = _timer() - t0
+            self._depth = depth
+            self.records.append(TraceRecord(
+                op, modname, funcname, lineno, label, elapsed, input_size,
+                len(ret) if isinstance(ret, six.string_types) else 0, depth))
+        return ret
+
+    def summary(self, by=('op', 'module', 'function'), sort='time',
+                depth=None, ops=None):
+        """Aggregate the records
+
+        Parameters
+        ----------
+        by: tuple of str
+            The fields of the :class:`TraceRecord` to group the records by
+        sort: str
+            The column to sort the groups by (in descending order), one of
+            :attr:`columns`
+        depth: int
+            If not None, only use the records with this nesting depth, e.g.
+            ``0`` to ignore the operations that are called by other traced
+            operations
+        ops: list of str
+            If not None, only use the records of these operations
+
+        Returns
+        -------
+        list of dict
+            The groups with the fields in `by` and the :attr:`columns`
+        """
+        groups = {}
+        for record in self.records:
+            if depth is not None and record.depth != depth:
+                continue
+            if ops is not None and record.op not in ops:
+                continue
+            key = tuple(getattr(record, field) for field in by)
+            try:
+                group = groups[key]
+            except KeyError:
+                group = groups[key] = dict(zip(by, key))
+                group.update(dict.fromkeys(self.columns, 0))
+            group['count'] += 1
+            group['time'] += record.time
+            group['input_size'] += record.input_size
+            group['output_size'] += record.output_size
+        return sorted(six.itervalues(groups), key=lambda g: g[sort],
+                      reverse=True)
+
+    def dump(self, file=None, limit=None, **kwargs):
+        """Print the :meth:`summary`
+
+        Parameters
+        ----------
+        file: file-like object
+            The file to write to. If None, :data:`sys.stdout` is used
+        limit: int
+            The maximum number of groups to print
+        ``**kwargs``
+            Any other keyword argument for the :meth:`summary`
+        """
+        if file is None:
+            file = sys.stdout
+        by = kwargs.setdefault('by', ('op', 'module', 'function'))
+        groups = self.summary(**kwargs)[:limit]
+        rows = [['%.3f' % (g['time'] * 1e3), str(g['count']),
+                 str(g['input_size']), str(g['output_size'])] +
+                [str(g[field]) for field in by] for g in groups]
+        header = ['time [ms]', 'count', 'input', 'output'] + list(by)
+        widths = [max(len(row[i]) for row in [header] + rows)
+                  for i in range(len(header))]
+        for row in [header] + rows:
+            file.write('  '.join(
+                [cell.rjust(w) for cell, w in zip(row[:4], widths[:4])] +
+                [cell.ljust(w) for cell, w in zip(row[4:], widths[4:])]
+                ).rstrip() + '\n')
+
+
+def traced(op, label=None):
+    """Decorate a function whose calls shall be recorded by the tracer
+
+    The function itself is returned unchanged. Its traced version is stored
+    as the ``_traced`` attribute and replaces the function in its class or
+    module (see :func:`traceable`) while a :class:`Tracer` is active.
+
+    Parameters
+    ----------
+    op: str
+        The name of the operation
+    label: callable
+        A function that takes the arguments of the decorated function and
+        returns the label for the record. It is only called when tracing is
+        enabled
+    """
+
+    def decorate(func):
+
+        @functools.wraps(func)
+        def trace(*args, **kwargs):
+            tracer = active_tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            return tracer.call(
+                op, func, args, kwargs,
+                None if label is None else label(*args, **kwargs))
+
+        func._traced = trace
+        trace._untraced = func
+        return func
+
+    return decorate
+
+
+def traceable(owner):
+    """Register a class or module with :func:`traced` functions
+
+    Parameters
+    ----------
+    owner: type or module
+        The class or module whose functions shall be replaced by their
+        traced versions while a :class:`Tracer` is active
+
+    Returns
+    -------
+    type or module
+        `owner`, such that this function can be used as a class decorator
+    """
+    _owners.append(owner)
+    if active_tracer is not None:
+        _install(owner)
+    return owner
+
+
+def _install(owner):
+    """Replace the traced functions of `owner` by their traced versions"""
+    for name, func in list(vars(owner).items()):
+        # functions that copied the attributes of a traced function (e.g.
+        # via functools.wraps) are not replaced
+        if (inspect.isfunction(func) and hasattr(func, '_traced') and
+                func._traced._untraced is func):
+            _installed.append((owner, name, func))
+            setattr(owner, name, func._traced)
+
+
+def _uninstall():
+    """Restore the functions that have been replaced by :func:`_install`"""
+    while _installed:
+        owner, name, func = _installed.pop()
+        setattr(owner, name, func)
+
+
+def labelled(obj, func, *args, **kwargs):
+    """Call a function and label the traced operations within this call
+
+    Parameters
+    ----------
+    obj: object or str
+        The object whose docstring is processed (or the label itself, see
+        :func:`object_label`)
+    func: callable
+        The function to call
+    ``*args, **kwargs``
+        The arguments for `func`
+
+    Returns
+    -------
+    object
+        The return value of `func`
+    """
+    tracer = active_tracer
+    if tracer is None:
+        return func(*args, **kwargs)
+    tracer._labels.append(object_label(obj))
+    try:
+        return func(*args, **kwargs)
+    finally:
+        tracer._labels.pop()
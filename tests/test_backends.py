@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import functools
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import docrep
+from docrep.backends import (
+    DictBackend, SQLiteBackend, ChainedParams, SharedMemoryParams,
+    shared_memory)
+
+
+doc = """A function
+
+Parameters
+----------
+a: int
+    The first parameter
+b: str
+    The second parameter
+
+Returns
+-------
+float
+    A number"""
+
+
+class TestDictBackend(unittest.TestCase):
+    """Test case for the :class:`docrep.backends.DictBackend`"""
+
+    def test_dict(self):
+        """Test that the default params can be used as a dictionary"""
+        d = docrep.DocstringProcessor(existing='something')
+        d.get_sections(doc, base='func', sections=['Parameters'])
+        self.assertIsInstance(d.params, dict)
+        expected = {'existing': 'something',
+                    'func.parameters': ('a: int\n    The first parameter\n'
+                                        'b: str\n    The second parameter')}
+        copied = d.params.copy()
+        self.assertIs(type(copied), dict)
+        self.assertEqual(copied, expected)
+        self.assertEqual(json.loads(json.dumps(d.params)), expected)
+        self.assertEqual(dict(d.params), expected)
+        self.assertEqual(d.params, expected)
+        self.assertEqual(d.params.get('func.parameters'),
+                         expected['func.parameters'])
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """Test case for the :class:`docrep.backends.SQLiteBackend`"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, 'params.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_mapping(self):
+        """Test the mapping interface of the backend"""
+        backend = SQLiteBackend(self.db, {'a': 'A'}, cache_size=2)
+        backend['b'] = 'B'
+        backend.update(c='C', d='D')
+        self.assertEqual(len(backend), 4)
+        self.assertEqual(sorted(backend), ['a', 'b', 'c', 'd'])
+        self.assertEqual(backend['a'], 'A')
+        self.assertIn('b', backend)
+        self.assertNotIn('e', backend)
+        self.assertLessEqual(len(backend._cache), 2)
+        del backend['a']
+        self.assertNotIn('a', backend)
+        with self.assertRaises(KeyError):
+            backend['a']
+        with self.assertRaises(KeyError):
+            del backend['a']
+        backend.close()
+
+        # the values persist in the database
+        backend = SQLiteBackend(self.db)
+        self.assertEqual(dict(backend), {'b': 'B', 'c': 'C', 'd': 'D'})
+        backend.close()
+
+    def test_processor(self):
+        """Test the backend in combination with the DocstringProcessor"""
+        d = docrep.DocstringProcessor(existing='something')
+        self.assertIsInstance(d.params, DictBackend)
+        d.set_params_backend(SQLiteBackend(self.db, cache_size=1))
+        self.assertEqual(d.params['existing'], 'something')
+        d.get_sections(doc, base='func', sections=['Parameters', 'Returns'])
+        d.keep_params('func.parameters', 'b')
+        self.assertEqual(d.params['func.parameters.b'],
+                         'b: str\n    The second parameter')
+
+        @d.with_indent(12)
+        def func():
+            """Another function
+
+            Parameters
+            ----------
+            %(func.parameters)s
+
+            Returns
+            -------
+            %(func.returns)s"""
+
+        self.assertEqual(
+            func.__doc__,
+            "Another function\n\n"
+            "            Parameters\n"
+            "            ----------\n"
+            "            a: int\n"
+            "                The first parameter\n"
+            "            b: str\n"
+            "                The second parameter\n\n"
+            "            Returns\n"
+            "            -------\n"
+            "            float\n"
+            "                A number")
+        d.params.close()
+
+    def test_threads(self):
+        """Test the access from multiple threads"""
+        backend = SQLiteBackend(self.db, cache_size=5)
+        errors = []
+
+        def target(i):
+            try:
+                for j in range(50):
+                    key = 'key%i.%i' % (i, j)
+                    backend[key] = 'value %i' % j
+                    self.assertEqual(backend[key], 'value %i' % j)
+                    self.assertIn(key, backend)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=target, args=(i, ))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(backend), 200)
+        self.assertLessEqual(len(backend._cache), 5)
+        backend.close()
+
+    def test_params_backend(self):
+        """Test the backend as the params_backend of a processor"""
+
+        class Processor(docrep.DocstringProcessor):
+            params_backend = SQLiteBackend
+
+        d = Processor(a='A')
+        self.assertIsInstance(d.params, SQLiteBackend)
+        self.assertEqual(d.params.database, ':memory:')
+        self.assertEqual(d.child(b='B').dedent('%(a)s %(b)s'), 'A B')
+
+        Processor.params_backend = functools.partial(SQLiteBackend, self.db)
+        d = Processor(a='A')
+        self.assertEqual(d.params.database, self.db)
+        self.assertEqual(d.params['a'], 'A')
+        d.params.close()
+
+
+class TestChainedParams(unittest.TestCase):
+    """Test case for the :class:`docrep.backends.ChainedParams`"""
+
+    def test_mapping(self):
+        """Test the mapping interface"""
+        parent = DictBackend(a='A', b='B')
+        chained = ChainedParams(parent)
+        chained['b'] = 'local B'
+        chained.update(c='C')
+        self.assertEqual(chained['a'], 'A')
+        self.assertEqual(chained['b'], 'local B')
+        self.assertEqual(parent['b'], 'B')
+        self.assertNotIn('c', parent)
+        self.assertEqual(len(chained), 3)
+        self.assertEqual(sorted(chained), ['a', 'b', 'c'])
+        parent['d'] = 'D'
+        self.assertEqual(chained['d'], 'D')
+        del chained['b']
+        self.assertEqual(chained['b'], 'B')
+        with self.assertRaises(KeyError):
+            del chained['a']
+
+    def test_child(self):
+        """Test the :meth:`docrep.DocstringProcessor.child` method"""
+        d = docrep.DocstringProcessor(key='value')
+        child = d.child(other='other value')
+        self.assertIs(child.patterns.matchers, d.patterns.matchers)
+        self.assertIsInstance(child.params, ChainedParams)
+        child.get_sections(doc, base='func')
+        self.assertIn('func.parameters', child.params)
+        self.assertNotIn('func.parameters', d.params)
+        d.params['late'] = 'late value'
+        self.assertEqual(
+            child.dedent('%(key)s, %(other)s, %(late)s'),
+            'value, other value, late value')
+        grandchild = child.child()
+        self.assertEqual(grandchild.params['func.other_parameters'], '')
+
+
+@unittest.skipIf(shared_memory is None, "Requires python 3.8 or later")
+class TestSharedMemoryParams(unittest.TestCase):
+    """Test case for the :class:`docrep.backends.SharedMemoryParams`"""
+
+    def test_mapping(self):
+        """Test the read-only mapping interface"""
+        params = {'b': 'B', 'a': u'\xe4', 'c.parameters': 'a: int'}
+        shared = SharedMemoryParams.create(params)
+        try:
+            self.assertEqual(len(shared), 3)
+            self.assertEqual(list(shared), ['a', 'b', 'c.parameters'])
+            self.assertEqual(dict(shared), params)
+            self.assertIn('b', shared)
+            self.assertNotIn('d', shared)
+            with self.assertRaises(KeyError):
+                shared['d']
+            other = SharedMemoryParams.attach(shared.name)
+            self.assertEqual(dict(other), params)
+            other.close()
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_attach_process(self):
+        """Test attaching to the shared params from another process"""
+        shared = SharedMemoryParams.create({'a': 'A'})
+        script = (
+            'from docrep.backends import SharedMemoryParams\n'
+            'print(SharedMemoryParams.attach(%r)["a"])' % shared.name)
+        try:
+            # the pipes are only closed when the resource tracker of the other
+            # process finished as well
+            proc = subprocess.Popen([sys.executable, '-c', script],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    cwd=os.path.dirname(os.path.dirname(
+                                        docrep.__file__)))
+            out, err = proc.communicate()
+            self.assertEqual(proc.returncode, 0, msg=err)
+            self.assertEqual(out.decode('utf-8').strip(), 'A')
+            self.assertNotIn(b'leaked', err)
+            other = SharedMemoryParams.attach(shared.name)
+            self.assertEqual(other['a'], 'A')
+            other.close()
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_processor(self):
+        """Test rendering docstrings with shared params"""
+        d = docrep.DocstringProcessor()
+        d.get_sections(doc, base='func')
+        shared = d.share_params()
+        try:
+            self.assertIs(d.params, shared)
+            self.assertEqual(
+                d.dedent("""
+                    Parameters
+                    ----------
+                    %(func.parameters)s"""),
+                "Parameters\n----------\n" + d.params['func.parameters'])
+            with self.assertRaises(TypeError):
+                d.get_sections(doc, base='func2')
+        finally:
+            shared.close()
+            shared.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
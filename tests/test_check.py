@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+import six
+
+
+init_source = '''
+import docrep
+d = docrep.DocstringProcessor()
+
+
+@d.get_sections(base='func', sections=['Parameters', 'Returns'])
+def func(a, b):
+    """Summary
+
+    Parameters
+    ----------
+    a: int
+        The first parameter
+    b: int
+        The second parameter
+
+    Returns
+    -------
+    int
+        A number"""
+'''
+
+
+sub_source = '''
+from docrep_check_pkg import d
+
+d.keep_params('func.parameters', 'a')
+
+
+@d.dedent
+def other(a):
+    """Other function
+
+    Parameters
+    ----------
+    %(func.parameters.a)s
+    %(missing)s"""
+'''
+
+
+@unittest.skipIf(six.PY2, "The check requires python 3")
+class TestCheck(unittest.TestCase):
+    """Test case for the :mod:`docrep.check` module"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.pkg_dir = os.path.join(self.test_dir, 'docrep_check_pkg')
+        os.makedirs(self.pkg_dir)
+        with open(os.path.join(self.pkg_dir, '__init__.py'), 'w') as f:
+            f.write(init_source)
+        with open(os.path.join(self.pkg_dir, 'sub.py'), 'w') as f:
+            f.write(sub_source)
+        self.cache = os.path.join(self.test_dir, 'cache.json')
+        sys.path.insert(0, self.test_dir)
+        # make the package importable for the worker processes
+        self._pythonpath = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            [self.test_dir] + ([self._pythonpath] if self._pythonpath else []))
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        if self._pythonpath is None:
+            os.environ.pop('PYTHONPATH')
+        else:
+            os.environ['PYTHONPATH'] = self._pythonpath
+        shutil.rmtree(self.test_dir)
+
+    def test_find_modules(self):
+        """Test finding the modules without importing them"""
+        from docrep.check import find_modules
+        self.assertEqual(find_modules('docrep_check_pkg'),
+                         ['docrep_check_pkg', 'docrep_check_pkg.sub'])
+        self.assertNotIn('docrep_check_pkg', sys.modules)
+        with self.assertRaises(ImportError):
+            find_modules('docrep_check_pkg.missing')
+
+    def test_check_packages(self):
+        """Test the check of a package"""
+        from docrep.check import check_packages
+        report = check_packages(['docrep_check_pkg'], 2, self.cache)
+        self.assertEqual(sorted(report.modules),
+                         ['docrep_check_pkg', 'docrep_check_pkg.sub'])
+        self.assertEqual(report.cached, [])
+        self.assertEqual(list(report.missing), ['missing'])
+        [(fname, lineno)] = report.missing['missing']
+        self.assertEqual(fname, os.path.join(self.pkg_dir, 'sub.py'))
+        self.assertEqual(report.unused, {'func.returns'})
+        self.assertIn('func.parameters', report.used)
+        self.assertFalse(report.errors)
+        self.assertTrue(report.failed())
+        self.assertIn("invalid key 'missing'", report.format())
+        self.assertNotIn('unused', report.format(unused=False))
+
+        # the second run uses the cache
+        report = check_packages(['docrep_check_pkg'], 2, self.cache)
+        self.assertEqual(sorted(report.cached),
+                         ['docrep_check_pkg', 'docrep_check_pkg.sub'])
+        self.assertEqual(report.unused, {'func.returns'})
+
+        # changing the package invalidates the modules that import it
+        with open(os.path.join(self.pkg_dir, '__init__.py'), 'a') as f:
+            f.write("\n\nd.keep_types('func.returns', 'int', 'int')\n")
+        report = check_packages(['docrep_check_pkg'], 2, self.cache)
+        self.assertEqual(report.cached, [])
+        self.assertEqual(report.unused, {'func.returns.int'})
+
+    def test_imported(self):
+        """Test the check of a package that has already been imported"""
+        from docrep.check import check_packages
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', SyntaxWarning)
+                import docrep_check_pkg.sub  # noqa: F401
+            report = check_packages(['docrep_check_pkg'], 2, None)
+        finally:
+            for name in list(sys.modules):
+                if name.startswith('docrep_check_pkg'):
+                    del sys.modules[name]
+        self.assertEqual(list(report.missing), ['missing'])
+        self.assertEqual(report.unused, {'func.returns'})
+
+    def test_import_error(self):
+        """Test a module that cannot be imported"""
+        from docrep.check import check_packages
+        with open(os.path.join(self.pkg_dir, 'broken.py'), 'w') as f:
+            f.write('raise ValueError("broken module")')
+        report = check_packages(['docrep_check_pkg'], 2, None)
+        self.assertEqual(list(report.errors), ['docrep_check_pkg.broken'])
+        self.assertIn('broken module',
+                      report.errors['docrep_check_pkg.broken'])
+        self.assertFalse(os.path.exists(self.cache))
+
+    def test_nothing_to_check(self):
+        """Test a check without modules"""
+        from docrep.check import check_static, check_packages
+        self.assertEqual(check_static([]), [])
+        report = check_packages([], static=True)
+        self.assertEqual(report.modules, [])
+        self.assertFalse(report.failed())
+        self.assertEqual(report.format(), 'nothing to check')
+
+    def test_main(self):
+        """Test the command line interface"""
+        from docrep.__main__ import main
+        out = six.StringIO()
+        stdout = sys.stdout
+        sys.stdout = out
+        try:
+            status = main(['check', 'docrep_check_pkg', '-j', '2',
+                           '--cache', self.cache, '--ignore-unused'])
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(status, 1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].endswith("invalid key 'missing'"))
+        self.assertTrue(lines[1].startswith('2 modules checked'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
 import unittest
+import json
+import os
 import re
+import shutil
+import sys
+import tempfile
 import docrep
 import six
 import warnings
@@ -223,6 +228,86 @@ class TestDocstringProcessor(_BaseTest):
     def test_get_sections_indented(self):
         self.test_get_sections(indented=True)
 
+    def test_get_sections_lazy(self):
+        """Test whether the sections are only copied when accessed"""
+        doc = (summary + '\n\n' + parameters_header + '\n' + simple_param +
+               '\n\n' + notes_header + '\n' + notes)
+        self.ds.get_sections(doc, base='test', sections=['Parameters'])
+        key = 'test.parameters'
+        stored = dict(self.ds.params.iter_stored())
+        self.assertIsInstance(stored[key], docrep._SectionView)
+        self.assertEqual(self.ds.params[key], simple_param)
+        stored = dict(self.ds.params.iter_stored())
+        self.assertEqual(stored[key], simple_param)
+
+        # plain dictionaries store the strings
+        self.ds.params = {}
+        self.ds.get_sections(doc, base='test', sections=['Parameters'])
+        self.assertEqual(self.ds.params, {key: simple_param})
+
+    def test_extract_many(self):
+        """Test extracting the sections of multiple docstrings at once"""
+        self.test_get_sections()
+        sections = ['Examples', 'Parameters', 'Other Parameters', 'Returns',
+                    'Notes', 'See Also', 'References']
+        ref = {key: self.ds.params[key] for key in self.ds.params}
+        self.ds.params.clear()
+
+        def test():
+            pass
+
+        test.__doc__ = (
+            summary + '\n\n' + parameters_header + '\n' +
+            ref['test.parameters'] + '\n\n' + examples_header + '\n' +
+            ref['test.examples'])
+        doc = ('\n\n' + other_parameters_header + '\n' +
+               ref['test.other_parameters'] + '\n\n' + returns_header +
+               '\n' + ref['test.returns'] + '\n\n' + notes_header + '\n' +
+               ref['test.notes'] + '\n\n' + see_also_header + '\n' +
+               ref['test.see_also'])
+
+        results = self.ds.extract_many([test, doc], sections,
+                                       base='doc{index}')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['Parameters'], ref['test.parameters'])
+        self.assertEqual(results[0]['Returns'], '')
+        self.assertEqual(results[1]['Returns'], ref['test.returns'])
+        for key in ['parameters', 'examples']:
+            self.assertEqual(self.ds.params['doc0.' + key], ref['test.' + key])
+        for key in ['other_parameters', 'returns', 'notes', 'see_also']:
+            self.assertEqual(self.ds.params['doc1.' + key], ref['test.' + key])
+
+        self.ds.params.clear()
+        self.ds.extract_many([test], ['Parameters'],
+                             base=lambda f: f.__name__.upper())
+        self.assertEqual(dict(self.ds.params),
+                         {'TEST.parameters': ref['test.parameters']})
+
+    def test_iter_sections(self):
+        """Test extracting the sections from a stream of lines"""
+        import io
+        ps = simple_param + '\n' + complex_param
+        ops = simple_multiline_param + '\n' + very_complex_param
+        rs = simple_return_type + '\n' + very_complex_return_type
+        doc = (random_text + '\n\n' +
+               parameters_header + '\n' + ps + '\n\n' +
+               other_parameters_header + '\n' + ops + '\n\n' +
+               returns_header + '\n' + rs + '\n\n' +
+               examples_header + '\n' + examples + '\n\n' +
+               notes_header + '\n' + notes + '\n\n' +
+               parameters_header + '\n' + simple_param + '\n\n' +
+               see_also_header + '\n' + see_also)
+        f = io.StringIO(six.text_type(doc))
+        self.assertEqual(
+            list(self.ds.iter_sections(f)),
+            [('Parameters', ps), ('Other Parameters', ops), ('Returns', rs),
+             ('Examples', examples), ('Notes', notes),
+             ('Parameters', simple_param), ('See Also', see_also)])
+        self.assertEqual(
+            list(self.ds.iter_sections(doc, ['Parameters', 'Notes'])),
+            [('Parameters', ps), ('Notes', notes),
+             ('Parameters', simple_param)])
+
     def test_dedent(self):
         self.test_get_sections()
 
@@ -280,6 +365,20 @@ class TestDocstringProcessor(_BaseTest):
         s = '\n'.join(l.rstrip() for l in test2.__doc__.splitlines())
         self.assertEqual(s, ref)
 
+    def test_positional_params(self):
+        """Test a processor with positional parameters"""
+        ds = docrep.DocstringProcessor('x', 'y\nz')
+        self.assertEqual(ds.dedent('%s and %s'), 'x and y\nz')
+        self.assertEqual(ds('%s and %s'), 'x and y\nz')
+        self.assertEqual(ds.with_indent('%s and %s', 4), 'x and y\n    z')
+
+        @ds.dedent
+        def func():
+            """
+            %s and %s"""
+
+        self.assertEqual(func.__doc__, 'x and y\nz')
+
     def test_dedents(self):
         self.test_get_sections()
         s = """
@@ -616,6 +715,516 @@ class TestDocstringProcessor(_BaseTest):
             self.fail("Should have raised AttributeError!")
 
 
+module_source = '''
+from docrep import safe_modulo
+
+
+def func():
+    """A %(key)s function"""
+
+
+def other():
+    """No placeholder"""
+
+
+class Class(object):
+    """A %(key)s class"""
+
+    def method(self):
+        """
+        A %(key)s method
+        """
+
+    @staticmethod
+    def static():
+        """A %(key)s static method"""
+
+    @property
+    def prop(self):
+        """A %(key)s property"""
+
+    class Nested(object):
+        """A %(key)s nested class"""
+'''
+
+
+class TestProcessModule(_BaseTest):
+    """Test case for :meth:`docrep.DocstringProcessor.process_module`"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.pkg_dir = os.path.join(self.test_dir, 'docrep_test_pkg')
+        os.makedirs(self.pkg_dir)
+        for fname in ['__init__.py', 'sub.py']:
+            with open(os.path.join(self.pkg_dir, fname), 'w') as f:
+                f.write(module_source)
+        sys.path.insert(0, self.test_dir)
+        self.ds = docrep.DocstringProcessor(key='substituted')
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        for name in ['docrep_test_pkg', 'docrep_test_pkg.sub']:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.test_dir)
+
+    def _check_module(self, mod):
+        self.assertEqual(mod.func.__doc__, 'A substituted function')
+        self.assertEqual(mod.other.__doc__, 'No placeholder')
+        self.assertEqual(mod.Class.__doc__, 'A substituted class')
+        self.assertEqual(mod.Class.method.__doc__,
+                         '\n        A substituted method\n        ')
+        self.assertEqual(mod.Class.static.__doc__,
+                         'A substituted static method')
+        self.assertEqual(mod.Class.prop.__doc__, 'A substituted property')
+        self.assertEqual(mod.Class.Nested.__doc__,
+                         'A substituted nested class')
+        # imported objects are not modified
+        self.assertIs(mod.safe_modulo, docrep.safe_modulo)
+
+    def test_process_module(self):
+        """Test processing a single module"""
+        import docrep_test_pkg
+        import docrep_test_pkg.sub
+        updated = self.ds.process_module('docrep_test_pkg')
+        self.assertEqual(len(updated), 6)
+        self._check_module(docrep_test_pkg)
+        self.assertEqual(docrep_test_pkg.sub.func.__doc__,
+                         'A %(key)s function')
+
+        self.ds.process_module(docrep_test_pkg.sub, dedent=True)
+        self.assertEqual(docrep_test_pkg.sub.Class.method.__doc__,
+                         'A substituted method')
+
+    def test_process_module_recursive(self):
+        """Test processing a package with its submodules"""
+        self.ds.process_module('docrep_test_pkg', recursive=True)
+        self._check_module(sys.modules['docrep_test_pkg'])
+        self._check_module(sys.modules['docrep_test_pkg.sub'])
+
+
+@unittest.skipIf(six.PY2, "Requires python 3.6 or later")
+class TestProcessClass(_BaseTest):
+    """Test case for :meth:`docrep.DocstringProcessor.process_class`"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor(key='substituted')
+
+    def test_process_class(self):
+        """Test the processing of a class hierarchy"""
+
+        @self.ds.process_class(dedent=True)
+        class Base(object):
+            """A %(key)s class
+
+            Parameters
+            ----------
+            a: int
+                The first parameter"""
+
+            def __init__(self, a):
+                pass
+
+            def method(self, a):
+                """A %(key)s method
+
+                Parameters
+                ----------
+                a: int
+                    The first parameter
+
+                Returns
+                -------
+                int
+                    The result"""
+
+            @property
+            def prop(self):
+                """A %(key)s property"""
+
+        class Child(Base):
+            """A %(key)s subclass
+
+            Parameters
+            ----------
+            %(super.parameters)s
+            b: int
+                The second parameter"""
+
+            def __init__(self, a, b):
+                pass
+
+            def method(self, a):
+                pass
+
+            @property
+            def prop(self):
+                pass
+
+        class GrandChild(Child):
+
+            def method(self, a, b):
+                """Another method
+
+                Parameters
+                ----------
+                %(super.parameters)s
+                b: int
+                    The second parameter
+
+                Returns
+                -------
+                %(super.returns)s"""
+
+        base_method_doc = ("A substituted method\n\n"
+                           "Parameters\n----------\n"
+                           "a: int\n    The first parameter\n\n"
+                           "Returns\n-------\nint\n    The result")
+
+        self.assertEqual(Base.__doc__, "A substituted class\n\n"
+                         "Parameters\n----------\n"
+                         "a: int\n    The first parameter")
+        self.assertEqual(Base.method.__doc__, base_method_doc)
+        self.assertEqual(Child.method.__doc__, base_method_doc)
+        self.assertEqual(Child.prop.__doc__, "A substituted property")
+        self.assertIsNone(Child.__init__.__doc__)
+        self.assertEqual(Child.__doc__, "A substituted subclass\n\n"
+                         "Parameters\n----------\n"
+                         "a: int\n    The first parameter\n"
+                         "b: int\n    The second parameter")
+        self.assertEqual(GrandChild.method.__doc__,
+                         "Another method\n\n"
+                         "Parameters\n----------\n"
+                         "a: int\n    The first parameter\n"
+                         "b: int\n    The second parameter\n\n"
+                         "Returns\n-------\nint\n    The result")
+        # the sections of the parent docstrings are cached
+        self.assertIn(Child, self.ds._parent_sections)
+        self.assertIn('method', self.ds._parent_sections[Child])
+        self.assertIn(Base, self.ds._parent_sections)
+        self.assertIn(None, self.ds._parent_sections[Base])
+
+    def test_process_class_once(self):
+        """Test that decorated subclasses are processed only once"""
+        ds = self.ds
+        # the invalid keys remain in the docstrings and would be rendered
+        # again
+        ds.missing_keys = 'ignore'
+
+        @ds.process_class
+        class A(object):
+            """A %(key)s class %(missing)s"""
+
+        @ds.process_class
+        class B(A):
+            """B %(key)s class %(missing)s"""
+
+        class C(B):
+            """C %(key)s class %(missing)s"""
+
+        self.assertEqual(ds.stats()['renders'], 3)
+        self.assertEqual(ds.stats()['missing_keys'], 3)
+        self.assertEqual(C.__doc__, 'C substituted class %(missing)s')
+
+
+class TestNestedParams(_BaseTest):
+    """Test case for the expansion of nested placeholders in the params"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor(
+            a='A', b='%(a)s and B', c='%(b)s and %(a)s', d='100%%',
+            e='%(a)s and 100%%')
+
+    def test_expand_nested(self):
+        """Test the expansion during the substitution"""
+        s = '%(c)s, %(d)s'
+        self.assertEqual(self.ds.dedent(s), '%(b)s and %(a)s, 100%%')
+        self.ds.expand_nested = True
+        self.assertEqual(self.ds.dedent(s), 'A and B and A, 100%%')
+        self.assertEqual(self.ds.with_indent(s, 4), 'A and B and A, 100%%')
+        # escaped percent signs are kept, independent of the expansion
+        self.assertEqual(self.ds.dedent('%(d)s, %(e)s'),
+                         '100%%, A and 100%%')
+        # the params are not modified
+        self.assertEqual(self.ds.params['c'], '%(b)s and %(a)s')
+
+    def test_expand_params(self):
+        """Test the in-place expansion of the params"""
+        self.assertEqual(self.ds.expand_params(), ['b', 'c', 'e'])
+        self.assertEqual(self.ds.params['b'], 'A and B')
+        self.assertEqual(self.ds.params['c'], 'A and B and A')
+        self.assertEqual(self.ds.params['d'], '100%%')
+        self.assertEqual(self.ds.params['e'], 'A and 100%%')
+        # positional params are not expanded
+        self.assertEqual(docrep.DocstringProcessor('x').expand_params(), [])
+
+    def test_missing(self):
+        """Test a missing key in a nested value"""
+        self.ds.params['e'] = '%(missing)s'
+        self.ds.expand_nested = True
+        with self.assertWarnsRegex(SyntaxWarning, 'missing'):
+            self.assertEqual(self.ds.dedent('%(e)s'), '%(missing)s')
+
+    def test_cycle(self):
+        """Test the detection of circular references"""
+        self.ds.params['a'] = '%(c)s'
+        self.ds.expand_nested = True
+        with self.assertRaisesRegex(docrep.CircularReferenceError,
+                                    "'c' -> 'b' -> 'a' -> 'c'"):
+            self.ds.dedent('%(c)s')
+        with self.assertRaises(docrep.CircularReferenceError):
+            self.ds.expand_params()
+
+    def test_linear(self):
+        """Test that every key is only expanded once"""
+        n = 500
+        self.ds.params.update(
+            ('key%i' % i, '%%(key%i)s %%(b)s' % (i - 1)) for i in range(1, n))
+        self.ds.params['key0'] = 'x'
+        calls = []
+        orig = docrep.safe_modulo
+
+        def counting_safe_modulo(*args, **kwargs):
+            calls.append(1)
+            return orig(*args, **kwargs)
+
+        docrep.safe_modulo = counting_safe_modulo
+        try:
+            self.ds.expand_params()
+        finally:
+            docrep.safe_modulo = orig
+        # one call per value with placeholders (the 499 keys, b, c and e)
+        self.assertEqual(len(calls), n + 2)
+        self.assertEqual(self.ds.params['key2'], 'x A and B A and B')
+
+
+class TestSections(_BaseTest):
+    """Test case for the compiled section patterns"""
+
+    def test_shared_patterns(self):
+        """Test whether the compiled patterns are shared"""
+        d1 = docrep.DocstringProcessor()
+        d2 = docrep.DocstringProcessor()
+        self.assertIs(d1.patterns.matchers, d2.patterns.matchers)
+        self.assertIs(d1.patterns['Parameters'], d2.patterns['Parameters'])
+        self.assertEqual(sorted(d1.patterns),
+                         sorted(d1.param_like_sections + d1.text_sections))
+
+        class RulesProcessor(docrep.DocstringProcessor):
+            param_like_sections = (
+                ['Rules'] + docrep.DocstringProcessor.param_like_sections)
+
+        d3 = RulesProcessor()
+        self.assertIsNot(d3.patterns.matchers, d1.patterns.matchers)
+        self.assertIn('Rules', d3.patterns)
+        self.assertIs(d3.patterns.matchers, RulesProcessor().patterns.matchers)
+
+    def test_custom_pattern(self):
+        """Test setting a pattern for one processor only"""
+        d1 = docrep.DocstringProcessor()
+        d2 = docrep.DocstringProcessor()
+        d1.patterns['Notes'] = re.compile(r'(?s)(?<=Notes\n-----\n)(.+?)$')
+        doc = (summary + '\n\n' + notes_header + '\n' + notes + '\n\n' +
+               examples_header + '\n' + examples)
+        d1.get_sections(doc, base='test', sections=['Notes'])
+        d2.get_sections(doc, base='test', sections=['Notes'])
+        self.assertEqual(d1.params['test.notes'], notes + '\n\n' +
+                         examples_header + '\n' + examples)
+        self.assertEqual(d2.params['test.notes'], notes)
+        self.assertIs(d1.patterns.matchers, d2.patterns.matchers)
+        self.assertIn('Notes', d1.patterns)
+        del d1.patterns['Notes']
+        self.assertNotIn('Notes', d1.patterns)
+        self.assertIn('Notes', d2.patterns)
+
+    def test_add_section(self):
+        """Test the :meth:`docrep.DocstringProcessor.add_section` method"""
+        d = docrep.DocstringProcessor()
+        params_patt = d.patterns['Parameters']
+        d.add_section('Rules')
+        d.add_section('Remarks', param_like=False)
+        self.assertIs(d.patterns['Parameters'], params_patt)
+        self.assertNotIn('Rules',
+                         docrep.DocstringProcessor.param_like_sections)
+        self.assertNotIn('Rules', docrep.DocstringProcessor().patterns)
+        doc = (summary + '\n\n' + 'Rules\n-----\n' + simple_param +
+               '\n\nRemarks\n-------\n' + notes + '\n\n' +
+               notes_header + '\n' + see_also)
+        d.get_sections(doc, base='test',
+                       sections=['Rules', 'Remarks', 'Notes'])
+        self.assertEqual(d.params['test.rules'], simple_param)
+        self.assertEqual(d.params['test.remarks'], notes)
+        self.assertEqual(d.params['test.notes'], see_also)
+
+    def test_add_section_dict(self):
+        """Test adding a section when the patterns are a plain dict"""
+        d = docrep.DocstringProcessor()
+        notes_patt = re.compile(r'(?s)(?<=Notes\n-----\n)(.+?)$')
+        d.patterns = {'Notes': notes_patt}
+        d.add_section('Rules')
+        self.assertIs(d.patterns['Notes'], notes_patt)
+        doc = (summary + '\n\n' + 'Rules\n-----\n' + simple_param +
+               '\n\n' + notes_header + '\n' + see_also)
+        d.get_sections(doc, base='test', sections=['Rules', 'Notes'])
+        self.assertEqual(d.params['test.rules'], simple_param)
+        self.assertEqual(d.params['test.notes'], see_also)
+
+
+class TestSelectors(_BaseTest):
+    """Test case for the selectors in the placeholders"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+        self.ds.params['test.parameters'] = '\n'.join(
+            [simple_param, complex_param, simple_multiline_param])
+        self.ds.params['test.returns'] = '\n'.join(
+            [simple_return_type, complex_return_type])
+
+    def test_keep(self):
+        """Test the keep and keep_types selectors"""
+        self.assertEqual(
+            self.ds.dedent('%(test.parameters|keep:param, multiline_param)s'),
+            simple_param + '\n' + simple_multiline_param)
+        self.assertEqual(
+            self.ds.dedent('%(test.returns|keep_types:type3)s'),
+            complex_return_type)
+
+    def test_drop(self):
+        """Test the drop and drop_types selectors"""
+        self.assertEqual(
+            self.ds.dedent('%(test.parameters|drop:complex)s'),
+            simple_param + '\n' + simple_multiline_param)
+        self.assertEqual(
+            self.ds.dedent('%(test.returns|drop_types:type3)s'),
+            simple_return_type)
+
+    def test_chained(self):
+        """Test multiple selectors and derived keys as base"""
+        self.ds.keep_params('test.parameters', 'param', 'complex')
+        s = '%(test.parameters.param|complex|drop:param)s'
+        self.assertEqual(self.ds.with_indent(s), complex_param)
+        s = '%(test.parameters|drop:param|keep:complex)s'
+        self.assertEqual(self.ds.with_indent(s), complex_param)
+
+    def test_cache(self):
+        """Test that the results are cached and updated"""
+        key = 'test.parameters|keep:param'
+        self.assertEqual(self.ds.dedent('%(' + key + ')s'), simple_param)
+        self.assertIn(key, self.ds._selector_cache)
+        self.assertNotIn(key, self.ds.params)
+        self.ds.params['test.parameters'] = simple_param + 'changed'
+        self.assertEqual(self.ds.dedent('%(' + key + ')s'),
+                         simple_param + 'changed')
+
+    def test_invalid(self):
+        """Test invalid selectors and missing base keys"""
+        for key in ['test.parameters|unknown:param', 'missing|keep:a']:
+            with self.assertWarnsRegex(SyntaxWarning, 'not a valid key'):
+                self.assertEqual(self.ds.dedent('%(' + key + ')s'),
+                                 '%(' + key + ')s')
+
+
+class TestDeferred(_BaseTest):
+    """Test case for the deferred mode of the DocstringProcessor"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor(key='substituted')
+        self.ds.deferred = True
+
+    def test_resolve(self):
+        """Test the topological ordering in :meth:`resolve`"""
+        ds = self.ds
+
+        @ds.dedent
+        def third(a):
+            """Third function
+
+            Parameters
+            ----------
+            %(second.parameters.a)s"""
+
+        ds.keep_params('second.parameters', 'a')
+
+        @ds.get_sections(base='second')
+        @ds.dedent
+        def second(a, b):
+            """Second %(key)s function
+
+            Parameters
+            ----------
+            %(first.parameters)s
+            b: int
+                The second parameter"""
+
+        @ds.get_sections(base='first')
+        def first(a):
+            """First function
+
+            Parameters
+            ----------
+            a: int
+                The first parameter"""
+
+        # nothing happened yet
+        self.assertNotIn('first.parameters', ds.params)
+        self.assertIn('%(first.parameters)s', second.__doc__)
+
+        self.assertEqual(ds.resolve(), 5)
+
+        self.assertEqual(second.__doc__,
+                         "Second substituted function\n\n"
+                         "Parameters\n----------\n"
+                         "a: int\n    The first parameter\n"
+                         "b: int\n    The second parameter")
+        self.assertEqual(ds.params['second.parameters'],
+                         "a: int\n    The first parameter\n"
+                         "b: int\n    The second parameter")
+        self.assertEqual(third.__doc__,
+                         "Third function\n\n"
+                         "Parameters\n----------\n"
+                         "a: int\n    The first parameter")
+        self.assertEqual(ds.resolve(), 0)
+
+    def test_functional_form(self):
+        """Test the return value of the functional form"""
+        def func(a):
+            """Summary
+
+            Parameters
+            ----------
+            a: int
+                The first parameter"""
+
+        immediate = docrep.DocstringProcessor()
+        expected = immediate.get_sections(func, base='func')
+        self.assertEqual(self.ds.get_sections(func, base='func'), expected)
+        self.assertEqual(self.ds.get_summary(func, base='func'), 'Summary')
+        # the keys are registered when the queue is resolved
+        self.assertNotIn('func.parameters', self.ds.params)
+        self.ds.resolve()
+        self.assertEqual(self.ds.params['func.parameters'],
+                         immediate.params['func.parameters'])
+        self.assertEqual(self.ds.params['func.summary'], 'Summary')
+
+    def test_cycle(self):
+        """Test whether cycles are resolved in the queued order"""
+        ds = self.ds
+
+        @ds.get_docstring(base='one')
+        @ds.dedent
+        def one():
+            """%(two)s"""
+
+        @ds.get_docstring(base='two')
+        @ds.dedent
+        def two():
+            """%(one)s"""
+
+        with self.assertWarns(SyntaxWarning):
+            self.assertEqual(ds.resolve(), 4)
+        self.assertEqual(one.__doc__, '%(two)s')
+        self.assertEqual(two.__doc__, '%(two)s')
+
+
 class DepreceationsTest(_BaseTest):
     """Test case for depreceated methods"""
 
@@ -770,6 +1379,331 @@ class DepreceationsTest(_BaseTest):
                          "Just a test\n\nwith something")
 
 
+class TestRef(_BaseTest):
+    """Test case for the :meth:`docrep.DocstringProcessor.ref` method"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+
+        def other_func(a, b):
+            pass
+
+        other_func.__doc__ = '\n'.join([
+            'Summary', '', 'Parameters', '----------', simple_param,
+            complex_param])
+        self.other_func = other_func
+
+    def test_lazy(self):
+        """Test that the docstring is only parsed when rendered"""
+        ref = self.ds.ref(self.other_func, keep=['param'], key='other.params')
+        self.assertEqual(self.ds._ref_cache, {})
+        self.other_func.__doc__ = self.other_func.__doc__.replace(
+            'for one', 'for a changed')
+        changed = simple_param.replace('for one', 'for a changed')
+        self.assertEqual(self.ds.dedent('%(other.params)s'), changed)
+        self.assertEqual(len(self.ds._ref_cache), 1)
+        self.assertEqual(str(ref), changed)
+
+    def test_drop(self):
+        """Test dropping parameters and the cache"""
+        self.ds.ref(self.other_func, drop=['param'], key='key1')
+        self.ds.ref(self.other_func, drop=['param'], key='key2')
+        self.assertEqual(self.ds.dedent('%(key1)s\n%(key2)s'),
+                         complex_param + '\n' + complex_param)
+        self.assertEqual(len(self.ds._ref_cache), 1)
+        self.assertEqual(str(self.ds.ref(self.other_func, keep=[])), '')
+        self.assertEqual(str(self.ds.ref(self.other_func, 'Returns')), '')
+
+
+class TestStats(_BaseTest):
+    """Test case for the runtime statistics"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+        self.ds.params['test.parameters'] = '\n'.join(
+            [simple_param, complex_param])
+
+    def test_stats(self):
+        """Test the counters and gauges"""
+        d = self.ds
+        stats = d.stats()
+        self.assertEqual(stats['renders'], 0)
+        self.assertEqual(stats['keys_stored'], 1)
+        self.assertEqual(stats['params_chars'],
+                         len(d.params['test.parameters']))
+        rendered = d.dedent('%(test.parameters|keep:param)s')
+        d.dedent('%(test.parameters|keep:param)s')
+        with self.assertWarns(SyntaxWarning):
+            d.dedent('%(missing)s')
+        stats = d.stats()
+        self.assertEqual(stats['renders'], 3)
+        self.assertEqual(stats['rendered_chars'],
+                         2 * len(rendered) + len('%(missing)s'))
+        self.assertEqual(stats['selector_cache_misses'], 1)
+        self.assertEqual(stats['selector_cache_hits'], 1)
+        self.assertEqual(stats['missing_keys'], 1)
+
+    def test_child(self):
+        """Test that the stats only consider the own parameters"""
+        child = self.ds.child(key='value')
+        stats = child.stats()
+        self.assertEqual(stats['keys_stored'], 1)
+        self.assertEqual(stats['params_chars'], len('value'))
+
+    def test_positional_params(self):
+        """Test the stats of a processor with positional parameters"""
+        d = docrep.DocstringProcessor('x')
+        self.assertEqual(d.dedent('%s here'), 'x here')
+        stats = d.stats()
+        self.assertEqual(stats['renders'], 1)
+        self.assertEqual(stats['keys_stored'], 0)
+        self.assertEqual(stats['params_chars'], 0)
+        fname = os.path.join(tempfile.mkdtemp(), 'stats.json')
+        try:
+            self.assertEqual(d.export_stats(fname), stats)
+        finally:
+            shutil.rmtree(os.path.dirname(fname))
+
+    def test_export(self):
+        """Test exporting the stats as JSON and OpenMetrics"""
+        self.ds.dedent('%(test.parameters)s')
+        fname = os.path.join(tempfile.mkdtemp(), 'stats.json')
+        try:
+            stats = self.ds.export_stats(fname)
+            with open(fname) as f:
+                self.assertEqual(json.load(f), stats)
+            self.ds.export_stats(fname, 'openmetrics')
+            with open(fname) as f:
+                lines = f.read().splitlines()
+        finally:
+            shutil.rmtree(os.path.dirname(fname))
+        self.assertIn('# TYPE docrep_renders counter', lines)
+        self.assertIn('docrep_renders_total 1', lines)
+        self.assertIn('docrep_keys_stored 1', lines)
+        self.assertEqual(lines[-1], '# EOF')
+        with self.assertRaisesRegex(ValueError, 'Unknown format'):
+            self.ds.export_stats(fname, 'csv')
+
+
+class TestMissingKeys(_BaseTest):
+    """Test case for the :attr:`docrep.DocstringProcessor.missing_keys`"""
+
+    def test_collect(self):
+        """Test collecting the invalid keys and reporting them at once"""
+        d = docrep.DocstringProcessor(key='value')
+        d.missing_keys = 'collect'
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+
+            @d.dedent
+            def func():
+                """%(key)s %(missing)s %(other)s"""
+
+            line = sys._getframe().f_lineno - 4
+
+            d.dedent('%(missing)s')
+        self.assertEqual(w, [])
+        self.assertEqual(func.__doc__, 'value %(missing)s %(other)s')
+        with self.assertWarnsRegex(SyntaxWarning, '2 invalid keys') as cm:
+            missing = d.report_missing()
+        self.assertEqual(sorted(missing), ['missing', 'other'])
+        self.assertEqual(missing['missing'], [(__file__, line),
+                                              (__file__, line + 6)])
+        self.assertIn("'missing' (2x)", str(cm.warning))
+        self.assertEqual(d.stats()['missing_keys'], 3)
+        # the keys are only reported once
+        self.assertEqual(d.report_missing(), {})
+
+    def test_ignore(self):
+        """Test ignoring the invalid keys"""
+        d = docrep.DocstringProcessor()
+        d.missing_keys = 'ignore'
+        d.expand_nested = True
+        d.params['nested'] = '%(missing)s'
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.assertEqual(d.dedent('%(missing)s %(nested)s'),
+                             '%(missing)s %(missing)s')
+        self.assertEqual(w, [])
+        self.assertEqual(d.report_missing(), {})
+
+
+class TestMemoryReport(_BaseTest):
+    """Test case for :meth:`docrep.DocstringProcessor.memory_report`"""
+
+    def setUp(self):
+        self.ds = d = docrep.DocstringProcessor()
+        doc = d.dedent("""
+            Summary
+
+            Parameters
+            ----------
+            %s""" % simple_param.replace('\n', '\n            '))
+        d.get_sections(doc, base='test.func')
+        d.params['test.copy'] = ''.join(
+            list(d.params['test.func.parameters']))
+        d.params['other'] = 'value'
+
+        @d.dedent
+        def func():
+            """%(other)s"""
+
+        self.func = func
+
+    def test_report(self):
+        """Test the grouping of the report"""
+        modname = __name__.split('.')[0]
+        rows = {row['prefix']: row for row in self.ds.memory_report()}
+        self.assertEqual(sorted(rows), ['other', 'test', modname])
+        self.assertEqual(rows['test']['keys'], 3)
+        self.assertEqual(rows['test']['duplicated_bytes'],
+                         sys.getsizeof(simple_param))
+        self.assertEqual(rows['other']['bytes'], sys.getsizeof('value'))
+        self.assertEqual(rows[modname]['docs'], 1)
+        self.assertEqual(rows[modname]['doc_bytes'],
+                         sys.getsizeof(self.func.__doc__))
+        rows = {row['prefix']: row for row in self.ds.memory_report(2)}
+        self.assertEqual(rows['test.func']['keys'], 2)
+
+    def test_dead_objects(self):
+        """Test that the docstrings of deleted objects are not counted"""
+        import gc
+        modname = __name__.split('.')[0]
+
+        def make_func():
+            def func():
+                """%(other)s"""
+            return func
+
+        funcs = [self.ds.dedent(make_func()) for i in range(10)]
+
+        @self.ds.process_class
+        class Class(object):
+            @property
+            def prop(self):
+                """%(other)s"""
+
+        self.assertEqual(Class.prop.__doc__, 'value')
+        rows = {row['prefix']: row for row in self.ds.memory_report()}
+        self.assertEqual(rows[modname]['docs'], 12)
+        del funcs, Class
+        gc.collect()
+        rows = {row['prefix']: row for row in self.ds.memory_report()}
+        self.assertEqual(rows[modname]['docs'], 1)
+
+    def test_positional_params(self):
+        """Test the report of a processor with positional parameters"""
+        d = docrep.DocstringProcessor('x')
+
+        @d
+        def func():
+            """%s here"""
+
+        rows = d.memory_report()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['prefix'], __name__.split('.')[0])
+        self.assertEqual(rows[0]['keys'], 0)
+        self.assertEqual(rows[0]['docs'], 1)
+
+    @unittest.skipIf(six.PY2, "tracemalloc requires python 3")
+    def test_tracemalloc(self):
+        """Test the attribution of the allocated memory"""
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc is already tracing")
+        with self.assertRaisesRegex(RuntimeError, 'tracemalloc'):
+            self.ds.memory_report(use_tracemalloc=True)
+        tracemalloc.start(25)
+        try:
+            docs = [self.ds.dedent('%(other)s ' + str(i)) for i in range(100)]
+            rows = {row['prefix']: row for row in self.ds.memory_report(
+                use_tracemalloc=True)}
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(rows[__name__.split('.')[0]]['traced_bytes'],
+                                sum(map(sys.getsizeof, docs)))
+
+
+class TestAccessProfile(_BaseTest):
+    """Test case for recording and using access profiles"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+        self.ds.params['test.parameters'] = '\n'.join(
+            [simple_param, complex_param])
+        self.ds.params['unused'] = 'unused value'
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_record(self):
+        """Test recording, saving and loading a profile"""
+        d = self.ds
+        fname = os.path.join(self.test_dir, 'profile.json')
+        with d.record_access(fname):
+            d.keep_params('test.parameters', 'param')
+
+            @d.dedent
+            def func():
+                """%(test.parameters.param)s %(test.parameters|drop:param)s"""
+
+        self.assertNotIsInstance(d.params, docrep._RecordingParams)
+        profile = d.load_access_profile(fname)
+        self.assertEqual(profile['keys'], {'test.parameters',
+                                           'test.parameters.param'})
+        self.assertEqual(profile['objects'],
+                         {__name__ + '.' + func.__qualname__}
+                         if six.PY3 else {__name__ + '.func'})
+        self.assertEqual(profile['unused_keys'], {'unused'})
+
+        self.assertEqual(d.prune_params(profile), ['unused'])
+        self.assertEqual(sorted(d.params),
+                         ['test.parameters', 'test.parameters.param'])
+
+    def test_positional_params(self):
+        """Test recording a processor with positional parameters"""
+        d = docrep.DocstringProcessor('x')
+        with d.record_access() as recorder:
+
+            @d.dedent
+            def func():
+                """%s here"""
+
+        self.assertEqual(func.__doc__, 'x here')
+        self.assertEqual(d.params, ('x', ))
+        profile = recorder.get_profile()
+        self.assertEqual(profile['keys'], [])
+        self.assertEqual(profile['unused_keys'], [])
+        self.assertEqual(len(profile['objects']), 1)
+        self.assertEqual(d.prune_params(profile), [])
+        self.assertEqual(d.params, ('x', ))
+
+    def test_resolve_objects(self):
+        """Test resolving the operations of selected objects only"""
+        d = self.ds
+        d.deferred = True
+
+        @d.dedent
+        def hot():
+            """%(test.parameters.param)s"""
+
+        @d.dedent
+        def cold():
+            """%(test.parameters)s"""
+
+        d.keep_params('test.parameters', 'param')
+
+        # hot depends on the keep_params operation
+        self.assertEqual(d.resolve(objects=[hot]), 2)
+        self.assertEqual(hot.__doc__, simple_param)
+        self.assertEqual(cold.__doc__, """%(test.parameters)s""")
+        self.assertEqual(len(d._deferred_ops), 1)
+        label = cold.__module__ + '.' + getattr(
+            cold, '__qualname__', cold.__name__)
+        self.assertEqual(d.resolve(objects=[label]), 1)
+        self.assertEqual(cold.__doc__, d.params['test.parameters'])
+        self.assertEqual(d._deferred_ops, [])
 
 
 if __name__ == '__main__':
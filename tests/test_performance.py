@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Performance tests for the parsing of pathological docstrings
+
+Each test generates an input of ``size`` and ``factor * size`` characters and
+checks that the time for the larger input grows at most linearly (with a
+generous tolerance for noise). A quadratic (or worse) implementation exceeds
+this budget by far."""
+import unittest
+import warnings
+from timeit import default_timer as timer
+import docrep
+
+
+#: The size of the smaller input in characters
+size = 2 ** 16
+
+#: The ratio of the sizes of the larger and the smaller input
+factor = 8
+
+#: Tolerance for the ratio of the times. A linear algorithm should take about
+#: ``factor`` times longer for the larger input, a quadratic one
+#: ``factor ** 2`` times
+tolerance = 4
+
+#: The minimal time for the smaller input that is used for the budget (to
+#: avoid that very fast operations fail because of noise)
+min_time = 1e-3
+
+
+def make_params(n):
+    return '\n'.join('param%i: int\n    The description of parameter %i' % (
+        i, i) for i in range(n))
+
+
+def blank_lines(n):
+    return ('Summary' + '\n' * (n // 2) + 'Extended summary\n\n'
+            'Parameters\n----------\nparam1: int\n' + '\n' * (n // 2) +
+            '    The description')
+
+
+def whitespace_lines(n):
+    return ('Summary\n' + ' \n' * (n // 4) + 'Extended\n\n'
+            'Parameters\n----------\nparam1: int\n' + '    \n' * (n // 10) +
+            '    The description')
+
+
+def long_lines(n):
+    return ('Summary ' + 'x' * (n // 3) + '\n\n' + 'y' * (n // 3) +
+            '\n\nParameters\n----------\nparam1: int\n    ' + 'z' * (n // 3) +
+            '\n\nNotes\n-----\n' + 'n ' * 10)
+
+
+def long_whitespace_lines(n):
+    return ('Summary\n' + ' ' * (n // 2) + '\nParameters\n----------\n'
+            'param1: int\n' + '\t ' * (n // 4))
+
+
+def many_params(n):
+    return ('Summary\n\nParameters\n----------\n' + make_params(n // 45) +
+            '\n\nReturns\n-------\nint\n    A number')
+
+
+def many_headers(n):
+    return 'Summary\n\n' + ''.join(
+        '%s\n%s\nsome text\n\n' % (s, '-' * len(s))
+        for s in ['Parameters', 'Notes', 'Returns', 'Examples'] * (n // 130))
+
+
+def fake_headers(n):
+    return 'Summary\n\n' + 'Parameters\n---------\n' * (n // 21)
+
+
+def unterminated_summary(n):
+    return 'word ' * (n // 5)
+
+
+def indented_blocks(n):
+    return 'Summary\n\nParameters\n----------\nparam1: int\n' + (
+        ' ' * 50 + '\n  x\n') * (n // 55)
+
+
+#: Generators of pathological docstrings. Each takes the number of characters
+docstrings = {
+    'blank_lines': blank_lines,
+    'whitespace_lines': whitespace_lines,
+    'long_lines': long_lines,
+    'long_whitespace_lines': long_whitespace_lines,
+    'many_params': many_params,
+    'many_headers': many_headers,
+    'fake_headers': fake_headers,
+    'unterminated_summary': unterminated_summary,
+    'indented_blocks': indented_blocks,
+}
+
+
+def params_blank_lines(n):
+    return 'param1: int\n' + '\n' * n + 'param2: int\n    Description'
+
+
+def params_long_line(n):
+    return 'param1: int\n    ' + 'x' * n + '\nparam2: int\n    y'
+
+
+def params_without_colon(n):
+    return ('param1' + ' ' * 100 + '\n') * (n // 107)
+
+
+def params_indented(n):
+    return 'param1: int\n' + '    x\n' * (n // 6) + 'param2: int'
+
+
+#: Generators of pathological parameter sections
+param_sections = {
+    'many_params': lambda n: make_params(n // 45),
+    'blank_lines': params_blank_lines,
+    'long_line': params_long_line,
+    'without_colon': params_without_colon,
+    'indented': params_indented,
+}
+
+
+def measure(func, s, repeat=3):
+    """Get the minimal time of `repeat` calls of ``func(s)``"""
+    times = []
+    for i in range(repeat):
+        t0 = timer()
+        func(s)
+        times.append(timer() - t0)
+    return min(times)
+
+
+class TestLinearTime(unittest.TestCase):
+    """Test that the parsing scales linearly with the size of the docstring"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+
+    def assertLinear(self, func, generators):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            for name, generate in generators.items():
+                small = measure(func, generate(size))
+                large = measure(func, generate(factor * size))
+                budget = factor * tolerance * max(small, min_time)
+                self.assertLessEqual(
+                    large, budget,
+                    msg="%s: %.4f s for %i characters but %.4f s for %i" % (
+                        name, small, size, large, factor * size))
+
+    def test_get_sections(self):
+        """Test :meth:`docrep.DocstringProcessor.get_sections`"""
+        sections = ['Parameters', 'Returns', 'Notes', 'Examples']
+        self.assertLinear(
+            lambda s: self.ds.get_sections(s, sections=sections), docstrings)
+
+    def test_get_summary(self):
+        """Test :meth:`docrep.DocstringProcessor.get_summary`"""
+        self.assertLinear(self.ds.get_summary, docstrings)
+
+    def test_get_extended_summary(self):
+        """Test :meth:`docrep.DocstringProcessor.get_extended_summary`"""
+        self.assertLinear(self.ds.get_extended_summary, docstrings)
+
+    def test_get_full_description(self):
+        """Test :meth:`docrep.DocstringProcessor.get_full_description`"""
+        self.assertLinear(self.ds.get_full_description, docstrings)
+
+    def test_keep_params(self):
+        """Test :func:`docrep.keep_params`"""
+        self.assertLinear(
+            lambda s: docrep.keep_params(s, 'param1', 'param2', 'param100'),
+            param_sections)
+
+    def test_delete_params(self):
+        """Test :func:`docrep.delete_params`"""
+        self.assertLinear(
+            lambda s: docrep.delete_params(s, 'param1', 'param2', 'param100'),
+            param_sections)
+
+    def test_keep_types(self):
+        """Test :func:`docrep.keep_types`"""
+        self.assertLinear(lambda s: docrep.keep_types(s, 'param1', 'int'),
+                          param_sections)
+
+    def test_delete_types(self):
+        """Test :func:`docrep.delete_types`"""
+        self.assertLinear(lambda s: docrep.delete_types(s, 'param1', 'int'),
+                          param_sections)
+
+    def test_delete_kwargs(self):
+        """Test :func:`docrep.delete_kwargs`"""
+        self.assertLinear(lambda s: docrep.delete_kwargs(s, 'args', 'kwargs'),
+                          param_sections)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+import six
+
+
+init_source = '''
+import docrep
+d = docrep.DocstringProcessor()
+
+
+@d.get_sections(base='func')
+def func(a, b):
+    """Summary
+
+    Parameters
+    ----------
+    a: int
+        The first parameter
+    b: int
+        The second parameter"""
+
+
+d.keep_params('func.parameters', 'a')
+'''
+
+
+sub_source = '''
+from docrep_profile_pkg import d
+
+
+@d.dedent
+def other(a):
+    """Other function
+
+    Parameters
+    ----------
+    %(func.parameters.a)s
+    %(missing)s"""
+'''
+
+
+@unittest.skipIf(six.PY2, "The profiler requires python 3")
+class TestProfile(unittest.TestCase):
+    """Test case for the :mod:`docrep.profile` module"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        pkg_dir = os.path.join(self.test_dir, 'docrep_profile_pkg')
+        os.makedirs(pkg_dir)
+        with open(os.path.join(pkg_dir, '__init__.py'), 'w') as f:
+            f.write(init_source)
+        with open(os.path.join(pkg_dir, 'sub.py'), 'w') as f:
+            f.write(sub_source)
+        sys.path.insert(0, self.test_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        for name in ['docrep_profile_pkg', 'docrep_profile_pkg.sub']:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.test_dir)
+
+    def test_profile_import(self):
+        """Test the attribution of the docrep operations"""
+        from docrep.profile import profile_import
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', SyntaxWarning)
+            root, tracer = profile_import('docrep_profile_pkg',
+                                          recursive=True)
+        nodes = {node.name: (depth, node) for depth, node in root.walk()}
+        depth, pkg = nodes['docrep_profile_pkg']
+        self.assertEqual(depth, 1)
+        depth, sub = nodes['docrep_profile_pkg.sub']
+        self.assertEqual(depth, 1)
+        self.assertGreater(pkg.docrep['extract'], 0)
+        self.assertGreater(pkg.docrep['derive'], 0)
+        self.assertEqual(pkg.docrep['render'], 0)
+        self.assertGreater(sub.docrep['render'], 0)
+        self.assertGreater(sub.docrep['warn'], 0)
+        self.assertGreaterEqual(pkg.self_time, 0)
+        self.assertGreater(sub.cumulative, sub.docrep_total)
+        # the original loader is restored
+        self.assertNotIn('_TimedLoader', repr(
+            sys.modules['docrep_profile_pkg'].__loader__))
+
+    def test_main(self):
+        """Test the command line interface"""
+        from docrep.profile import main
+        out = six.StringIO()
+        stdout = sys.stdout
+        sys.stdout = out
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', SyntaxWarning)
+                main(['docrep_profile_pkg', '-r', '-n', '1'])
+        finally:
+            sys.stdout = stdout
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('self [ms]'))
+        self.assertTrue(lines[1].endswith('| docrep_profile_pkg'))
+        templates = lines.index('Most expensive templates')
+        self.assertIn('docrep_profile_pkg.sub.other',
+                      lines[templates + 2])
+        keys = lines.index('Most expensive keys')
+        self.assertEqual(len(lines), keys + 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import docrep
+from docrep.registry import ParamsRegistry, importlib_metadata
+from docrep.backends import shared_memory
+
+try:
+    import setuptools
+except ImportError:
+    setuptools = None
+
+
+doc = """A function
+
+Parameters
+----------
+a: int
+    The first parameter
+b: str
+    The second parameter"""
+
+
+setup_source = """
+from setuptools import setup
+
+setup(
+    name='docrep_upstream',
+    version='1.0',
+    packages=['docrep_upstream'],
+    package_data={'docrep_upstream': ['params.json']},
+    entry_points={
+        'docrep.params': ['upstream = docrep_upstream:params.json'],
+    },
+)
+"""
+
+
+class TestParamsRegistry(unittest.TestCase):
+    """Test case for the :class:`docrep.registry.ParamsRegistry`"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def export(self):
+        upstream = docrep.DocstringProcessor()
+        upstream.get_sections(doc, base='func')
+        fname = os.path.join(self.test_dir, 'params.json')
+        upstream.export_params(fname, prefix='func.')
+        return upstream, fname
+
+    def test_export_params(self):
+        """Test exporting and registering a JSON file"""
+        upstream, fname = self.export()
+        registry = ParamsRegistry(group=None)
+        registry.register('upstream', fname)
+        self.assertEqual(dict(registry), {
+            'upstream.' + key: val for key, val in upstream.params.items()})
+        self.assertNotIn('upstream.missing', registry)
+        self.assertNotIn('other.func.parameters', registry)
+        with self.assertRaises(KeyError):
+            registry['func']
+
+    def test_lazy(self):
+        """Test that the sources are only loaded when needed"""
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {'key': 'value'}
+
+        registry = ParamsRegistry(group=None)
+        registry.register('upstream', load)
+        registry.register('other', {'key': 'other value'})
+        self.assertEqual(registry['other.key'], 'other value')
+        self.assertEqual(calls, [])
+        self.assertEqual(registry['upstream.key'], 'value')
+        self.assertEqual(registry['upstream.key'], 'value')
+        self.assertEqual(calls, [1])
+
+    def test_use_registry(self):
+        """Test rendering docstrings with published parameters"""
+        registry = ParamsRegistry(group=None)
+        registry.register('upstream', {'func.parameters': 'a: int'})
+        d = docrep.DocstringProcessor(key='local')
+        d.use_registry(registry)
+        self.assertEqual(
+            d.dedent('%(key)s and %(upstream.func.parameters)s'),
+            'local and a: int')
+        self.assertEqual(
+            d.dedent('%(upstream.func.parameters|keep:b)s'), '')
+        d.params['new'] = 'new value'
+        self.assertNotIn('new', registry)
+
+    def test_own_params(self):
+        """Test that the registry is not loaded when handling the params"""
+        from docrep.backends import ChainedParams, DictBackend
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {'func.parameters': 'a: int'}
+
+        registry = ParamsRegistry(group=None)
+        registry.register('upstream', load)
+        d = docrep.DocstringProcessor(key='local', nested='%(key)s value')
+        d.use_registry(registry)
+        self.assertEqual(d.expand_params(), ['nested'])
+        backend = DictBackend()
+        d.set_params_backend(backend)
+        self.assertIsInstance(d.params, ChainedParams)
+        self.assertIs(d.params.local, backend)
+        fname = os.path.join(self.test_dir, 'params.json')
+        self.assertEqual(d.export_params(fname),
+                         {'key': 'local', 'nested': 'local value'})
+        self.assertEqual(calls, [])
+        # the registry is still available
+        self.assertEqual(d.dedent('%(upstream.func.parameters)s'), 'a: int')
+        self.assertEqual(calls, [1])
+
+    @unittest.skipIf(shared_memory is None, "Requires python 3.8 or later")
+    def test_share_params(self):
+        """Test sharing the params without loading the registry"""
+        registry = ParamsRegistry(group=None)
+        registry.register('upstream', self.fail)
+        d = docrep.DocstringProcessor(key='local')
+        d.use_registry(registry)
+        shared = d.share_params()
+        try:
+            self.assertIs(d.params.local, shared)
+            self.assertEqual(dict(shared), {'key': 'local'})
+        finally:
+            shared.close()
+            shared.unlink()
+
+    @unittest.skipIf(importlib_metadata is None or setuptools is None,
+                     "importlib.metadata or setuptools is not available")
+    def test_entry_point(self):
+        """Test loading a JSON file published through an entry point"""
+        upstream, fname = self.export()
+        pkg_dir = os.path.join(self.test_dir, 'docrep_upstream')
+        os.makedirs(pkg_dir)
+        shutil.move(fname, pkg_dir)
+        # the package must not be imported to load the parameters
+        with open(os.path.join(pkg_dir, '__init__.py'), 'w') as f:
+            f.write('raise ImportError("docrep_upstream has been imported")')
+        with open(os.path.join(self.test_dir, 'setup.py'), 'w') as f:
+            f.write(setup_source)
+        # let setuptools generate the metadata with the entry points
+        subprocess.check_call(
+            [sys.executable, 'setup.py', '-q', 'egg_info'],
+            cwd=self.test_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        sys.path.insert(0, self.test_dir)
+        try:
+            registry = ParamsRegistry()
+            self.assertIn('upstream', registry.sources)
+            self.assertEqual(registry['upstream.func.parameters'],
+                             upstream.params['func.parameters'])
+            self.assertNotIn('docrep_upstream', sys.modules)
+        finally:
+            sys.path.remove(self.test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
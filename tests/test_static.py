@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+import six
+
+
+init_source = '''
+"""A package that is processed statically"""
+from docrep import DocstringProcessor
+import docrep_static_missing_dependency  # noqa: F401
+
+d = DocstringProcessor(root="root: str\\n    The root parameter")
+d.params['extra'] = """extra: float
+    An extra parameter"""
+
+
+@d.get_sections(base='func', sections=['Parameters', 'Returns'])
+@d.dedent
+def func(a, b, root):
+    """Summary
+
+    Parameters
+    ----------
+    a: int
+        The first parameter
+    b: int
+        The second parameter
+    %(root)s
+
+    Returns
+    -------
+    int
+        A number"""
+
+
+d.keep_params('func.parameters', 'a')
+d.delete_params('func.parameters', 'b')
+'''
+
+
+sub_source = '''
+from . import d
+
+
+class Class(object):
+    """A class
+
+    Parameters
+    ----------
+    %(func.parameters.a)s"""
+
+    @d.with_indent(8)
+    def method(self, a, root):
+        """A method
+
+        Parameters
+        ----------
+        %(func.parameters.no_b)s
+        %(extra)s"""
+
+
+Class = d.dedent(Class)
+
+
+@d
+def other():
+    """%(missing)s"""
+'''
+
+
+dynamic_source = '''
+from docrep_static_pkg import d
+
+BASE = 'dynamic'
+
+
+@d.get_sections(base=BASE)
+def dynamic(x):
+    """Dynamic function
+
+    Parameters
+    ----------
+    x: int
+        The x parameter"""
+'''
+
+
+@unittest.skipIf(six.PY2, "The static extraction requires python 3")
+class TestStaticExtractor(unittest.TestCase):
+    """Test case for the :class:`docrep.static.StaticExtractor`"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.pkg_dir = os.path.join(self.test_dir, 'docrep_static_pkg')
+        os.makedirs(self.pkg_dir)
+        for name, source in [('__init__', init_source), ('sub', sub_source),
+                             ('dynamic', dynamic_source)]:
+            with open(os.path.join(self.pkg_dir, name + '.py'), 'w') as f:
+                f.write(source)
+        sys.path.insert(0, self.test_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        for name in list(sys.modules):
+            if name.startswith('docrep_static'):
+                del sys.modules[name]
+        shutil.rmtree(self.test_dir)
+
+    def import_package(self):
+        """Import the package with a fake for the missing dependency"""
+        sys.modules['docrep_static_missing_dependency'] = sys
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', SyntaxWarning)
+            import docrep_static_pkg.sub
+        return docrep_static_pkg.sub
+
+    def test_extract_package(self):
+        """Test the extraction without importing the package"""
+        from docrep.static import StaticExtractor
+        extractor = StaticExtractor(fallback=False)
+        modules = extractor.extract_package('docrep_static_pkg')
+        self.assertEqual([m.name for m in modules],
+                         ['docrep_static_pkg', 'docrep_static_pkg.dynamic',
+                          'docrep_static_pkg.sub'])
+        self.assertNotIn('docrep_static_pkg', sys.modules)
+        pkg, dynamic, sub = modules
+        self.assertIsNone(pkg.dynamic)
+        self.assertIsNone(sub.dynamic)
+        self.assertIn("BASE is not a literal", dynamic.dynamic)
+        self.assertFalse(dynamic.imported)
+        self.assertEqual(sub.missing, [
+            ('missing', os.path.join(self.pkg_dir, 'sub.py'), 25)])
+
+        # compare with the imported package
+        real = self.import_package()
+        self.assertEqual(pkg.docs['docrep_static_pkg.func'],
+                         sys.modules['docrep_static_pkg'].func.__doc__)
+        self.assertEqual(sub.docs['docrep_static_pkg.sub.Class'],
+                         real.Class.__doc__)
+        self.assertEqual(sub.docs['docrep_static_pkg.sub.Class.method'],
+                         real.Class.method.__doc__)
+        self.assertEqual(sub.docs['docrep_static_pkg.sub.other'],
+                         real.other.__doc__)
+        self.assertEqual(
+            dict(extractor.processors['docrep_static_pkg.d'].params),
+            dict(real.d.params))
+
+    def test_fallback(self):
+        """Test the import of dynamic modules"""
+        from docrep.static import StaticExtractor
+        sys.modules['docrep_static_missing_dependency'] = sys
+        extractor = StaticExtractor()
+        module = extractor.extract_module('docrep_static_pkg.dynamic')
+        self.assertTrue(module.imported)
+        self.assertIsNone(module.error)
+        self.assertIn('docrep_static_pkg.dynamic', sys.modules)
+        self.assertEqual(list(module.docs),
+                         ['docrep_static_pkg.dynamic.dynamic'])
+        # the keys of the imported module are available for static modules
+        processor = extractor.processors['docrep_static_pkg.d']
+        self.assertIn('dynamic.parameters', processor.params)
+        self.assertIn('func.parameters', processor.params)
+
+    def test_fallback_error(self):
+        """Test a dynamic module that cannot be imported"""
+        from docrep.static import StaticExtractor
+        extractor = StaticExtractor()
+        module = extractor.extract_module('docrep_static_pkg.dynamic')
+        self.assertTrue(module.imported)
+        self.assertIn('docrep_static_missing_dependency', module.error)
+
+    def test_namespace_package(self):
+        """Test the extraction of a namespace package"""
+        from docrep.static import StaticExtractor
+        ns_dir = os.path.join(self.test_dir, 'docrep_static_ns')
+        os.makedirs(ns_dir)
+        with open(os.path.join(ns_dir, 'mod.py'), 'w') as f:
+            f.write(dynamic_source.replace('base=BASE', "base='ns'"))
+        extractor = StaticExtractor(fallback=False)
+        extractor.extract_module('docrep_static_pkg')
+        ns, mod = extractor.extract_package('docrep_static_ns')
+        self.assertIsNone(ns.filename)
+        self.assertEqual(list(ns.docs), [])
+        self.assertIsNone(mod.dynamic)
+        self.assertIn('ns.parameters',
+                      extractor.processors['docrep_static_pkg.d'].params)
+
+    def test_unsupported(self):
+        """Test the detection of unsupported patterns"""
+        from docrep.static import StaticExtractor
+        header = 'import docrep\nd = docrep.DocstringProcessor()\n'
+        for source, reason in [
+                ('d.deferred = True', "unsupported use of 'd'"),
+                ('d.process_module("mod")', "unsupported method"),
+                ('@d.process_class\nclass A: pass',
+                 "unsupported decorator"),
+                ('@other.dedent\ndef f(): pass', "unknown decorator"),
+                ('d.keep_params(key, "a")', "key is not a literal"),
+                ]:
+            module = StaticExtractor(fallback=False).extract_source(
+                header + source)
+            self.assertIsNotNone(module.dynamic, msg=source)
+            self.assertIn(reason, module.dynamic)
+            self.assertTrue(module.dynamic.startswith('line '))
+
+    def test_check_static(self):
+        """Test the check of a package without importing it"""
+        from docrep.check import check_packages
+        pythonpath = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            [self.test_dir] + ([pythonpath] if pythonpath else []))
+        try:
+            report = check_packages(['docrep_static_pkg'], static=True)
+        finally:
+            if pythonpath is None:
+                os.environ.pop('PYTHONPATH')
+            else:
+                os.environ['PYTHONPATH'] = pythonpath
+        self.assertEqual(list(report.missing), ['missing'])
+        # the dynamic module cannot be imported because of the missing
+        # dependency
+        self.assertEqual(list(report.errors), ['docrep_static_pkg.dynamic'])
+        self.assertEqual(report.unused, {'func.returns'})
+        self.assertIn('func.parameters.no_b', report.used)
+
+
+if __name__ == '__main__':
+    unittest.main()
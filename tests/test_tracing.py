@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import unittest
+import docrep
+from docrep import tracing
+from six import StringIO
+
+
+doc = """Summary
+
+Parameters
+----------
+a: int
+    The first parameter
+b: int
+    The second parameter"""
+
+
+class TestTracer(unittest.TestCase):
+    """Test case for the :class:`docrep.tracing.Tracer`"""
+
+    def setUp(self):
+        self.ds = docrep.DocstringProcessor()
+
+    def test_records(self):
+        """Test the attribution of the records"""
+        d = self.ds
+
+        def func(a, b):
+            pass
+
+        func.__doc__ = doc
+
+        with d.trace() as tracer:
+            self.assertIs(tracing.active_tracer, tracer)
+            d.get_sections(func, base='func')
+            d.keep_params('func.parameters', 'a')
+
+            @d.dedent
+            def other():
+                """%(func.parameters.a)s"""
+
+        self.assertIsNone(tracing.active_tracer)
+        records = {record.op: record for record in tracer.records}
+        self.assertEqual(sorted(records), [
+            'dedent', 'get_sections', 'keep_params', 'safe_modulo'])
+        for record in tracer.records:
+            self.assertEqual(record.module, __name__)
+            self.assertEqual(record.function, 'test_records')
+        self.assertEqual(records['get_sections'].label, 'func')
+        self.assertEqual(records['keep_params'].label, 'func.parameters.a')
+        self.assertEqual(records['dedent'].label,
+                         __name__ + '.' + other.__qualname__)
+        self.assertEqual(records['dedent'].depth, 0)
+        self.assertEqual(records['safe_modulo'].depth, 1)
+        self.assertEqual(records['dedent'].input_size,
+                         len('%(func.parameters.a)s'))
+        self.assertEqual(records['dedent'].output_size, len(other.__doc__))
+
+    def test_disabled(self):
+        """Test that nothing is recorded outside the context"""
+        tracer = self.ds.trace()
+        self.ds.dedent('test')
+        self.assertEqual(tracer.records, [])
+
+    def test_install(self):
+        """Test that the traced functions are only installed when tracing"""
+        Processor = docrep.DocstringProcessor
+        dedent = Processor.__dict__['dedent']
+        safe_modulo = docrep.safe_modulo
+        with tracing.Tracer():
+            self.assertIs(Processor.__dict__['dedent'], dedent._traced)
+            self.assertIs(docrep.safe_modulo, safe_modulo._traced)
+            with tracing.Tracer() as inner:
+                self.ds.dedent('test')
+            self.assertEqual(len(inner.records), 2)
+            # the outer tracer is still active
+            self.assertIs(docrep.safe_modulo, safe_modulo._traced)
+        self.assertIs(Processor.__dict__['dedent'], dedent)
+        self.assertIs(docrep.safe_modulo, safe_modulo)
+        self.assertEqual(tracing._installed, [])
+
+    def test_summary(self):
+        """Test the summary and the dump"""
+        with self.ds.trace() as tracer:
+            for i in range(3):
+                self.ds.dedent('test %i' % i)
+        self.assertEqual(
+            [(g['op'], g['count']) for g in tracer.summary(by=('op', ))],
+            [('dedent', 3), ('safe_modulo', 3)])
+        self.assertEqual(len(tracer.summary(depth=0)), 1)
+        out = StringIO()
+        tracer.dump(out, limit=1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('dedent', lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()